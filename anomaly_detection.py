@@ -0,0 +1,236 @@
+# Streaming Anomaly Detection Module
+# Incremental per-house baselines for mortality, water and weight
+
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from farm_records import day_record
+from reference_cache import day_table
+
+METRICS = ('mortality', 'water', 'weight')
+
+
+def get_death_threshold(settings: Dict, day: int) -> float:
+    """Return the age-banded daily death threshold (%) for a day"""
+    for band, threshold in settings.get('death_thresholds', {}).items():
+        try:
+            start, end = (int(part) for part in band.split('-'))
+        except ValueError:
+            continue
+        if start <= day <= end:
+            return float(threshold)
+    return 1.0
+
+
+class AnomalyDetector:
+    """
+    EWMA anomaly detector updated in O(1) per saved house-day record.
+
+    Water and weight are tracked as a ratio to the Banvit (Ross 308) standard
+    so the baseline does not drift as the flock grows. Mortality is checked
+    against the age-banded death_thresholds first and against its own EWMA
+    baseline second. Detector state lives in farm_data['anomaly_state'] and
+    alerts are persisted into farm_data['anomaly_alerts'].
+    """
+
+    def __init__(self, farm_data, banvit_data, alpha: float = 0.3,
+                 z_warning: float = 2.0, z_critical: float = 3.0):
+        self.farm_data = farm_data
+        self.banvit_data = banvit_data
+        self.standards = day_table(banvit_data)
+        self.settings = farm_data.get('settings', {})
+        self.alpha = alpha
+        self.z_warning = z_warning
+        self.z_critical = z_critical
+        self.state = farm_data.setdefault('anomaly_state', {})
+        self.alerts = farm_data.setdefault('anomaly_alerts', [])
+
+    # ---------- baseline maths ----------
+    def _new_house_state(self, house_name: str) -> Dict:
+        chick_count = self.settings.get('houses', {}).get(house_name, {}).get('chick_count', 0)
+        return {
+            'day': 0,
+            'cum_deaths': 0,
+            'chick_count': chick_count,
+            'metrics': {
+                # Ratios to the standard start at 1.0 with a 10% prior spread
+                'water': {'mean': 1.0, 'var': 0.01, 'n': 0},
+                'weight': {'mean': 1.0, 'var': 0.01, 'n': 0},
+                'mortality': {'mean': 0.0, 'var': 0.0, 'n': 0},
+            },
+            'prev': None
+        }
+
+    def _z_score(self, value: float, baseline: Dict, std_floor: float) -> float:
+        std = max(math.sqrt(max(baseline['var'], 0.0)), std_floor)
+        if std <= 0:
+            return 0.0
+        return (value - baseline['mean']) / std
+
+    def _ewma_update(self, baseline: Dict, value: float):
+        if baseline['n'] == 0 and baseline['mean'] == 0.0 and baseline['var'] == 0.0:
+            baseline['mean'] = value
+        else:
+            diff = value - baseline['mean']
+            increment = self.alpha * diff
+            baseline['mean'] += increment
+            baseline['var'] = (1 - self.alpha) * (baseline['var'] + diff * increment)
+        baseline['n'] += 1
+
+    # ---------- scoring ----------
+    def _standard(self, day: int, field: str) -> float:
+        column = self.standards.column(field)
+        return float(column[day] or 0) if 0 < day < len(column) else 0.0
+
+    def _check_mortality(self, house_name, day, deaths, live_before, baseline) -> Optional[Dict]:
+        if live_before <= 0:
+            return None
+        rate = deaths / live_before * 100
+        threshold = get_death_threshold(self.settings, day)
+        z = self._z_score(rate, baseline, std_floor=threshold / 4)
+
+        if rate > threshold:
+            severity = 'critical'
+            message = f"{house_name}: günlük ölüm oranı %{rate:.2f}, yaş eşiği %{threshold:.2f} aşıldı"
+        elif baseline['n'] >= 3 and z >= self.z_critical:
+            severity = 'warning'
+            message = f"{house_name}: ölümlerde ani artış (%{rate:.2f}, beklenen %{baseline['mean']:.2f})"
+        else:
+            return None
+        return self._make_alert(house_name, day, 'mortality', severity, rate, baseline['mean'], z, message)
+
+    def _check_water(self, house_name, day, water, live_before, baseline) -> Optional[Dict]:
+        standard = self._standard(day, 'su_tüketimi')
+        if water <= 0 or standard <= 0 or live_before <= 0:
+            return None
+        expected = live_before / 1000 * standard
+        ratio = water / expected
+        z = self._z_score(ratio, baseline, std_floor=0.05 * baseline['mean'])
+
+        if z <= -self.z_critical:
+            severity = 'critical'
+        elif z <= -self.z_warning:
+            severity = 'warning'
+        elif z >= self.z_critical:
+            severity = 'warning'
+        else:
+            return None
+
+        drop = (1 - ratio / baseline['mean']) * 100 if baseline['mean'] > 0 else 0
+        if drop > 0:
+            message = f"{house_name}: su tüketimi beklenenden %{drop:.0f} düşük ({water:.0f} L) - erken hastalık belirtisi olabilir"
+        else:
+            message = f"{house_name}: su tüketimi beklenenden %{-drop:.0f} yüksek ({water:.0f} L) - sızıntı/ısı stresi kontrol edin"
+        return self._make_alert(house_name, day, 'water', severity, water, expected * baseline['mean'], z, message)
+
+    def _check_weight(self, house_name, day, weight, baseline) -> Optional[Dict]:
+        standard = self._standard(day, 'canlı_ağırlık')
+        if weight <= 0 or standard <= 0:
+            return None
+        ratio = weight / standard
+        z = self._z_score(ratio, baseline, std_floor=0.03 * baseline['mean'])
+
+        if z <= -self.z_critical:
+            severity = 'critical'
+        elif z <= -self.z_warning:
+            severity = 'warning'
+        else:
+            return None
+        message = f"{house_name}: ortalama ağırlık {weight:.0f} g, beklenen {standard * baseline['mean']:.0f} g"
+        return self._make_alert(house_name, day, 'weight', severity, weight, standard * baseline['mean'], z, message)
+
+    def _make_alert(self, house_name, day, metric, severity, value, expected, z, message) -> Dict:
+        return {
+            'timestamp': str(datetime.now()),
+            'day': day,
+            'house': house_name,
+            'metric': metric,
+            'severity': severity,
+            'value': round(float(value), 3),
+            'expected': round(float(expected), 3),
+            'z_score': round(float(z), 2),
+            'message': message
+        }
+
+    # ---------- public API ----------
+    def update(self, house_name: str, day: int, record: Dict) -> List[Dict]:
+        """Score a saved house-day record, update the baselines and persist alerts"""
+        house_state = self.state.get(house_name)
+        if house_state is None:
+            house_state = self._new_house_state(house_name)
+            self.state[house_name] = house_state
+
+        if day == house_state['day'] and house_state['prev'] is not None:
+            # Same day saved again: roll back to the snapshot taken before it
+            snapshot = house_state['prev']
+            house_state['day'] = snapshot['day']
+            house_state['cum_deaths'] = snapshot['cum_deaths']
+            house_state['metrics'] = snapshot['metrics']
+            house_state['prev'] = None
+
+        if day < house_state['day']:
+            # Back-dated edit: score against the current baseline without learning from it
+            return self._score(house_name, day, record, house_state, learn=False)
+
+        house_state['prev'] = {
+            'day': house_state['day'],
+            'cum_deaths': house_state['cum_deaths'],
+            'metrics': {m: dict(b) for m, b in house_state['metrics'].items()}
+        }
+        return self._score(house_name, day, record, house_state, learn=True)
+
+    def _score(self, house_name, day, record, house_state, learn: bool) -> List[Dict]:
+        record = day_record(day, house_name, record)
+        deaths, water, weight = record.deaths, record.water_consumption, record.weight
+        live_before = max(0, house_state['chick_count'] - house_state['cum_deaths'])
+        metrics = house_state['metrics']
+
+        new_alerts = [alert for alert in (
+            self._check_mortality(house_name, day, deaths, live_before, metrics['mortality']),
+            self._check_water(house_name, day, water, live_before, metrics['water']),
+            self._check_weight(house_name, day, weight, metrics['weight']),
+        ) if alert]
+
+        if learn:
+            if live_before > 0:
+                self._ewma_update(metrics['mortality'], deaths / live_before * 100)
+                water_standard = self._standard(day, 'su_tüketimi')
+                if water > 0 and water_standard > 0:
+                    self._ewma_update(metrics['water'], water / (live_before / 1000 * water_standard))
+            weight_standard = self._standard(day, 'canlı_ağırlık')
+            if weight > 0 and weight_standard > 0:
+                self._ewma_update(metrics['weight'], weight / weight_standard)
+            house_state['cum_deaths'] += deaths
+            house_state['day'] = day
+
+        # A re-saved record replaces its earlier alerts
+        self.alerts[:] = [
+            a for a in self.alerts
+            if not (a.get('house') == house_name and a.get('day') == day)
+        ]
+        self.alerts.extend(new_alerts)
+        return new_alerts
+
+    def rebuild(self) -> List[Dict]:
+        """Replay all daily data in day order (used after bulk edits)"""
+        self.state.clear()
+        self.alerts.clear()
+        daily_data = self.farm_data.get('daily_data', {})
+        days = sorted(
+            int(key.split('_', 1)[1]) for key in daily_data
+            if key.startswith('day_') and key.split('_', 1)[1].isdigit()
+        )
+        for day in days:
+            for house_name, record in daily_data[f'day_{day}'].items():
+                if isinstance(record, dict):
+                    self.update(house_name, day, record)
+        return list(self.alerts)
+
+
+def get_active_alerts(farm_data: Dict, day: Optional[int] = None) -> List[Dict]:
+    """Return persisted anomaly alerts, critical first, optionally for one day"""
+    alerts = farm_data.get('anomaly_alerts', [])
+    if day is not None:
+        alerts = [a for a in alerts if a.get('day') == day]
+    return sorted(alerts, key=lambda a: (a.get('severity') != 'critical', -a.get('day', 0)))
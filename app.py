@@ -10,6 +10,10 @@ import numpy as np
 from io import BytesIO
 import base64
 
+from farm_store import FarmStore
+from program_patch import ProgramVersionStore, PatchConflict, make_patch, validate_patch
+from kpi_engine import FlockKPIs
+
 # Sayfa Konfigürasyonu
 st.set_page_config(
     page_title="Murat Özkan Kümes Takip Sistemi",
@@ -107,28 +111,19 @@ def hesapla_canli_hayvan(kumes_idx, gunluk_veriler):
     
     return max(0, baslangic - toplam_olum)
 
-def hesapla_fcr(gunluk_veriler, yem_irsaliyesi):
-    """FCR hesapla: (Toplam Gelen Yem - Kalan Yem) / Toplam Canlı Kütle"""
-    
-    toplam_gelen_yem = sum([y.get('miktar', 0) for y in yem_irsaliyesi])
-    
-    toplam_kalan_yem = 0
-    for gun_data in gunluk_veriler.values():
-        if isinstance(gun_data, dict) and 'silo' in gun_data:
-            toplam_kalan_yem += sum(gun_data['silo'])
-    
-    toplam_canli_kutle = 0
-    for gun_data in gunluk_veriler.values():
-        if isinstance(gun_data, dict) and 'agirlik' in gun_data:
-            toplam_canli_kutle += sum(gun_data['agirlik']) / 1000
-    
-    if toplam_canli_kutle == 0:
-        return 0
-    
-    yem_tuketimi = toplam_gelen_yem - toplam_kalan_yem
-    fcr = yem_tuketimi / toplam_canli_kutle if toplam_canli_kutle > 0 else 0
-    
-    return round(fcr, 2)
+def hesapla_kpi_motoru(gunluk_veriler, yem_irsaliyesi):
+    """(FlockKPIs, gün): yem, gelen yem (irsaliyeler) - siloda kalan ile düzeltilir; streamlit_app ile aynı kpi_engine hesabı"""
+    ayarlar = st.session_state.ayarlar
+    gun = min(max(1, (datetime.now() - ayarlar['baslangic_tarihi']).days + 1), 42)
+    gelen_yem = sum(y.get('miktar', 0) for y in yem_irsaliyesi)
+    kpis = FlockKPIs.from_daily_lists(gunluk_veriler, ayarlar['kumes_civciv'][:4], load_banvit_data(), gun,
+                                      delivered_kg=gelen_yem)
+    return kpis, gun
+
+def hesapla_kpi(gunluk_veriler, yem_irsaliyesi):
+    """EPEF, FCR ve sürü KPI'ları (bugün)"""
+    kpis, gun = hesapla_kpi_motoru(gunluk_veriler, yem_irsaliyesi)
+    return kpis.farm(gun)
 
 def hesapla_su_hazirlik(gunluk_su_tuketimi):
     """Su hazırlama hesapla: 400-1000L, 6/12 saatlik bloklar"""
@@ -151,6 +146,21 @@ def hesapla_su_hazirlik(gunluk_su_tuketimi):
             'blok_miktari': blok_6saat
         }
 
+# AI önerisi: Omfalitis tedavisi (yapılandırılmış program farkı olarak)
+AI_PROGRAM_ONERISI = {
+    **{gun: {'morning': {'drug': 'Neomisin Sülfat', 'dosage': '100 mg/L su'}} for gun in range(6, 10)},
+    **{gun: {'evening': {'drug': 'Hepato (Karaciğer Koruyucu)', 'dosage': 'Üretici dozajı'}} for gun in range(10, 13)},
+    13: {'morning': {'drug': 'Sodyum Butirat', 'dosage': '0.5-1 g/L su'}},
+}
+
+def load_json_file(dosya_yolu):
+    with open(dosya_yolu, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_json_file(veri, dosya_yolu):
+    with open(dosya_yolu, 'w', encoding='utf-8') as f:
+        json.dump(veri, f, indent=2, ensure_ascii=False)
+
 def hesapla_ilac_dozu(prospektus_dozu_mg_l, su_hazirlik_l):
     """İlaç dozajı hesapla: Prospektüs × Su / 1000"""
     gerekli_ilac = (prospektus_dozu_mg_l * su_hazirlik_l) / 1000
@@ -239,14 +249,13 @@ if page == "🏠 Dashboard":
         st.metric("Ortalama Ağırlık (g)", f"{ortalama_agirlik:.0f}")
     
     with kpi_col4:
-        saglik_puani = max(0, 100 - (olum_orani * 2))
-        st.metric("Sağlık Puanı", f"{saglik_puani:.0f}/100")
+        kpi = hesapla_kpi(gunluk, yem)
+        st.metric("EPEF", f"{kpi['epef']:.0f}", help=kpi['grade'])
     
     kpi_col5, kpi_col6, kpi_col7, kpi_col8 = st.columns(4)
     
     with kpi_col5:
-        fcr = hesapla_fcr(gunluk, yem)
-        st.metric("Çiftlik FCR", f"{fcr:.2f}")
+        st.metric("Çiftlik FCR", f"{kpi['fcr']:.2f}")
     
     with kpi_col6:
         toplam_kalan_yem = 0
@@ -302,9 +311,8 @@ if page == "🏠 Dashboard":
     with col_graph2:
         st.write("**FCR Trendi**")
         
-        fcr_values = []
-        for gun in sorted(gunluk.keys()):
-            fcr_values.append(hesapla_fcr({gun: gunluk[gun]}, yem))
+        # EPEF ve Çiftlik FCR ile aynı kümülatif FCR, gün gün
+        fcr_values = hesapla_kpi_motoru(gunluk, yem)[0].farm_fcr().round(2).tolist() if gunluk else []
         
         if fcr_values:
             fig_fcr = go.Figure()
@@ -488,6 +496,7 @@ elif page == "🧮 Hesaplamalar":
         st.info("💡 Günlük veri girdikten sonra hesaplamalar burada görünecek.")
     else:
         st.subheading("📊 Hesaplama Sonuçları")
+        kpi = hesapla_kpi(gunluk, yem)
         
         for gun in sorted(gunluk.keys()):
             with st.expander(f"Gün {gun}"):
@@ -523,8 +532,7 @@ elif page == "🧮 Hesaplamalar":
                 st.markdown("---")
                 
                 # FCR
-                fcr = hesapla_fcr(gunluk, yem)
-                st.write(f"**FCR: {fcr:.2f}**")
+                st.write(f"**FCR: {kpi['fcr']:.2f}**")
 
 # ============================================
 # 5. İLAÇ PROGRAMI SAYFASI
@@ -592,12 +600,36 @@ elif page == "💊 İlaç Programı":
     
     with col_onay1:
         if st.button("✅ Evet, Onayla", use_container_width=True):
-            st.session_state.ilac_degisiklikleri.append({
-                'tarih': datetime.now(),
-                'durum': 'Onaylandı',
-                'degisiklik': 'Neomisin + Hepato eklendi'
-            })
-            st.success("✅ İlaç programı güncellendi!")
+            program = load_json_file('complete_drug_program.json')
+            ciftlik = load_json_file('farm_data.json')
+            mevcut = ProgramVersionStore(program, ciftlik.get('program_patches', {})).program
+            yama = make_patch(mevcut, AI_PROGRAM_ONERISI, 'Omfalitis: Neomisin + Hepato + Butirat', source='ai')
+            hatalar, uyarilar = validate_patch(yama, mevcut, ciftlik)
+            if not yama.changes:
+                st.info("ℹ️ Program zaten bu öneriyi içeriyor.")
+            elif hatalar:
+                for hata in hatalar:
+                    st.error(f"⛔ {hata}")
+            else:
+                # Yamalar farm_data.json'da tutulur; kayıtlı hâline karşı kilit altında uygulanır
+                try:
+                    _, surum = FarmStore('farm_data.json').update(
+                        lambda veri: ProgramVersionStore(program, veri.setdefault('program_patches', {}))
+                        .apply(yama, approved_by='kullanıcı'))
+                except PatchConflict as e:
+                    st.error(f"⛔ Program bu arada değişti: {e}")
+                else:
+                    st.session_state.ilac_degisiklikleri.append({
+                        'tarih': datetime.now(),
+                        'durum': 'Onaylandı',
+                        'degisiklik': yama.description,
+                        'surum': surum,
+                        'yama': yama.patch_id
+                    })
+                    for uyari in uyarilar:
+                        st.warning(f"⚠️ {uyari}")
+                    st.dataframe(pd.DataFrame(yama.summary_rows()), use_container_width=True)
+                    st.success(f"✅ İlaç programı güncellendi! (Sürüm {surum})")
     
     with col_onay2:
         if st.button("❌ Hayır, İptal Et", use_container_width=True):
@@ -607,6 +639,30 @@ elif page == "💊 İlaç Programı":
         if st.button("✏️ Değiştir", use_container_width=True):
             st.write("Kendi önerinizi yazın...")
 
+    if st.button("↩️ Son Program Değişikliğini Geri Al"):
+        program = load_json_file('complete_drug_program.json')
+
+        def geri_al(veri):
+            magaza = ProgramVersionStore(program, veri.get('program_patches', {}))
+            return magaza.rollback(), magaza.version
+
+        try:
+            _, (geri_alinan, surum) = FarmStore('farm_data.json').update(geri_al)
+        except PatchConflict as e:
+            st.error(f"⛔ Geri alınamadı: {e}")
+        else:
+            if geri_alinan is None:
+                st.info("Geri alınacak değişiklik yok.")
+            else:
+                st.session_state.ilac_degisiklikleri.append({
+                    'tarih': datetime.now(),
+                    'durum': 'Geri Alındı',
+                    'degisiklik': geri_alinan['description'],
+                    'surum': surum,
+                    'yama': geri_alinan['patch_id']
+                })
+                st.success(f"↩️ '{geri_alinan['description']}' geri alındı (Sürüm {surum})")
+
 # ============================================
 # 6. AI BİLGİ BANKASI SAYFASI
 # ============================================
@@ -665,22 +721,19 @@ elif page == "📊 Durum Analizi":
     gunluk = st.session_state.gunluk_veriler
     
     if gunluk:
-        toplam_olum = sum([sum(v['olum']) for v in gunluk.values() if isinstance(v, dict)])
-        toplam_hayvan = sum(st.session_state.ayarlar['kumes_civciv'][:4])
-        olum_orani = (toplam_olum / toplam_hayvan * 100) if toplam_hayvan > 0 else 0
-        saglik_puani = max(0, 100 - (olum_orani * 2))
+        kpi = hesapla_kpi(gunluk, st.session_state.yem_irsaliyesi)
         
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Sağlık Puanı", f"{saglik_puani:.0f}/100")
+            st.metric("EPEF", f"{kpi['epef']:.0f}", help=kpi['grade'])
         
         with col2:
-            risk = "Düşük" if saglik_puani > 80 else "Orta" if saglik_puani > 60 else "Yüksek"
+            risk = "Düşük" if kpi['epef'] >= 300 else "Orta" if kpi['epef'] >= 250 else "Yüksek"
             st.metric("Risk Seviyesi", risk)
         
         with col3:
-            tavsiye = "Devam Et" if saglik_puani > 80 else "Dikkat Et" if saglik_puani > 60 else "Acil Müdahale"
+            tavsiye = "Devam Et" if kpi['epef'] >= 300 else "Dikkat Et" if kpi['epef'] >= 250 else "Acil Müdahale"
             st.metric("Tavsiye", tavsiye)
     
     st.markdown("---")
@@ -0,0 +1,183 @@
+# Benchmarking Module
+# Archived flocks aggregated into per-day P10/P50/P90 bands stored in farm_data['performance_benchmarks']
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+FLOCK_ARCHIVE_FILE = 'flock_archive.jsonl'
+PERCENTILES = (10, 50, 90)
+MAX_DAY = 42
+
+# Metric -> (label, True when a higher value is better)
+BENCHMARK_METRICS = {
+    'weight': ('Ağırlık (g)', True),
+    'fcr': ('FCR', False),
+    'mortality': ('Kümülatif Ölüm (%)', False),
+}
+
+
+def flock_curves(history: pd.DataFrame, max_day: int = MAX_DAY) -> Dict[str, List[Optional[float]]]:
+    """
+    Per-day farm curves from DashboardAnalytics.get_historical_data(); days
+    without a weighing or feed record are None rather than 0.
+    """
+    curves = {metric: [None] * max_day for metric in BENCHMARK_METRICS}
+    if history.empty:
+        return curves
+    mortality = history['death_rate'].cumsum()
+    for row, cum_mortality in zip(history.itertuples(), mortality):
+        if not 1 <= row.day <= max_day:
+            continue
+        i = int(row.day) - 1
+        curves['weight'][i] = float(row.avg_weight) if row.avg_weight > 0 else None
+        curves['fcr'][i] = float(row.fcr) if row.fcr > 0 else None
+        curves['mortality'][i] = round(float(cum_mortality), 4)
+    return curves
+
+
+def flock_id(farm_data: Dict) -> str:
+    settings = farm_data.get('settings', {})
+    return f"{settings.get('farm_name', '')}:{settings.get('start_date', '')}"
+
+
+def load_archive(path: str = FLOCK_ARCHIVE_FILE) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def archive_flock(farm_data: Dict, history: pd.DataFrame, path: str = FLOCK_ARCHIVE_FILE) -> Dict:
+    """Write (or replace) the current flock's curves in the archive file"""
+    record = {
+        'flock_id': flock_id(farm_data),
+        'archived_at': datetime.now().isoformat(),
+        'days': int(history['day'].max()) if not history.empty else 0,
+        **flock_curves(history),
+    }
+    flocks = [flock for flock in load_archive(path) if flock['flock_id'] != record['flock_id']]
+    flocks.append(record)
+    with open(path, 'w', encoding='utf-8') as f:
+        for flock in flocks:
+            f.write(json.dumps(flock, ensure_ascii=False) + '\n')
+    return record
+
+
+def _stack(flocks: List[Dict], metric: str, max_day: int) -> np.ndarray:
+    """(flocks, days) array with NaN for missing days"""
+    values = np.full((len(flocks), max_day), np.nan)
+    for i, flock in enumerate(flocks):
+        curve = [np.nan if v is None else v for v in flock.get(metric, [])[:max_day]]
+        values[i, :len(curve)] = curve
+    return values
+
+
+def _nanpercentiles(values: np.ndarray) -> List[List[Optional[float]]]:
+    """PERCENTILES x days, None where no flock has data"""
+    bands = np.full((len(PERCENTILES), values.shape[1]), np.nan)
+    has_data = ~np.isnan(values).all(axis=0)
+    if has_data.any():
+        bands[:, has_data] = np.nanpercentile(values[:, has_data], PERCENTILES, axis=0)
+    return [[None if np.isnan(v) else round(float(v), 4) for v in row] for row in bands]
+
+
+def build_benchmark_index(flocks: List[Dict], target_day: int = MAX_DAY, max_day: int = MAX_DAY) -> Dict:
+    """
+    Everything the dashboard needs, computed once at archive time: percentile
+    bands per metric and day, plus bands of FCR(target_day) / FCR(day) for
+    projecting the running flock's final FCR.
+    """
+    target_day = min(max(target_day, 1), max_day)
+    index = {
+        'built_at': datetime.now().isoformat(),
+        'flocks': [flock['flock_id'] for flock in flocks],
+        'percentiles': list(PERCENTILES),
+        'target_day': target_day,
+        'metrics': {},
+    }
+    for metric in BENCHMARK_METRICS:
+        index['metrics'][metric] = _nanpercentiles(_stack(flocks, metric, max_day))
+    fcr = _stack(flocks, 'fcr', max_day)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = fcr[:, [target_day - 1]] / fcr
+    index['fcr_growth'] = _nanpercentiles(growth)
+    return index
+
+
+class BenchmarkIndex:
+    """Read side of farm_data['performance_benchmarks']"""
+
+    def __init__(self, index: Dict):
+        self.index = index or {}
+        self.flock_count = len(self.index.get('flocks', []))
+        self.target_day = self.index.get('target_day', MAX_DAY)
+        self.bands = {
+            metric: np.array(values, dtype=float)
+            for metric, values in self.index.get('metrics', {}).items()
+        }
+        self.fcr_growth = np.array(self.index.get('fcr_growth', []), dtype=float)
+
+    @classmethod
+    def from_farm(cls, farm_data: Dict) -> 'BenchmarkIndex':
+        return cls(farm_data.get('performance_benchmarks', {}))
+
+    @property
+    def empty(self) -> bool:
+        return self.flock_count == 0
+
+    def band(self, metric: str, day: int) -> Optional[np.ndarray]:
+        """(P10, P50, P90) for one day, or None without history"""
+        bands = self.bands.get(metric)
+        if bands is None or not 1 <= day <= bands.shape[1] or np.isnan(bands[:, day - 1]).any():
+            return None
+        return bands[:, day - 1]
+
+    def place(self, metric: str, day: int, value: float) -> Optional[Dict]:
+        """Approximate percentile of today's value among past flocks on the same day"""
+        band = self.band(metric, day)
+        if band is None or not value:
+            return None
+        percentile = float(np.interp(value, band, PERCENTILES)) if band[-1] > band[0] else 50.0
+        higher_is_better = BENCHMARK_METRICS[metric][1]
+        if value < band[0]:
+            label = 'P10 altı'
+        elif value > band[-1]:
+            label = 'P90 üstü'
+        else:
+            label = 'P10–P50' if value <= band[1] else 'P50–P90'
+        return {
+            'value': value, 'p10': band[0], 'p50': band[1], 'p90': band[2],
+            'percentile': percentile, 'label': label,
+            'better_than_median': value >= band[1] if higher_is_better else value <= band[1],
+        }
+
+    def project_fcr(self, current_fcr: float, day: int) -> Optional[Dict]:
+        """Final FCR bands for the running flock, scaled from historical FCR growth"""
+        if not current_fcr or not self.fcr_growth.size or not 1 <= day <= self.fcr_growth.shape[1]:
+            return None
+        growth = self.fcr_growth[:, day - 1]
+        if np.isnan(growth).any():
+            return None
+        return {
+            'day': day,
+            'target_day': self.target_day,
+            'current_fcr': round(current_fcr, 3),
+            **{f'p{p}': round(float(current_fcr * g), 3) for p, g in zip(PERCENTILES, growth)},
+            'flock_count': self.flock_count,
+        }
+
+
+def record_fcr_projection(farm_data: Dict, day: int, current_fcr: float) -> Optional[Dict]:
+    """
+    Keep the day's final-FCR projection in farm_data['fcr_projections']. Called
+    where farm data is saved (daily entry, archiving); the dashboard only reads.
+    """
+    projection = BenchmarkIndex.from_farm(farm_data).project_fcr(current_fcr, day)
+    if projection:
+        farm_data.setdefault('fcr_projections', {})[str(day)] = projection
+    return projection
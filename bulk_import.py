@@ -0,0 +1,196 @@
+# Bulk Import Module
+# Back-fills daily house records from CSV/Excel files in a single transaction
+
+import io
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mobile_ingest import stamp_fields
+
+# Canonical column -> accepted header spellings
+COLUMN_ALIASES = {
+    'day': ['day', 'gün', 'gun'],
+    'house': ['house', 'kümes', 'kumes'],
+    'deaths': ['deaths', 'ölüm', 'olum'],
+    'weight': ['weight', 'ağırlık', 'agirlik', 'avg_weight'],
+    'water': ['water', 'su', 'water_consumption'],
+    'silo': ['silo', 'silo_remaining'],
+}
+
+# Canonical column -> field name used in daily_data records
+RECORD_FIELDS = {
+    'deaths': 'deaths',
+    'weight': 'weight',
+    'water': 'water_consumption',
+    'silo': 'silo_remaining',
+}
+
+CHUNK_SIZE = 500
+
+
+def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    lookup = {alias: canonical for canonical, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    renamed = {col: lookup.get(str(col).strip().lower(), str(col).strip().lower()) for col in df.columns}
+    return df.rename(columns=renamed)
+
+
+def iter_csv_chunks(file_obj, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Parse a CSV file in fixed-size chunks"""
+    for chunk in pd.read_csv(file_obj, chunksize=chunk_size, dtype=str, keep_default_na=False):
+        yield _normalize_columns(chunk)
+
+
+def iter_xlsx_chunks(file_obj, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Parse the first sheet of an XLSX file row by row in read-only mode"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Excel dosyaları için 'openpyxl' paketi gerekli. CSV olarak yükleyebilirsiniz.")
+
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(h) if h is not None else '' for h in header]
+        buffer = []
+        for row in rows:
+            if row is None or all(cell is None for cell in row):
+                continue
+            buffer.append(['' if cell is None else str(cell) for cell in row])
+            if len(buffer) >= chunk_size:
+                yield _normalize_columns(pd.DataFrame(buffer, columns=columns))
+                buffer = []
+        if buffer:
+            yield _normalize_columns(pd.DataFrame(buffer, columns=columns))
+    finally:
+        workbook.close()
+
+
+def read_import_file(file_obj, filename: str) -> pd.DataFrame:
+    """Stream a CSV/XLSX upload into one frame with a 1-based source row number"""
+    if isinstance(file_obj, (bytes, bytearray)):
+        file_obj = io.BytesIO(file_obj)
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        chunks = iter_xlsx_chunks(file_obj)
+    else:
+        chunks = iter_csv_chunks(file_obj)
+    frames = list(chunks)
+    if not frames:
+        return pd.DataFrame(columns=['row'] + list(COLUMN_ALIASES))
+    df = pd.concat(frames, ignore_index=True)
+    df.insert(0, 'row', np.arange(2, len(df) + 2))  # row 1 is the header
+    return df
+
+
+class BulkImporter:
+    """Validates an import frame in one vectorized pass and applies it atomically"""
+
+    def __init__(self, farm_data, max_day: int = 42):
+        self.farm_data = farm_data
+        self.settings = farm_data.get('settings', {})
+        self.max_day = max_day
+
+    def _normalize_house(self, series: pd.Series) -> pd.Series:
+        names = series.astype(str).str.strip()
+        # Bare numbers or K1-style labels refer to "Kümes N"
+        numbers = names.str.extract(r'^(?:[Kk](?:ümes|umes)?\s*)?(\d+)$')[0]
+        return names.where(numbers.isna(), 'Kümes ' + numbers.fillna(''))
+
+    def validate(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+        """Return (clean frame, errors); errors reference source row numbers"""
+        errors = []
+        missing = [col for col in ('day', 'house') if col not in df.columns]
+        if missing:
+            return df.iloc[0:0], [f"Eksik zorunlu sütun(lar): {', '.join(missing)}"]
+        value_columns = [col for col in RECORD_FIELDS if col in df.columns]
+        if not value_columns:
+            return df.iloc[0:0], ["En az bir veri sütunu gerekli: deaths, weight, water, silo"]
+
+        clean = pd.DataFrame({'row': df['row']})
+        clean['day'] = pd.to_numeric(df['day'], errors='coerce')
+        clean['house'] = self._normalize_house(df['house'])
+        for col in value_columns:
+            raw = df[col].astype(str).str.strip().str.replace(',', '.', regex=False)
+            clean[col] = pd.to_numeric(raw.replace('', np.nan), errors='coerce')
+            bad = raw.ne('') & raw.ne('nan') & clean[col].isna()
+            bad |= clean[col] < 0
+            for row in clean.loc[bad, 'row']:
+                errors.append(f"Satır {row}: '{col}' geçersiz veya negatif")
+
+        bad_day = clean['day'].isna() | (clean['day'] % 1 != 0) | ~clean['day'].between(1, self.max_day)
+        for row in clean.loc[bad_day, 'row']:
+            errors.append(f"Satır {row}: gün 1-{self.max_day} arasında tam sayı olmalı")
+
+        houses = self.settings.get('houses', {})
+        bad_house = ~clean['house'].isin(list(houses))
+        for row, house in clean.loc[bad_house, ['row', 'house']].itertuples(index=False):
+            errors.append(f"Satır {row}: bilinmeyen kümes '{house}'")
+
+        if 'deaths' in value_columns:
+            bad_deaths = clean['deaths'].notna() & (clean['deaths'] % 1 != 0)
+            for row in clean.loc[bad_deaths, 'row']:
+                errors.append(f"Satır {row}: ölüm sayısı tam sayı olmalı")
+
+        duplicated = clean.duplicated(['day', 'house'], keep=False) & ~bad_day
+        for row in clean.loc[duplicated, 'row']:
+            errors.append(f"Satır {row}: aynı gün/kümes birden fazla kez var")
+
+        if errors:
+            return clean.iloc[0:0], errors
+
+        clean['day'] = clean['day'].astype(int)
+        if 'deaths' in value_columns:
+            errors.extend(self._check_cumulative_deaths(clean))
+        return (clean.iloc[0:0], errors) if errors else (clean, [])
+
+    def _check_cumulative_deaths(self, clean: pd.DataFrame) -> List[str]:
+        """Imported plus already-stored deaths must not exceed the placed chicks"""
+        daily_data = self.farm_data.get('daily_data', {})
+        imported = clean.dropna(subset=['deaths']).set_index(['house', 'day'])['deaths']
+        errors = []
+        for house, house_info in self.settings.get('houses', {}).items():
+            stored = {
+                int(key[4:]): record.get(house, {}).get('deaths', 0)
+                for key, record in daily_data.items() if key[4:].isdigit()
+            }
+            if house in imported.index.get_level_values(0):
+                stored.update({int(day): value for day, value in imported.loc[house].items()})
+            if sum(stored.values()) > house_info.get('chick_count', 0):
+                errors.append(f"{house}: toplam ölüm başlangıç hayvan sayısını aşıyor")
+        return errors
+
+    def apply(self, clean: pd.DataFrame) -> Dict:
+        """Merge validated rows into daily_data at once; returns a summary for the log"""
+        value_columns = [col for col in RECORD_FIELDS if col in clean.columns]
+        staged: Dict[str, Dict[str, Dict]] = {}
+        for row in clean.itertuples(index=False):
+            record = staged.setdefault(f'day_{row.day}', {}).setdefault(row.house, {})
+            for col in value_columns:
+                value = getattr(row, col)
+                if not pd.isna(value):
+                    record[RECORD_FIELDS[col]] = int(value) if col == 'deaths' else float(value)
+
+        # Build the merged result first so a failure leaves farm_data untouched
+        daily_data = self.farm_data.get('daily_data', {})
+        merged = {}
+        for day_key, houses in staged.items():
+            day_records = dict(daily_data.get(day_key, {}))
+            for house, fields in houses.items():
+                day_records[house] = {**day_records.get(house, {}), **fields}
+            merged[day_key] = day_records
+        self.farm_data.setdefault('daily_data', {}).update(merged)
+        for day_key, houses in staged.items():
+            for house, fields in houses.items():
+                stamp_fields(self.farm_data, int(day_key[4:]), house, fields)
+
+        return {
+            'rows': len(clean),
+            'days': int(clean['day'].nunique()),
+            'houses': int(clean['house'].nunique()),
+            'first_day': int(clean['day'].min()),
+            'last_day': int(clean['day'].max()),
+        }
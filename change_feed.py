@@ -0,0 +1,161 @@
+# Change Feed Module
+# In-process publish/subscribe of committed farm changes, plus the per-section versions that
+# let caches refresh only what another session changed
+#
+# Sessions in this process hear about a commit through the bus; commits from other
+# processes are picked up from the store's feed file (farm_changes.jsonl).
+
+import itertools
+import threading
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Pending batches a subscriber may fall behind by before it must resync from the feed file
+MAX_PENDING = 256
+
+# id(farm_data) -> (farm_data, token); the dict is held so its id cannot be reused while it has
+# a token, and tokens are never reissued, so a collected farm's cache keys cannot match a new one
+_farm_tokens: 'OrderedDict[int, tuple]' = OrderedDict()
+_FARM_TOKENS_SIZE = 32
+_next_token = itertools.count(1)
+_tokens_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """Which part of a farm one committed change touched"""
+    farm: str
+    section: str  # top-level farm_data key: 'daily_data', 'settings', 'feed_invoices', ...
+    house: Optional[str] = None
+    day: Optional[int] = None
+    seq: int = 0
+
+    def label(self) -> str:
+        if self.house and self.day:
+            return f"{self.house} {self.day}. gün"
+        if self.house:
+            return f"{self.house} ayarları"
+        return SECTION_LABELS.get(self.section, self.section)
+
+
+SECTION_LABELS = {
+    'daily_data': 'günlük veriler',
+    'settings': 'ayarlar',
+    'feed_invoices': 'yem faturaları',
+    'financial_data': 'finansal veriler',
+    'drug_inventory': 'ilaç envanteri',
+    'drug_program': 'ilaç programı',
+    'program_patches': 'ilaç programı değişiklikleri',
+    'chat_history': 'AI sohbet geçmişi',
+    'anomaly_alerts': 'anomali uyarıları',
+    'anomaly_state': 'anomali durumu',
+    'metadata': 'işlem kaydı',
+}
+
+
+def change_event(farm: str, entry: Dict) -> ChangeEvent:
+    """ChangeEvent for one farm store feed entry (its key is a JSON pointer)"""
+    tokens = [t.replace('~1', '/').replace('~0', '~') for t in entry['key'].split('/')[1:]]
+    section = tokens[0] if tokens else ''
+    house, day = None, None
+    if section == 'daily_data' and len(tokens) >= 2:
+        day = int(tokens[1].replace('day_', '')) if tokens[1].startswith('day_') else None
+        house = tokens[2] if len(tokens) >= 3 else None
+    elif tokens[:2] == ['settings', 'houses'] and len(tokens) >= 3:
+        house = tokens[2]
+    return ChangeEvent(farm, section, house, day, entry.get('seq', 0))
+
+
+# ============ SECTION VERSIONS ============
+# metadata.data_version counts this session's own edits (and invalidates everything);
+# metadata.section_versions counts changes applied from other sessions, per section.
+
+def bump_sections(farm_data: Dict, sections: Iterable[str]):
+    versions = farm_data.setdefault('metadata', {}).setdefault('section_versions', {})
+    for section in set(sections):
+        versions[section] = versions.get(section, 0) + 1
+
+
+def section_version(farm_data: Dict, sections: Optional[Tuple[str, ...]] = None) -> int:
+    """Monotonic version of the given sections (all sections when None)"""
+    metadata = farm_data.get('metadata', {})
+    versions = metadata.get('section_versions', {})
+    if sections is None:
+        remote = sum(versions.values())
+    else:
+        remote = sum(versions.get(section, 0) for section in sections)
+    return metadata.get('data_version', 0) + remote
+
+
+def farm_token(farm_data: Dict) -> int:
+    """Process-unique identity of a farm_data object for derived-data cache keys"""
+    with _tokens_lock:
+        entry = _farm_tokens.get(id(farm_data))
+        if entry is None or entry[0] is not farm_data:
+            entry = (farm_data, next(_next_token))
+            _farm_tokens[id(farm_data)] = entry
+            if len(_farm_tokens) > _FARM_TOKENS_SIZE:
+                _farm_tokens.popitem(last=False)
+        else:
+            _farm_tokens.move_to_end(id(farm_data))
+    return entry[1]
+
+
+# ============ PUB/SUB ============
+
+class Subscription:
+    """A subscriber's queue of (feed entries, feed offset after them) batches"""
+
+    def __init__(self, topic: str, max_pending: int = MAX_PENDING):
+        self.topic = topic
+        self._pending = deque()
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self.overflowed = False
+
+    def _push(self, batch: Tuple[List[Dict], int]):
+        with self._lock:
+            if len(self._pending) >= self._max_pending:
+                self._pending.clear()
+                self.overflowed = True
+            self._pending.append(batch)
+
+    def pending(self) -> bool:
+        return bool(self._pending) or self.overflowed
+
+    def drain(self) -> Tuple[List[Tuple[List[Dict], int]], bool]:
+        """(batches, overflowed); after an overflow the batches are incomplete"""
+        with self._lock:
+            batches, overflowed = list(self._pending), self.overflowed
+            self._pending.clear()
+            self.overflowed = False
+        return batches, overflowed
+
+
+class ChangeBus:
+    """Topic -> subscribers; subscriptions are held weakly and vanish with their session"""
+
+    def __init__(self):
+        self._topics: Dict[str, 'weakref.WeakSet[Subscription]'] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(topic)
+        with self._lock:
+            self._topics.setdefault(topic, weakref.WeakSet()).add(subscription)
+        return subscription
+
+    def publish(self, topic: str, entries: List[Dict], feed_offset: int):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            subscription._push((entries, feed_offset))
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(self._topics.get(topic, ()))
+
+
+# Shared by every session of this process
+BUS = ChangeBus()
@@ -0,0 +1,126 @@
+# Chart Data Module
+# Point-budgeted trace building and per-data-version figure caching for Plotly charts
+
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from change_feed import farm_token, section_version
+from metrics import record_cache
+
+# Points per trace for a chart filling the page width / half of it
+POINT_BUDGETS = {'full': 1200, 'half': 600}
+
+# Above this many points per trace, render with WebGL (Scattergl)
+WEBGL_THRESHOLD = 1000
+
+
+def lttb(x, y, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last point and, for every bucket in between, the point
+    forming the largest triangle with the previously kept point and the mean
+    of the next bucket. Shape (peaks, drops) survives much better than with
+    stride sampling. NaN points are dropped first.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=int)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        bucket_start = int(i * every) + 1
+        bucket_end = int((i + 1) * every) + 1
+        next_start = bucket_end
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[a] - avg_x) * (y[bucket_start:bucket_end] - y[a])
+            - (x[a] - x[bucket_start:bucket_end]) * (avg_y - y[a])
+        )
+        a = bucket_start + int(np.argmax(areas))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def make_line_trace(x, y, budget: int = POINT_BUDGETS['full'], **kwargs):
+    """Scatter trace downsampled to the budget; Scattergl when the series is large"""
+    x_arr = np.asarray(x)
+    raw_points = len(x_arr)
+    if raw_points > budget:
+        x, y = lttb(x_arr, y, budget)
+    trace_type = go.Scattergl if raw_points > WEBGL_THRESHOLD else go.Scatter
+    if trace_type is go.Scattergl:
+        # fill='tonexty' across trace types is unsupported in WebGL
+        kwargs.pop('fill', None)
+    return trace_type(x=x, y=y, **kwargs)
+
+
+def make_bar_trace(x, y, budget: int = POINT_BUDGETS['full'], **kwargs) -> go.Bar:
+    """Bar trace downsampled to the budget (colour arrays are resampled along with y)"""
+    if len(x) > budget:
+        x, y = lttb(x, y, budget)
+        marker = kwargs.get('marker')
+        if isinstance(marker, dict) and 'color' in marker and not isinstance(marker['color'], str):
+            kwargs['marker'] = {**marker, 'color': y}
+    return go.Bar(x=x, y=y, **kwargs)
+
+
+class FigureCache:
+    """LRU cache of serialized figures keyed by chart name and data version"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, str]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: Hashable, builder: Callable[[], go.Figure]) -> go.Figure:
+        serialized = self._entries.get(key)
+        record_cache('figure', serialized is not None)
+        if serialized is None:
+            self.misses += 1
+            serialized = builder().to_json()
+            self._entries[key] = serialized
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return pio.from_json(serialized)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Shared across reruns and sessions; keys carry the data version
+figure_cache = FigureCache()
+
+
+def get_data_version(farm_data) -> int:
+    return farm_data.get('metadata', {}).get('data_version', 0)
+
+
+def farm_cache_key(farm_data) -> tuple:
+    """Identity of one farm_data snapshot for derived-data caches"""
+    return section_cache_key(farm_data, None)
+
+
+def section_cache_key(farm_data, sections) -> tuple:
+    """Like farm_cache_key, but changes from other sessions outside these sections keep it stable"""
+    settings = farm_data.get('settings', {})
+    return (farm_token(farm_data), settings.get('farm_name'), settings.get('start_date'),
+            section_version(farm_data, sections))
@@ -4,8 +4,107 @@ import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 import numpy as np
-from typing import Dict
+from collections import OrderedDict
+from typing import Dict, Optional
 
+from plotly.subplots import make_subplots
+
+from anomaly_detection import get_active_alerts
+from benchmarking import BENCHMARK_METRICS, BenchmarkIndex
+from farm_records import FarmRecords
+from kpi_engine import KPI_SECTIONS, get_flock_kpis
+from instrumentation import instrument_methods
+from metrics import record_cache
+from reference_cache import day_table
+from chart_data import POINT_BUDGETS, figure_cache, make_bar_trace, make_line_trace, section_cache_key
+
+# Per-house frames shared by the farm dashboard and the house drill-down
+_house_frame_cache: 'OrderedDict[tuple, pd.DataFrame]' = OrderedDict()
+_HOUSE_FRAME_CACHE_SIZE = 8
+# farm_data sections the house frame and the dashboard charts are built from
+DASHBOARD_SECTIONS = ('daily_data', 'settings')
+
+FEED_ESTIMATED_HELP = "Tahmini: yem tüketimi kaydı ve yem faturası yok, Banvit hayvan başı yem standardı kullanıldı"
+
+
+def build_house_frame(farm_data, banvit_data, current_day: int, records: Optional[FarmRecords] = None) -> pd.DataFrame:
+    """
+    Long (day, house) frame with bird-weighted inputs for every house.
+
+    daily_data is read once into (day x house) arrays; live birds, cumulative
+    mortality and deviations from the Ross targets are then computed with
+    array operations for all houses at the same time.
+    """
+    records = records or FarmRecords.from_farm(farm_data)
+    houses = [house.name for house in records.houses]
+    n_days, n_houses = current_day, len(houses)
+    fields = ('deaths', 'weight', 'water_consumption', 'silo_remaining', 'feed_consumed')
+    arrays = {field: np.zeros((n_days, n_houses)) for field in fields}
+
+    for d in range(n_days):
+        for h, record in enumerate(records.day(d + 1)):
+            if record.recorded:
+                arrays['deaths'][d, h] = record.deaths
+                arrays['weight'][d, h] = record.weight
+                arrays['water_consumption'][d, h] = record.water_consumption
+                arrays['silo_remaining'][d, h] = record.silo_remaining
+                arrays['feed_consumed'][d, h] = record.feed_consumed or 0
+
+    initial = np.array([house.chick_count for house in records.houses], dtype=float)
+    cum_deaths = np.cumsum(arrays['deaths'], axis=0)
+    live = np.maximum(initial - cum_deaths, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily_death_rate = np.where(initial > 0, arrays['deaths'] / initial * 100, 0)
+        cum_death_rate = np.where(initial > 0, cum_deaths / initial * 100, 0)
+
+    days = np.arange(1, n_days + 1)
+    standards = day_table(banvit_data)
+    ross_weight = np.array(standards.series('canlı_ağırlık', n_days), dtype=float)
+    ross_fcr = np.array(standards.series('fcr', n_days), dtype=float)
+    weight = arrays['weight']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight_deviation = np.where(
+            (ross_weight[:, None] > 0) & (weight > 0),
+            (weight - ross_weight[:, None]) / ross_weight[:, None] * 100, 0
+        )
+        biomass_kg = live * weight / 1000
+        fcr = np.where((biomass_kg > 0) & (arrays['feed_consumed'] > 0), arrays['feed_consumed'] / biomass_kg, 0)
+
+    return pd.DataFrame({
+        'day': np.repeat(days, n_houses),
+        'house': np.tile(houses, n_days),
+        'initial_birds': np.tile(initial, n_days),
+        'deaths': arrays['deaths'].ravel(),
+        'cum_deaths': cum_deaths.ravel(),
+        'live_birds': live.ravel(),
+        'death_rate': daily_death_rate.ravel(),
+        'cum_death_rate': cum_death_rate.ravel(),
+        'avg_weight': weight.ravel(),
+        'water': arrays['water_consumption'].ravel(),
+        'silo_remaining': arrays['silo_remaining'].ravel(),
+        'feed_consumed': arrays['feed_consumed'].ravel(),
+        'ross_weight': np.repeat(ross_weight, n_houses),
+        'ross_fcr': np.repeat(ross_fcr, n_houses),
+        'weight_deviation': weight_deviation.ravel(),
+        'fcr': fcr.ravel(),
+    })
+
+
+def get_house_frame(farm_data, banvit_data, current_day: int) -> pd.DataFrame:
+    """Cached build_house_frame; rebuilt only when the data version or day changes"""
+    key = (section_cache_key(farm_data, DASHBOARD_SECTIONS), current_day)
+    frame = _house_frame_cache.get(key)
+    record_cache('house_frame', frame is not None)
+    if frame is None:
+        frame = build_house_frame(farm_data, banvit_data, current_day)
+        _house_frame_cache[key] = frame
+        if len(_house_frame_cache) > _HOUSE_FRAME_CACHE_SIZE:
+            _house_frame_cache.popitem(last=False)
+    else:
+        _house_frame_cache.move_to_end(key)
+    return frame
+
+@instrument_methods
 class DashboardAnalytics:
     """Advanced dashboard and analytics system"""
     
@@ -18,66 +117,57 @@ class DashboardAnalytics:
         self.avg_weight = avg_weight
         self.fcr = fcr
         self.death_rate = death_rate
+        self._history = None
+
+    def _chart_cache_key(self, chart: str, budget: int, sections: tuple = DASHBOARD_SECTIONS) -> tuple:
+        return (chart, section_cache_key(self.farm_data, sections), self.current_day, budget)
+
+    def get_house_data(self) -> pd.DataFrame:
+        """Per-house daily frame (shared cache)"""
+        return get_house_frame(self.farm_data, self.banvit_data, self.current_day)
     
     def get_historical_data(self) -> pd.DataFrame:
-        """Extract historical daily data"""
-        data = []
-        for day in range(1, self.current_day + 1):
-            day_key = f'day_{day}'
-            day_data = self.farm_data.get('daily_data', {}).get(day_key, {})
-            
-            total_live = 0
-            total_deaths = 0
-            total_weight = 0
-            house_count = 0
-            
-            for house_name in self.settings['houses'].keys():
-                house_data = day_data.get(house_name, {})
-                total_live += house_data.get('live', 0)
-                total_deaths += house_data.get('deaths', 0)
-                total_weight += house_data.get('avg_weight', 0)
-                house_count += 1
-            
-            if house_count > 0:
-                avg_weight = total_weight / house_count
-            else:
-                avg_weight = 0
-            
-            # Get Ross targets
-            day_str = str(day)
-            ross_weight = self.banvit_data.get(day_str, {}).get('canlı_ağırlık', 0)
-            ross_fcr = self.banvit_data.get(day_str, {}).get('fcr', 0)
-            
-            # Calculate FCR
-            total_feed_consumed = sum([
-                day_data.get(h, {}).get('feed_consumed', 0) 
-                for h in self.settings['houses'].keys()
-            ])
-            
-            if total_live > 0 and total_feed_consumed > 0:
-                fcr = total_feed_consumed / (total_live * avg_weight / 1000) if avg_weight > 0 else 0
-            else:
-                fcr = 0
-            
-            # Calculate death rate
-            initial_birds = sum([h['chick_count'] for h in self.settings['houses'].values()])
-            death_rate = (total_deaths / initial_birds * 100) if initial_birds > 0 else 0
-            
-            data.append({
-                'day': day,
-                'date': (datetime.now() - timedelta(days=self.current_day - day)).date(),
-                'live_birds': total_live,
-                'deaths': total_deaths,
-                'death_rate': death_rate,
-                'avg_weight': avg_weight,
-                'ross_weight': ross_weight,
-                'weight_deviation': ((avg_weight - ross_weight) / ross_weight * 100) if ross_weight > 0 else 0,
-                'fcr': fcr,
-                'ross_fcr': ross_fcr,
-                'fcr_deviation': fcr - ross_fcr if ross_fcr > 0 else 0
-            })
-        
-        return pd.DataFrame(data)
+        """Farm-level daily data aggregated from the per-house frame"""
+        if self._history is not None:
+            return self._history
+
+        house_df = self.get_house_data()
+        if house_df.empty:
+            self._history = pd.DataFrame()
+            return self._history
+
+        # Bird-weighted mean weight over the houses that reported a weight
+        weighed = house_df['avg_weight'] > 0
+        house_df = house_df.assign(
+            weighted_weight=house_df['avg_weight'] * house_df['live_birds'],
+            weighed_birds=house_df['live_birds'].where(weighed, 0),
+        )
+        df = house_df.groupby('day', sort=True).agg(
+            live_birds=('live_birds', 'sum'),
+            deaths=('deaths', 'sum'),
+            initial_birds=('initial_birds', 'sum'),
+            weighted_weight=('weighted_weight', 'sum'),
+            weighed_birds=('weighed_birds', 'sum'),
+            ross_weight=('ross_weight', 'first'),
+            ross_fcr=('ross_fcr', 'first'),
+        ).reset_index()
+
+        df['avg_weight'] = np.where(df['weighed_birds'] > 0, df['weighted_weight'] / df['weighed_birds'].where(df['weighed_birds'] > 0, 1), 0)
+        df['death_rate'] = np.where(df['initial_birds'] > 0, df['deaths'] / df['initial_birds'].where(df['initial_birds'] > 0, 1) * 100, 0)
+        # Cumulative FCR from the KPI engine (feed reconciled to deliveries), comparable to the Ross FCR
+        df['fcr'] = get_flock_kpis(self.farm_data, self.banvit_data, self.current_day).farm_fcr()[df['day'].to_numpy() - 1]
+        df['weight_deviation'] = np.where(
+            (df['ross_weight'] > 0) & (df['avg_weight'] > 0),
+            (df['avg_weight'] - df['ross_weight']) / df['ross_weight'].where(df['ross_weight'] > 0, 1) * 100, 0
+        )
+        df['fcr_deviation'] = np.where(df['ross_fcr'] > 0, df['fcr'] - df['ross_fcr'], 0)
+        df['date'] = [(datetime.now() - timedelta(days=self.current_day - day)).date() for day in df['day']]
+
+        self._history = df[[
+            'day', 'date', 'live_birds', 'deaths', 'death_rate', 'avg_weight', 'ross_weight',
+            'weight_deviation', 'fcr', 'ross_fcr', 'fcr_deviation'
+        ]]
+        return self._history
     
     def calculate_kpis(self) -> Dict:
         """Calculate key performance indicators"""
@@ -103,13 +193,13 @@ class DashboardAnalytics:
         initial_birds = sum([h['chick_count'] for h in self.settings['houses'].values()])
         cumulative_death_rate = (total_deaths / initial_birds * 100) if initial_birds > 0 else 0
         
-        # Calculate health score
-        health_score = self._calculate_health_score(df)
-        
+        # Industry KPIs from the shared engine (also used by app.py)
+        flock = get_flock_kpis(self.farm_data, self.banvit_data, self.current_day).farm(self.current_day)
+
         # Performance vs targets
         avg_weight_vs_target = latest['weight_deviation'] if not df.empty else 0
         fcr_vs_target = latest['fcr_deviation'] if not df.empty else 0
-        
+
         return {
             'current_day': self.current_day,
             'live_birds': int(latest['live_birds']) if not df.empty else 0,
@@ -123,69 +213,24 @@ class DashboardAnalytics:
             'ross_fcr': latest['ross_fcr'] if not df.empty else 0,
             'fcr_vs_target': fcr_vs_target,
             'fcr_trend': fcr_trend,
-            'health_score': health_score,
-            'performance_grade': self._get_performance_grade(health_score)
+            'livability': flock['livability'],
+            'daily_gain': flock['daily_gain'],
+            'feed_per_bird': flock['feed_per_bird'],
+            'cumulative_fcr': flock['fcr'],
+            'corrected_fcr': flock['cfcr'],
+            'epef': flock['epef'],
+            'performance_grade': flock['grade'],
+            'feed_estimated': flock['feed_estimated'],
         }
     
-    def _calculate_health_score(self, df: pd.DataFrame) -> float:
-        """Calculate overall health score (0-100)"""
-        if df.empty:
-            return 50
-        
-        latest = df.iloc[-1]
-        score = 100
-        
-        # Death rate impact (max -30 points)
-        if latest['death_rate'] > 2:
-            score -= 30
-        elif latest['death_rate'] > 1:
-            score -= 20
-        elif latest['death_rate'] > 0.5:
-            score -= 10
-        
-        # Weight deviation impact (max -25 points)
-        weight_dev = abs(latest['weight_deviation'])
-        if weight_dev > 15:
-            score -= 25
-        elif weight_dev > 10:
-            score -= 15
-        elif weight_dev > 5:
-            score -= 10
-        
-        # FCR deviation impact (max -20 points)
-        fcr_dev = latest['fcr_deviation']
-        if fcr_dev > 0.15:
-            score -= 20
-        elif fcr_dev > 0.1:
-            score -= 15
-        elif fcr_dev > 0.05:
-            score -= 10
-        
-        # Trend impact (max -15 points)
-        if latest['fcr'] > latest['ross_fcr'] and len(df) > 1:
-            fcr_trend = latest['fcr'] - df.iloc[-2]['fcr']
-            if fcr_trend > 0.05:
-                score -= 10
-        
-        return max(0, min(100, score))
-    
-    def _get_performance_grade(self, score: float) -> str:
-        """Get performance grade based on health score"""
-        if score >= 90:
-            return "🌟 Mükemmel"
-        elif score >= 80:
-            return "⭐ Çok İyi"
-        elif score >= 70:
-            return "✅ İyi"
-        elif score >= 60:
-            return "⚠️ Orta"
-        elif score >= 50:
-            return "🟡 Zayıf"
-        else:
-            return "🔴 Kritik"
-    
-    def create_weight_chart(self) -> go.Figure:
+    def create_weight_chart(self, budget: int = POINT_BUDGETS['half']) -> go.Figure:
         """Create weight progress chart"""
+        return figure_cache.get_or_build(
+            self._chart_cache_key('weight', budget),
+            lambda: self._build_weight_chart(budget)
+        )
+
+    def _build_weight_chart(self, budget: int) -> go.Figure:
         df = self.get_historical_data()
         
         if df.empty:
@@ -194,9 +239,10 @@ class DashboardAnalytics:
         fig = go.Figure()
         
         # Actual weight
-        fig.add_trace(go.Scatter(
-            x=df['day'],
-            y=df['avg_weight'],
+        fig.add_trace(make_line_trace(
+            df['day'],
+            df['avg_weight'],
+            budget=budget,
             mode='lines+markers',
             name='Gerçek Ağırlık',
             line=dict(color='#1f77b4', width=3),
@@ -204,9 +250,10 @@ class DashboardAnalytics:
         ))
         
         # Ross target
-        fig.add_trace(go.Scatter(
-            x=df['day'],
-            y=df['ross_weight'],
+        fig.add_trace(make_line_trace(
+            df['day'],
+            df['ross_weight'],
+            budget=budget,
             mode='lines',
             name='Ross Hedefi',
             line=dict(color='#ff7f0e', width=2, dash='dash'),
@@ -217,18 +264,20 @@ class DashboardAnalytics:
         upper_bound = df['ross_weight'] * 1.1
         lower_bound = df['ross_weight'] * 0.9
         
-        fig.add_trace(go.Scatter(
-            x=df['day'],
-            y=upper_bound,
+        fig.add_trace(make_line_trace(
+            df['day'],
+            upper_bound,
+            budget=budget,
             fill=None,
             mode='lines',
             line_color='rgba(0,0,0,0)',
             showlegend=False
         ))
         
-        fig.add_trace(go.Scatter(
-            x=df['day'],
-            y=lower_bound,
+        fig.add_trace(make_line_trace(
+            df['day'],
+            lower_bound,
+            budget=budget,
             fill='tonexty',
             mode='lines',
             line_color='rgba(0,0,0,0)',
@@ -246,8 +295,15 @@ class DashboardAnalytics:
         
         return fig
     
-    def create_fcr_chart(self) -> go.Figure:
+    def create_fcr_chart(self, budget: int = POINT_BUDGETS['half']) -> go.Figure:
         """Create FCR progress chart"""
+        return figure_cache.get_or_build(
+            # The FCR comes from the KPI engine, which also reads the feed invoices
+            self._chart_cache_key('fcr', budget, KPI_SECTIONS),
+            lambda: self._build_fcr_chart(budget)
+        )
+
+    def _build_fcr_chart(self, budget: int) -> go.Figure:
         df = self.get_historical_data()
         
         if df.empty:
@@ -256,9 +312,10 @@ class DashboardAnalytics:
         fig = go.Figure()
         
         # Actual FCR
-        fig.add_trace(go.Scatter(
-            x=df['day'],
-            y=df['fcr'],
+        fig.add_trace(make_line_trace(
+            df['day'],
+            df['fcr'],
+            budget=budget,
             mode='lines+markers',
             name='Gerçek FCR',
             line=dict(color='#2ca02c', width=3),
@@ -266,9 +323,10 @@ class DashboardAnalytics:
         ))
         
         # Ross target
-        fig.add_trace(go.Scatter(
-            x=df['day'],
-            y=df['ross_fcr'],
+        fig.add_trace(make_line_trace(
+            df['day'],
+            df['ross_fcr'],
+            budget=budget,
             mode='lines',
             name='Ross Hedefi',
             line=dict(color='#d62728', width=2, dash='dash'),
@@ -285,8 +343,14 @@ class DashboardAnalytics:
         
         return fig
     
-    def create_mortality_chart(self) -> go.Figure:
+    def create_mortality_chart(self, budget: int = POINT_BUDGETS['full']) -> go.Figure:
         """Create mortality rate chart"""
+        return figure_cache.get_or_build(
+            self._chart_cache_key('mortality', budget),
+            lambda: self._build_mortality_chart(budget)
+        )
+
+    def _build_mortality_chart(self, budget: int) -> go.Figure:
         df = self.get_historical_data()
         
         if df.empty:
@@ -294,9 +358,10 @@ class DashboardAnalytics:
         
         fig = go.Figure()
         
-        fig.add_trace(go.Bar(
-            x=df['day'],
-            y=df['death_rate'],
+        fig.add_trace(make_bar_trace(
+            df['day'],
+            df['death_rate'],
+            budget=budget,
             name='Günlük Ölüm Oranı (%)',
             marker=dict(color=df['death_rate'], colorscale='RdYlGn_r', showscale=True)
         ))
@@ -317,6 +382,125 @@ class DashboardAnalytics:
         
         return fig
 
+    def create_house_small_multiples(self, budget: int = POINT_BUDGETS['half']) -> go.Figure:
+        """Weight vs Ross target, one panel per house"""
+        return figure_cache.get_or_build(
+            self._chart_cache_key('house_weight', budget),
+            lambda: self._build_house_small_multiples(budget)
+        )
+
+    def _build_house_small_multiples(self, budget: int) -> go.Figure:
+        house_df = self.get_house_data()
+        houses = list(self.settings['houses'].keys())
+        if house_df.empty or not houses:
+            return go.Figure()
+
+        cols = 3 if len(houses) > 4 else 2
+        rows = -(-len(houses) // cols)
+        fig = make_subplots(rows=rows, cols=cols, subplot_titles=houses, shared_xaxes=True)
+        for i, (house_name, group) in enumerate(house_df.groupby('house', sort=False)):
+            row, col = i // cols + 1, i % cols + 1
+            weighed = group[group['avg_weight'] > 0]
+            fig.add_trace(make_line_trace(
+                weighed['day'], weighed['avg_weight'], budget=budget, mode='lines+markers',
+                name='Gerçek', line=dict(color='#1f77b4', width=2), marker=dict(size=4),
+                showlegend=(i == 0), legendgroup='actual'
+            ), row=row, col=col)
+            fig.add_trace(make_line_trace(
+                group['day'], group['ross_weight'], budget=budget, mode='lines',
+                name='Ross Hedefi', line=dict(color='#ff7f0e', width=1, dash='dash'),
+                showlegend=(i == 0), legendgroup='ross'
+            ), row=row, col=col)
+
+        fig.update_layout(
+            title='🏠 Kümes Bazında Canlı Ağırlık',
+            height=260 * rows,
+            template='plotly_white',
+            margin=dict(t=80)
+        )
+        return fig
+
+    def get_house_summary(self) -> pd.DataFrame:
+        """Latest-day metrics per house, taken from the shared frame"""
+        house_df = self.get_house_data()
+        if house_df.empty:
+            return pd.DataFrame()
+        return house_df[house_df['day'] == self.current_day].set_index('house')
+
+
+def render_house_drilldown(dashboard_analyzer: DashboardAnalytics):
+    """Per-house view; every widget reads the cached frame, so switching houses recomputes nothing"""
+    summary = dashboard_analyzer.get_house_summary()
+    if summary.empty:
+        return
+
+    st.markdown("### Kümes Bazında Analiz")
+    st.plotly_chart(dashboard_analyzer.create_house_small_multiples(), use_container_width=True)
+
+    house_name = st.selectbox("Kümes Seç", list(summary.index), key="dashboard_house_select")
+    row = summary.loc[house_name]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Canlı Hayvan", f"{int(row['live_birds']):,}")
+    with col2:
+        st.metric("Ortalama Ağırlık", f"{row['avg_weight']:.0f} g", f"{row['weight_deviation']:+.1f}% hedef")
+    with col3:
+        st.metric("Kümülatif Ölüm", f"{int(row['cum_deaths']):,}", f"%{row['cum_death_rate']:.2f}", delta_color="inverse")
+    with col4:
+        st.metric("Siloda Kalan (kg)", f"{row['silo_remaining']:,.0f}")
+
+    history = dashboard_analyzer.get_house_data()
+    history = history[history['house'] == house_name]
+    st.dataframe(
+        history[['day', 'live_birds', 'deaths', 'avg_weight', 'ross_weight', 'water', 'silo_remaining']].rename(columns={
+            'day': 'Gün', 'live_birds': 'Canlı', 'deaths': 'Ölüm', 'avg_weight': 'Ağırlık (g)',
+            'ross_weight': 'Ross (g)', 'water': 'Su (L)', 'silo_remaining': 'Silo (kg)'
+        }).set_index('Gün'),
+        use_container_width=True
+    )
+
+def render_benchmarks(dashboard_analyzer: DashboardAnalytics, kpis: Dict):
+    """Today's flock against the precomputed percentile bands of archived flocks"""
+    st.markdown("### 📏 Geçmiş Sürülerle Karşılaştırma")
+    index = BenchmarkIndex.from_farm(dashboard_analyzer.farm_data)
+    if index.empty:
+        st.info("Henüz arşivlenmiş sürü yok. Sürü bitince Ayarlar > Sürü Arşivi'nden ekleyin.")
+        return
+
+    day = dashboard_analyzer.current_day
+    values = {'weight': kpis.get('avg_weight', 0), 'fcr': kpis.get('fcr', 0),
+              'mortality': kpis.get('cumulative_death_rate', 0)}
+    for col, (metric, value) in zip(st.columns(len(values)), values.items()):
+        placement = index.place(metric, day, value)
+        label = BENCHMARK_METRICS[metric][0]
+        if placement is None:
+            col.metric(label, "—", help="Bu gün için geçmiş veri veya bugünkü ölçüm yok")
+        else:
+            col.metric(label, f"{value:.2f}", f"{placement['label']} (P50 {placement['p50']:.2f})",
+                       delta_color="normal" if placement['better_than_median'] else "inverse")
+
+    bands = index.bands.get('weight')
+    history = dashboard_analyzer.get_historical_data()
+    if bands is not None and not history.empty:
+        days = list(range(1, bands.shape[1] + 1))
+        fig = go.Figure([
+            go.Scatter(x=days, y=bands[2], line=dict(width=0), showlegend=False, hoverinfo='skip'),
+            go.Scatter(x=days, y=bands[0], fill='tonexty', line=dict(width=0), name='P10–P90',
+                       fillcolor='rgba(100, 149, 237, 0.2)'),
+            go.Scatter(x=days, y=bands[1], line=dict(dash='dash'), name='P50'),
+            go.Scatter(x=history['day'], y=history['avg_weight'].where(history['avg_weight'] > 0),
+                       mode='lines+markers', name='Bu sürü'),
+        ])
+        fig.update_layout(title=f"Ağırlık ({index.flock_count} sürü)", xaxis_title="Gün", yaxis_title="g")
+        st.plotly_chart(fig, use_container_width=True)
+
+    # Stored by the save paths (benchmarking.record_fcr_projection); rendering never writes farm_data
+    projection = index.project_fcr(kpis.get('fcr', 0), day)
+    if projection:
+        st.caption(f"{projection['target_day']}. gün FCR tahmini: {projection['p50']:.2f} "
+                   f"(P10 {projection['p10']:.2f} – P90 {projection['p90']:.2f})")
+
+
 def render_dashboard(farm_data, banvit_data, current_day, total_live_birds, avg_weight, fcr, death_rate):
     st.title("🏠 Dashboard")
 
@@ -336,11 +520,19 @@ def render_dashboard(farm_data, banvit_data, current_day, total_live_birds, avg_
     with col2:
         st.metric("Ortalama Ağırlık", f"{kpis.get('avg_weight', 0):.2f} g")
     with col3:
-        st.metric("FCR", f"{kpis.get('fcr', 0):.2f}")
+        st.metric("FCR", f"{kpis.get('fcr', 0):.2f}", help=FEED_ESTIMATED_HELP if kpis.get('feed_estimated') else None)
     with col4:
         st.metric("Ölüm Oranı", f"{kpis.get('cumulative_death_rate', 0):.2f}%")
     with col5:
-        st.metric("Sağlık Puanı", f"{kpis.get('health_score', 0):.0f}", help=kpis.get('performance_grade', ''))
+        st.metric("EPEF", f"{kpis.get('epef', 0):.0f}", help=kpis.get('performance_grade', ''))
+
+    col_a, col_b, col_c, col_d = st.columns(4)
+    col_a.metric("Yaşama Gücü", f"%{kpis.get('livability', 0):.2f}")
+    col_b.metric("Günlük Kazanç", f"{kpis.get('daily_gain', 0):.1f} g")
+    col_c.metric("Hayvan Başı Yem", f"{kpis.get('feed_per_bird', 0):.3f} kg")
+    col_d.metric("Düzeltilmiş FCR", f"{kpis.get('corrected_fcr', 0):.3f}", help="2,5 kg'a göre düzeltilmiş kümülatif FCR")
+    with st.expander("Kümes Bazında KPI'lar"):
+        st.dataframe(get_flock_kpis(farm_data, banvit_data, current_day).house_table(current_day), use_container_width=True)
 
     st.markdown("### Performans Analizi")
     col6, col7 = st.columns(2)
@@ -351,7 +543,16 @@ def render_dashboard(farm_data, banvit_data, current_day, total_live_birds, avg_
     
     st.plotly_chart(dashboard_analyzer.create_mortality_chart(), use_container_width=True)
 
+    render_benchmarks(dashboard_analyzer, kpis)
+
+    render_house_drilldown(dashboard_analyzer)
+
     st.markdown("### Uyarılar ve Öneriler")
+    for alert in get_active_alerts(farm_data)[:5]:
+        css_class = 'alert-red' if alert['severity'] == 'critical' else 'alert-yellow'
+        icon = '🔴' if alert['severity'] == 'critical' else '🟡'
+        st.markdown(f"<div class='{css_class}'>{icon} Gün {alert['day']} - {alert['message']}</div>", unsafe_allow_html=True)
+
     # Example alerts based on KPIs
     if kpis.get('cumulative_death_rate', 0) > 2:
         st.markdown("<div class='alert-red'>🔴 KRİTİK UYARI: Ölüm oranı %2'nin üzerinde! Acil müdahale gerekebilir.</div>", unsafe_allow_html=True)
@@ -368,10 +569,10 @@ def render_dashboard(farm_data, banvit_data, current_day, total_live_birds, avg_
     elif kpis.get('fcr_vs_target', 0) > 0.05:
         st.markdown("<div class='alert-yellow'>🟡 UYARI: FCR hedef değerden %0.05'den fazla yüksek. Yem yönetimini gözden geçirin.</div>", unsafe_allow_html=True)
 
-    if kpis.get('health_score', 0) < 60:
-        st.markdown("<div class='alert-red'>🔴 KRİTİK UYARI: Sağlık puanı düşük! Kapsamlı bir inceleme yapılması önerilir.</div>", unsafe_allow_html=True)
-    elif kpis.get('health_score', 0) < 70:
-        st.markdown("<div class='alert-yellow'>🟡 UYARI: Sağlık puanı orta seviyede. Performansı artırmak için önlemler alın.</div>", unsafe_allow_html=True)
+    if kpis.get('epef', 0) < 250:
+        st.markdown("<div class='alert-red'>🔴 KRİTİK UYARI: EPEF 250'nin altında! Kapsamlı bir inceleme yapılması önerilir.</div>", unsafe_allow_html=True)
+    elif kpis.get('epef', 0) < 300:
+        st.markdown("<div class='alert-yellow'>🟡 UYARI: EPEF orta seviyede. Performansı artırmak için önlemler alın.</div>", unsafe_allow_html=True)
 
     st.markdown("<div class='alert-green'>✅ Her şey yolunda görünüyor.</div>", unsafe_allow_html=True)
 
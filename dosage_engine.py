@@ -0,0 +1,141 @@
+# Dosage Engine Module
+# Vectorized drug amounts for every program day, house and water session
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from drug_parser import SESSIONS
+from farm_records import FarmRecords
+from reference_cache import day_table
+
+# Share of the day's drinking water prepared per session (same split as calculate_water_preparation)
+WATER_SPLIT = {'morning': 0.6, 'evening': 0.4}
+
+SESSION_LABELS = {'morning': 'Sabah', 'evening': 'Akşam'}
+
+
+def dose_unit(unit: str) -> str:
+    """'g/1000L' -> 'g', 'ml/1000L' -> 'ml'"""
+    return (unit or 'g/1000L').split('/')[0].strip() or 'g'
+
+
+def project_live_birds(farm_data: Dict, houses: List[str], max_day: int = 42,
+                       records: Optional[FarmRecords] = None) -> np.ndarray:
+    """
+    (days, houses) live bird counts. Recorded deaths are accumulated; days
+    after the last record keep the last known count.
+    """
+    records = records or FarmRecords.from_farm(farm_data)
+    live = [[records.live_birds(house, day) for house in houses] for day in range(1, max_day + 1)]
+    return np.array(live, dtype=float).reshape(max_day, len(houses))
+
+
+def project_water(banvit_data: Dict, live_birds: np.ndarray) -> np.ndarray:
+    """(days, houses) litres from Banvit su_tüketimi (L per 1000 birds) x live birds"""
+    per_1000 = np.array(day_table(banvit_data).series('su_tüketimi', live_birds.shape[0]), dtype=float)
+    return per_1000[:, None] * live_birds / 1000
+
+
+@dataclass
+class DosagePlan:
+    """amounts[day, house, session, drug] in the drug's inventory unit"""
+    houses: List[str]
+    drugs: List[str]
+    units: List[str]
+    water: np.ndarray      # (days, houses, sessions) litres
+    amounts: np.ndarray    # (days, houses, sessions, drugs)
+    unknown_drugs: List[str]
+
+    @property
+    def max_day(self) -> int:
+        return self.amounts.shape[0]
+
+    def session_table(self, day: int) -> pd.DataFrame:
+        """Per house and session amounts for one day, one row per drug"""
+        rows = []
+        for h, house in enumerate(self.houses):
+            for s, session in enumerate(SESSIONS):
+                for k in np.flatnonzero(self.amounts[day - 1, h, s]):
+                    rows.append({
+                        'Kümes': house,
+                        'Seans': SESSION_LABELS[session],
+                        'Su (L)': round(float(self.water[day - 1, h, s]), 0),
+                        'İlaç': self.drugs[k],
+                        'Miktar': round(float(self.amounts[day - 1, h, s, k]), 1),
+                        'Birim': self.units[k],
+                    })
+        return pd.DataFrame(rows, columns=['Kümes', 'Seans', 'Su (L)', 'İlaç', 'Miktar', 'Birim'])
+
+    def daily_totals(self) -> np.ndarray:
+        """(days, drugs) amount summed over houses and sessions"""
+        return self.amounts.sum(axis=(1, 2))
+
+    def purchase_totals(self, inventory: Dict, first_day: int = 1, last_day: int = None) -> pd.DataFrame:
+        """Total need per drug over a day range against current stock"""
+        last_day = last_day or self.max_day
+        needed = self.amounts[first_day - 1:last_day].sum(axis=(0, 1, 2))
+        rows = []
+        for k in np.flatnonzero(needed):
+            stock = inventory.get(self.drugs[k], {}).get('stock', 0) or 0
+            rows.append({
+                'İlaç': self.drugs[k],
+                'Birim': self.units[k],
+                'Gerekli': round(float(needed[k]), 1),
+                'Stok': stock,
+                'Alınacak': round(max(0.0, float(needed[k]) - stock), 1),
+            })
+        return pd.DataFrame(rows, columns=['İlaç', 'Birim', 'Gerekli', 'Stok', 'Alınacak'])
+
+
+def build_dosage_plan(program: Dict[int, Dict], houses: List[str], farm_data: Dict, banvit_data: Dict,
+                      max_day: int = 42, records: Optional[FarmRecords] = None) -> DosagePlan:
+    """
+    One pass over the compiled program records fills a (days, houses, sessions,
+    drugs) dose tensor (prescribed dose, else the drug_inventory dose per 1000 L);
+    amounts are then dose x session water / 1000 in one numpy expression.
+    """
+    inventory = farm_data.get('drug_inventory', {})
+    drugs: List[str] = []
+    units: List[str] = []
+    unknown = set()
+    entries: List[Tuple[int, int, int, int, float]] = []
+    for day in range(1, max_day + 1):
+        entry = program.get(day, {})
+        house_overrides = entry.get('houses', {})
+        for h, house in enumerate(houses):
+            source = house_overrides.get(house, entry)
+            for s, session in enumerate(SESSIONS):
+                for record in source.get(session, []):
+                    drug = record['drug']
+                    if record.get('dose') is not None:
+                        dose, unit = record['dose'], record['unit']
+                    elif drug in inventory and inventory[drug].get('dose'):
+                        dose, unit = inventory[drug]['dose'], dose_unit(inventory[drug].get('unit'))
+                    else:
+                        unknown.add(drug)
+                        continue
+                    if drug not in drugs:
+                        drugs.append(drug)
+                        units.append(unit)
+                    entries.append((day - 1, h, s, drugs.index(drug), float(dose)))
+
+    dose_per_1000 = np.zeros((max_day, len(houses), len(SESSIONS), len(drugs)))
+    if entries:
+        d, h, s, k, dose = (np.array(column) for column in zip(*entries))
+        dose_per_1000[d.astype(int), h.astype(int), s.astype(int), k.astype(int)] = dose
+
+    split = np.array([WATER_SPLIT[session] for session in SESSIONS])
+    water = project_water(banvit_data, project_live_birds(farm_data, houses, max_day, records))[:, :, None] * split
+    amounts = dose_per_1000 * (water[..., None] / 1000)
+
+    return DosagePlan(
+        houses=list(houses),
+        drugs=drugs,
+        units=units,
+        water=water,
+        amounts=amounts,
+        unknown_drugs=sorted(unknown),
+    )
@@ -0,0 +1,130 @@
+# Drug Compatibility Module
+# Pairwise mixing matrix over drug_inventory and same-session validation of the program
+
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from drug_parser import SESSIONS, DrugNameMatcher
+
+STATUS_LABELS = {'compatible': '✅ Uyumlu', 'incompatible': '❌ Uyumsuz', 'unknown': '❔ Doğrulanmadı'}
+
+# An explicitly incompatible pair blocks the session; an unverified pair only warns
+SEVERITY = {'incompatible': 'critical', 'unknown': 'warning'}
+
+
+class CompatibilityMatrix:
+    """
+    Symmetric bool matrices over drug_inventory names: `compatible` from
+    farm_data['drug_compatibility_matrix'] and `incompatible` from the optional
+    farm_data['drug_incompatibility_matrix']. Both map short names ("Neomisin")
+    onto inventory names.
+    """
+
+    def __init__(self, inventory: Dict, compatible: Dict[str, List[str]] = None,
+                 incompatible: Dict[str, List[str]] = None):
+        self.names = sorted(inventory)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self._matcher = DrugNameMatcher(self.names)
+        n = len(self.names)
+        self.compatible = np.eye(n, dtype=bool)
+        self.incompatible = np.zeros((n, n), dtype=bool)
+        self.unmapped: List[str] = []
+        self._fill(self.compatible, compatible or {})
+        self._fill(self.incompatible, incompatible or {})
+        # An explicit conflict wins over a compatibility listing
+        self.compatible &= ~self.incompatible
+
+    @classmethod
+    def from_farm(cls, farm_data: Dict) -> 'CompatibilityMatrix':
+        return cls(farm_data.get('drug_inventory', {}), farm_data.get('drug_compatibility_matrix', {}),
+                   farm_data.get('drug_incompatibility_matrix', {}))
+
+    def _fill(self, matrix: np.ndarray, listing: Dict[str, List[str]]):
+        for name, partners in listing.items():
+            a = self._resolve(name)
+            for partner in partners:
+                b = self._resolve(partner)
+                if a is not None and b is not None:
+                    matrix[a, b] = matrix[b, a] = True
+
+    def _resolve(self, name: str):
+        resolved = self._matcher.match(name)
+        if resolved is None:
+            self.unmapped.append(name)
+            return None
+        return self.index[resolved]
+
+    def status(self, a: str, b: str) -> str:
+        i, j = self.index[a], self.index[b]
+        if self.incompatible[i, j]:
+            return 'incompatible'
+        return 'compatible' if self.compatible[i, j] else 'unknown'
+
+    def conflicts(self, drugs: Iterable[str]) -> List[Tuple[str, str, str]]:
+        """Non-compatible pairs among the inventory drugs of one session, from one submatrix lookup"""
+        idx = sorted({self.index[d] for d in drugs if d in self.index})
+        if len(idx) < 2:
+            return []
+        sub = self.compatible[np.ix_(idx, idx)]
+        pairs = np.argwhere(np.triu(~sub, k=1))
+        return [
+            (self.names[idx[i]], self.names[idx[j]], self.status(self.names[idx[i]], self.names[idx[j]]))
+            for i, j in pairs
+        ]
+
+    def to_frame(self) -> pd.DataFrame:
+        labels = np.where(self.incompatible, STATUS_LABELS['incompatible'],
+                          np.where(self.compatible, STATUS_LABELS['compatible'], STATUS_LABELS['unknown']))
+        np.fill_diagonal(labels, '—')
+        return pd.DataFrame(labels, index=self.names, columns=self.names)
+
+
+class ProgramCompatibilityValidator:
+    """
+    Flags incompatible same-session combinations over the compiled program.
+    Results are kept per day so an edited day is revalidated on its own, and
+    identical drug combinations are only checked once.
+    """
+
+    def __init__(self, matrix: CompatibilityMatrix, program: Dict[int, Dict], houses: List[str], max_day: int = 42):
+        self.matrix = matrix
+        self.houses = list(houses)
+        self.max_day = max_day
+        self._combination_cache: Dict[FrozenSet[str], List[Tuple[str, str, str]]] = {}
+        self._issues: Dict[int, List[Dict]] = {}
+        for day in range(1, max_day + 1):
+            self._validate_day(day, program.get(day, {}))
+
+    def _conflicts(self, drugs: FrozenSet[str]) -> List[Tuple[str, str, str]]:
+        if drugs not in self._combination_cache:
+            self._combination_cache[drugs] = self.matrix.conflicts(drugs)
+        return self._combination_cache[drugs]
+
+    def _validate_day(self, day: int, entry: Dict):
+        house_overrides = entry.get('houses', {})
+        grouped: Dict[Tuple[str, str, str, str], Dict] = {}
+        for house in self.houses:
+            source = house_overrides.get(house, entry)
+            for session in SESSIONS:
+                drugs = frozenset(record['drug'] for record in source.get(session, []))
+                for a, b, status in self._conflicts(drugs):
+                    issue = grouped.setdefault((session, a, b, status), {
+                        'day': day, 'session': session, 'drugs': (a, b),
+                        'status': status, 'severity': SEVERITY[status], 'houses': [],
+                    })
+                    issue['houses'].append(house)
+        if grouped:
+            self._issues[day] = list(grouped.values())
+        else:
+            self._issues.pop(day, None)
+
+    def update_day(self, day: int, entry: Dict):
+        """Revalidate one edited day (compiled entry)"""
+        self._validate_day(day, entry)
+
+    def issues(self, day: int = None, severity: str = None) -> List[Dict]:
+        days = [day] if day is not None else sorted(self._issues)
+        found = [issue for d in days for issue in self._issues.get(d, [])]
+        return [issue for issue in found if severity is None or issue['severity'] == severity]
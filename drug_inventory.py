@@ -0,0 +1,128 @@
+# Drug Inventory Ledger Module
+# Stock movements, confirmed-day consumption, stock-out projection and reorder points
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from dosage_engine import DosagePlan
+
+# Days between placing a drug order and delivery, and extra days of cover kept on hand
+DEFAULT_LEAD_DAYS = 3
+DEFAULT_SAFETY_DAYS = 2
+
+MOVEMENT_LABELS = {'consumption': 'Tüketim', 'purchase': 'Alım', 'adjustment': 'Düzeltme'}
+
+
+class DrugLedger:
+    """
+    Movement history stored in farm_data['drug_ledger']. drug_inventory[*].stock
+    stays the running balance so existing readers keep working; movements are
+    indexed by drug and by day for history queries.
+    """
+
+    def __init__(self, farm_data: Dict):
+        self.farm_data = farm_data
+        self.inventory = farm_data.setdefault('drug_inventory', {})
+        self.ledger = farm_data.setdefault('drug_ledger', {'movements': [], 'confirmed_days': []})
+        self._by_drug: Dict[str, List[int]] = {}
+        self._by_day: Dict[int, List[int]] = {}
+        for position, movement in enumerate(self.ledger['movements']):
+            self._index(position, movement)
+
+    def _index(self, position: int, movement: Dict):
+        self._by_drug.setdefault(movement['drug'], []).append(position)
+        if movement.get('day') is not None:
+            self._by_day.setdefault(movement['day'], []).append(position)
+
+    def record(self, drug: str, quantity: float, kind: str, day: int = None, note: str = '') -> Dict:
+        """Append a signed movement (negative = out) and update the running stock"""
+        if kind not in MOVEMENT_LABELS:
+            raise ValueError(f"Bilinmeyen hareket türü: {kind}")
+        item = self.inventory.setdefault(drug, {'dose': 0, 'unit': 'g/1000L', 'withdrawal': 0, 'stock': 0, 'cost': 0})
+        item['stock'] = round((item.get('stock', 0) or 0) + quantity, 2)
+        movement = {
+            'timestamp': str(datetime.now()),
+            'day': day,
+            'drug': drug,
+            'type': kind,
+            'quantity': round(quantity, 2),
+            'balance': item['stock'],
+            'note': note,
+        }
+        self.ledger['movements'].append(movement)
+        self._index(len(self.ledger['movements']) - 1, movement)
+        return movement
+
+    def is_confirmed(self, day: int) -> bool:
+        return day in self.ledger['confirmed_days']
+
+    def confirm_day(self, day: int, plan: DosagePlan) -> Dict[str, float]:
+        """Deduct one program day's planned amounts of stocked drugs; a day can only be confirmed once"""
+        if self.is_confirmed(day):
+            raise ValueError(f"{day}. gün zaten onaylandı")
+        used = plan.daily_totals()[day - 1]
+        deducted = {}
+        for k in np.flatnonzero(used):
+            drug = plan.drugs[k]
+            if drug not in self.inventory:
+                continue
+            self.record(drug, -float(used[k]), 'consumption', day, note=f"{day}. gün programı")
+            deducted[drug] = round(float(used[k]), 2)
+        self.ledger['confirmed_days'].append(day)
+        return deducted
+
+    def history(self, drug: str = None, day: int = None) -> List[Dict]:
+        movements = self.ledger['movements']
+        if drug is not None and day is not None:
+            positions = sorted(set(self._by_drug.get(drug, [])) & set(self._by_day.get(day, [])))
+        elif drug is not None:
+            positions = self._by_drug.get(drug, [])
+        elif day is not None:
+            positions = self._by_day.get(day, [])
+        else:
+            positions = range(len(movements))
+        return [movements[p] for p in positions]
+
+    def project(self, plan: DosagePlan, from_day: int, lead_days: Optional[int] = None,
+                safety_days: Optional[int] = None) -> pd.DataFrame:
+        """
+        Stock-out day and reorder point for every drug from one cumulative-demand
+        matrix: the stock-out day is where cumulative demand first exceeds stock
+        (searchsorted per drug); the reorder point is the demand over lead time
+        plus safety days.
+        """
+        settings = self.farm_data.get('settings', {})
+        lead_days = settings.get('drug_order_lead_time', DEFAULT_LEAD_DAYS) if lead_days is None else lead_days
+        safety_days = settings.get('drug_safety_days', DEFAULT_SAFETY_DAYS) if safety_days is None else safety_days
+
+        demand = plan.daily_totals()[from_day - 1:].copy()
+        # Days already deducted must not be counted again
+        for day in self.ledger['confirmed_days']:
+            if day >= from_day:
+                demand[day - from_day] = 0
+        cumulative = np.cumsum(demand, axis=0)
+        horizon = min(lead_days + safety_days, len(demand))
+        cover = cumulative[horizon - 1] if horizon > 0 else np.zeros(len(plan.drugs))
+
+        rows = []
+        for k, drug in enumerate(plan.drugs):
+            stock = self.inventory.get(drug, {}).get('stock', 0) or 0
+            remaining = float(cumulative[-1, k]) if len(demand) else 0.0
+            idx = int(np.searchsorted(cumulative[:, k], stock, side='right'))
+            stockout_day = from_day + idx if idx < len(demand) else None
+            reorder_point = float(cover[k])
+            rows.append({
+                'İlaç': drug,
+                'Birim': plan.units[k],
+                'Stok': stock,
+                'Kalan İhtiyaç': round(remaining, 1),
+                'Tükenme Günü': stockout_day,
+                'Sipariş Noktası': round(reorder_point, 1),
+                'Son Sipariş Günü': max(from_day, stockout_day - lead_days) if stockout_day else None,
+                'Sipariş Gerekli': stock <= reorder_point and reorder_point > 0,
+            })
+        return pd.DataFrame(rows, columns=['İlaç', 'Birim', 'Stok', 'Kalan İhtiyaç', 'Tükenme Günü',
+                                           'Sipariş Noktası', 'Son Sipariş Günü', 'Sipariş Gerekli'])
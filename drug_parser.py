@@ -0,0 +1,261 @@
+# Drug Program Parser Module
+# Compiles free-text drug program entries into structured (drug, dose, unit, session) records
+
+import difflib
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SESSIONS = ('morning', 'evening')
+
+# Session keys used by farm_data['drug_program'] and drug_program.json
+LEGACY_SESSION_KEYS = {'morning': 'sabah', 'evening': 'aksam'}
+
+NO_DRUG_MARKERS = {'', '-', 'temiz su', 'yok'}
+
+COMPILED_PROGRAM_FILE = 'compiled_drug_program.json'
+
+# Bump when the record layout or matching rules change so stale disk caches are ignored
+PARSER_VERSION = 2
+
+# "100 mg/L", "0.5-1 g/L su", "10g/100L", "1 mL/L"
+DOSE_PATTERN = re.compile(
+    r'(\d+(?:[.,]\d+)?)(?:\s*-\s*(\d+(?:[.,]\d+)?))?\s*(mg|g|ml)\s*/\s*(\d*)\s*(?:l|lt|litre)\b',
+    re.IGNORECASE
+)
+
+# Amount unit and factor to "per 1000 L" for each prescribed mass/volume unit
+UNIT_FACTORS = {'mg': ('g', 1.0), 'g': ('g', 1000.0), 'ml': ('ml', 1000.0)}
+
+FUZZY_CUTOFF = 0.8
+
+
+def turkish_fold(text: str) -> str:
+    """Case-fold with Turkish dotted/dotless i handled before lowercasing"""
+    return text.replace('İ', 'i').replace('I', 'ı').lower().replace('ı', 'i').replace('ü', 'u') \
+        .replace('ö', 'o').replace('ş', 's').replace('ç', 'c').replace('ğ', 'g').strip()
+
+
+def unwrap_program(program: Dict) -> Dict:
+    """complete_drug_program.json nests its days under 'drug_program_complete'"""
+    return program.get('drug_program_complete', program) if isinstance(program, dict) else {}
+
+
+def get_session_text(entry: Dict, session: str) -> str:
+    """Drug text of a session for either program layout"""
+    value = entry.get(session)
+    if isinstance(value, dict):
+        return value.get('drug', '') or ''
+    if isinstance(value, str):
+        return value
+    return entry.get(LEGACY_SESSION_KEYS[session], '') or ''
+
+
+def get_session_dosage(entry: Dict, session: str) -> str:
+    value = entry.get(session)
+    return (value.get('dosage', '') or '') if isinstance(value, dict) else ''
+
+
+def parse_dose(text: str) -> Optional[Tuple[float, str]]:
+    """First "<n>[-<m>] mg|g|ml/[k]L" in the text as (amount per 1000 L, 'g'|'ml'); ranges use the midpoint"""
+    match = DOSE_PATTERN.search(text or '')
+    if not match:
+        return None
+    low = float(match.group(1).replace(',', '.'))
+    high = float(match.group(2).replace(',', '.')) if match.group(2) else low
+    unit, factor = UNIT_FACTORS[match.group(3).lower()]
+    per_litres = float(match.group(4)) if match.group(4) else 1.0
+    return round((low + high) / 2 * factor / per_litres, 4), unit
+
+
+def _same_word(word: str, name_word: str) -> bool:
+    """Equal, an abbreviation ("vit" for "vitamin") or a typo that keeps the word's first letters"""
+    if word == name_word:
+        return True
+    if len(word) < 3 or word[:3] != name_word[:3]:
+        return False
+    return name_word.startswith(word) or difflib.SequenceMatcher(None, word, name_word).ratio() >= FUZZY_CUTOFF
+
+
+class DrugNameMatcher:
+    """
+    Maps free-text names onto drug_inventory names: exact, then word by word
+    (abbreviations, typos, a leading or trailing word alone), then difflib.
+    A partial name only counts when exactly one drug fits it, and every word
+    the text gives must agree with the drug's: "Vitamin E" is not "Vitamin C".
+    Anything else stays unmatched rather than borrowing another drug's dose.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names = list(names)
+        self._folded = {turkish_fold(name): name for name in self.names}
+        self._words = [(turkish_fold(name).split(), name) for name in self.names]
+
+    def match(self, text: str) -> Optional[str]:
+        folded = turkish_fold(text)
+        if not folded:
+            return None
+        if folded in self._folded:
+            return self._folded[folded]
+        words = folded.split()
+        candidates = [
+            name for name_words, name in self._words
+            if len(words) <= len(name_words) and all(map(_same_word, words, name_words))
+            or len(words) == 1 and len(words[0]) >= 3 and words[0] in name_words[1:]
+        ]
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            return None
+        close = difflib.get_close_matches(folded, list(self._folded), n=1, cutoff=FUZZY_CUTOFF)
+        if close and len(close[0].split()) == len(words) and all(
+                word[:3] == name_word[:3] for word, name_word in zip(words, close[0].split())):
+            return self._folded[close[0]]
+        return None
+
+
+def _split_parts(text: str) -> List[str]:
+    # '+' inside parentheses belongs to the alias, e.g. "Multivitamin (AD3E + B-Kompleks)"
+    return re.split(r'\+(?![^(]*\))', text or '')
+
+
+def _dosage_segments(dosage: str) -> List[Tuple[str, str]]:
+    """"Hepato: üretici dozajı. Elektrolit: 0.5-1 g/L" -> [('Hepato', ...), ('Elektrolit', ...)]"""
+    segments = []
+    for segment in re.split(r'(?<!\d)\.\s+', dosage or ''):
+        name, sep, rest = segment.partition(':')
+        if sep and not DOSE_PATTERN.search(name):
+            segments.append((name.strip(), rest.strip()))
+    return segments
+
+
+def parse_session(text: str, dosage: str, matcher: DrugNameMatcher) -> List[Dict]:
+    """Structured records for one session; dose from the drug text, else the dosage field"""
+    records = []
+    for part in _split_parts(text):
+        groups = re.findall(r'\(([^)]*)\)', part)
+        bare = re.sub(r'\([^)]*\)', '', part).strip(' -.')
+        if turkish_fold(bare) in NO_DRUG_MARKERS:
+            continue
+        aliases = [g for g in groups if not DOSE_PATTERN.search(g)]
+        resolved = None
+        for candidate in [bare] + aliases:
+            resolved = matcher.match(candidate)
+            if resolved:
+                break
+        dose = None
+        for group in groups:
+            dose = dose or parse_dose(group)
+        records.append({
+            'drug': resolved or bare.strip(),
+            'raw': part.strip(),
+            'matched': resolved is not None,
+            'dose': dose[0] if dose else None,
+            'unit': dose[1] if dose else None,
+        })
+
+    segments = _dosage_segments(dosage)
+    if segments:
+        by_drug = DrugNameMatcher([r['drug'] for r in records])
+        for name, dose_text in segments:
+            target = by_drug.match(name)
+            dose = parse_dose(dose_text)
+            for record in records:
+                if record['drug'] == target and record['dose'] is None and dose:
+                    record['dose'], record['unit'] = dose
+    elif len(records) == 1 and records[0]['dose'] is None:
+        dose = parse_dose(dosage)
+        if dose:
+            records[0]['dose'], records[0]['unit'] = dose
+    return records
+
+
+def compile_entry(entry: Dict, matcher: DrugNameMatcher) -> Dict:
+    """One program day (either layout) as {session: [records], 'houses': {...}, texts and notes}"""
+    compiled = {}
+    for session in SESSIONS:
+        text = get_session_text(entry, session)
+        compiled[session] = parse_session(text, get_session_dosage(entry, session), matcher)
+        compiled[f'{session}_text'] = text
+    compiled['strategic_focus'] = entry.get('strategic_focus', '')
+    compiled['note'] = entry.get('clinical_note') or entry.get('not', '') or ''
+    if entry.get('houses'):
+        compiled['houses'] = {
+            house: {session: parse_session(get_session_text(override, session), '', matcher) for session in SESSIONS}
+            for house, override in entry['houses'].items()
+        }
+    return compiled
+
+
+def merge_entries(base: Dict, override: Dict) -> Dict:
+    """Override sessions replace base sessions only where they name a drug; base doses fill undosed records"""
+    merged = dict(base)
+    for session in SESSIONS:
+        if override[session] or override[f'{session}_text'].strip():
+            base_doses = {r['drug']: r for r in base[session] if r['dose'] is not None}
+            merged[session] = [
+                {**record, 'dose': base_doses[record['drug']]['dose'], 'unit': base_doses[record['drug']]['unit']}
+                if record['dose'] is None and record['drug'] in base_doses else record
+                for record in override[session]
+            ]
+            merged[f'{session}_text'] = override[f'{session}_text']
+    if override.get('note'):
+        merged['note'] = override['note']
+    if override.get('houses'):
+        merged['houses'] = override['houses']
+    return merged
+
+
+def source_hash(*sources) -> str:
+    payload = json.dumps([PARSER_VERSION, *sources], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def compile_program(base: Dict, overrides: Dict, inventory: Dict, days: Iterable[int] = None) -> Dict[int, Dict]:
+    """{day: compiled entry} from the base program with farm_data['drug_program'] edits on top (only `days` when given)"""
+    wanted = None if days is None else set(days)
+    matcher = DrugNameMatcher(inventory)
+    days: Dict[int, Dict] = {}
+    for layer, source in enumerate((unwrap_program(base), unwrap_program(overrides))):
+        for day_str, entry in source.items():
+            if not str(day_str).isdigit() or not isinstance(entry, dict):
+                continue
+            day = int(day_str)
+            if wanted is not None and day not in wanted:
+                continue
+            compiled = compile_entry(entry, matcher)
+            days[day] = merge_entries(days[day], compiled) if layer and day in days else compiled
+    return days
+
+
+def load_compiled_program(base: Dict, overrides: Dict, inventory: Dict,
+                          cache_path: str = COMPILED_PROGRAM_FILE) -> Dict[int, Dict]:
+    """Compiled program from the disk cache when its source hash still matches, else recompiled and stored"""
+    digest = source_hash(base, overrides, sorted(inventory))
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('source_hash') == digest:
+                return {int(day): entry for day, entry in cached['days'].items()}
+        except (OSError, ValueError, KeyError):
+            pass
+    days = compile_program(base, overrides, inventory)
+    if cache_path:
+        try:
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump({'source_hash': digest, 'days': days}, f, ensure_ascii=False)
+        except OSError:
+            pass
+    return days
+
+
+def session_summary(records: List[Dict]) -> str:
+    """"Neomisin Sülfat (100 g/1000L) + Hepato" for tables"""
+    parts = []
+    for record in records:
+        dose = f" ({record['dose']:g} {record['unit']}/1000L)" if record['dose'] is not None else ''
+        parts.append(record['drug'] + dose)
+    return ' + '.join(parts)
@@ -0,0 +1,225 @@
+# Drug Schedule Index Module
+# Compiles the day-keyed drug program into per-house intervals with withdrawal windows
+
+from datetime import datetime
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+from drug_parser import SESSIONS, turkish_fold
+
+
+@dataclass(frozen=True)
+class DrugInterval:
+    """A run of consecutive days on which a drug is given to a house"""
+    house: str
+    drug: str
+    start: int
+    end: int
+    withdrawal_end: int
+    sessions: Tuple[str, ...] = field(default=())
+
+    def contains(self, day: int) -> bool:
+        return self.start <= day <= self.end
+
+    @property
+    def has_withdrawal(self) -> bool:
+        return self.withdrawal_end > self.end
+
+    def in_withdrawal(self, day: int) -> bool:
+        return self.end < day <= self.withdrawal_end
+
+
+def _argmax_table(values: List[int]) -> List[List[int]]:
+    """Sparse table: table[k][j] is the index of the largest of values[j:j + 2**k]"""
+    table = [list(range(len(values)))]
+    while 2 ** len(table) <= len(values):
+        previous, half = table[-1], 2 ** (len(table) - 1)
+        table.append([a if values[a] >= values[b] else b for a, b in zip(previous, previous[half:])])
+    return table
+
+
+class _HouseIntervals:
+    """
+    Intervals of one house sorted by start, with prefix maxima of end and
+    withdrawal_end and a range-maximum table over each. A query bisects on
+    start for the last candidate and on the (monotone) prefix maxima for the
+    first, then splits the range at its maximum while that still reaches the
+    day: O(log n) per interval reported, however long an early interval runs.
+    Drugs without a withdrawal period never block slaughter and stay out of
+    max_withdrawal.
+    """
+
+    def __init__(self, intervals: List[DrugInterval] = None):
+        self.intervals: List[DrugInterval] = []
+        for interval in intervals or []:
+            insort(self.intervals, interval, key=lambda i: (i.start, i.drug))
+        self._reindex()
+
+    def _reindex(self):
+        self.starts = [i.start for i in self.intervals]
+        self.ends = [i.end for i in self.intervals]
+        self.withdrawal_ends = [i.withdrawal_end if i.has_withdrawal else 0 for i in self.intervals]
+        self.max_end = list(accumulate(self.ends, max))
+        self.max_withdrawal = list(accumulate(self.withdrawal_ends, max))
+        self._end_table = _argmax_table(self.ends)
+        self._withdrawal_table = _argmax_table(self.withdrawal_ends)
+
+    def replace(self, removed: List[DrugInterval], added: List[DrugInterval]):
+        removed_set = set(removed)
+        self.intervals = [i for i in self.intervals if i not in removed_set]
+        for interval in added:
+            insort(self.intervals, interval, key=lambda i: (i.start, i.drug))
+        self._reindex()
+
+    def _reaching(self, upto_start: int, values: List[int], reach: List[int], table: List[List[int]],
+                  bound: int) -> List[DrugInterval]:
+        """Intervals starting by upto_start whose value reaches bound, latest start first"""
+        found = []
+        ranges = [(bisect_left(reach, bound), bisect_right(self.starts, upto_start) - 1)]
+        while ranges:
+            lo, hi = ranges.pop()
+            if lo > hi:
+                continue
+            k = (hi - lo + 1).bit_length() - 1
+            a, b = table[k][lo], table[k][hi - 2 ** k + 1]
+            j = a if values[a] >= values[b] else b
+            if values[j] >= bound:
+                found.append(j)
+                ranges += [(lo, j - 1), (j + 1, hi)]
+        return [self.intervals[j] for j in sorted(found, reverse=True)]
+
+    def at(self, day: int) -> List[DrugInterval]:
+        return self._reaching(day, self.ends, self.max_end, self._end_table, day)
+
+    def overlapping(self, start: int, end: int) -> List[DrugInterval]:
+        return self._reaching(end, self.ends, self.max_end, self._end_table, start)
+
+    def withdrawal_blocking(self, day: int) -> List[DrugInterval]:
+        """Intervals of drugs with a withdrawal period whose window still covers the day"""
+        return self._reaching(day, self.withdrawal_ends, self.max_withdrawal, self._withdrawal_table, day)
+
+
+class DrugScheduleIndex:
+    """Compiled per-house drug intervals answering day, overlap and withdrawal queries"""
+
+    def __init__(self, program: Dict[int, Dict], houses: List[str], inventory: Dict,
+                 withdrawal_periods: Dict = None, max_day: int = 42):
+        """program is the compiled {day: entry} layout from drug_parser"""
+        self.houses = list(houses)
+        self.inventory = inventory
+        self.withdrawal_periods = withdrawal_periods or {}
+        self.max_day = max_day
+        # day -> {house: {drug: sessions}} is kept so single-day edits can re-derive runs locally
+        self._day_drugs: Dict[int, Dict[str, Dict[str, Tuple[str, ...]]]] = {}
+        for day in range(1, max_day + 1):
+            self._set_day(day, program.get(day, {}))
+        self._by_house = {house: _HouseIntervals(self._derive_runs(house, 1, max_day)) for house in self.houses}
+
+    @classmethod
+    def from_farm(cls, farm_data: Dict, program: Dict[int, Dict], max_day: int = 42) -> 'DrugScheduleIndex':
+        """Index over a compiled program for the farm's houses and withdrawal settings"""
+        settings = farm_data.get('settings', {})
+        return cls(program, list(settings.get('houses', {}).keys()), farm_data.get('drug_inventory', {}),
+                   settings.get('withdrawal_periods', {}), max_day)
+
+    # ---------- compilation ----------
+    def withdrawal_days(self, drug: str) -> int:
+        """Longest known withdrawal for a drug (drug_inventory or settings.withdrawal_periods)"""
+        candidates = [self.inventory.get(drug, {}).get('withdrawal', 0) or 0]
+        folded = turkish_fold(drug)
+        for name, days in self.withdrawal_periods.items():
+            if folded.startswith(turkish_fold(name)):
+                candidates.append(days)
+        return max(candidates)
+
+    def _set_day(self, day: int, entry: Dict):
+        house_overrides = entry.get('houses', {})
+        day_map = {}
+        for house in self.houses:
+            source = house_overrides.get(house, entry)
+            drugs: Dict[str, Tuple[str, ...]] = {}
+            for session in SESSIONS:
+                for record in source.get(session, []):
+                    drugs[record['drug']] = drugs.get(record['drug'], ()) + (session,)
+            day_map[house] = drugs
+        self._day_drugs[day] = day_map
+
+    def _derive_runs(self, house: str, first_day: int, last_day: int) -> List[DrugInterval]:
+        runs: List[DrugInterval] = []
+        open_runs: Dict[str, List] = {}
+        for day in range(first_day, last_day + 2):
+            drugs = self._day_drugs.get(day, {}).get(house, {}) if day <= last_day else {}
+            for drug in list(open_runs):
+                if drug not in drugs:
+                    start, sessions, withdrawal = open_runs.pop(drug)
+                    end = day - 1
+                    runs.append(DrugInterval(house, drug, start, end, end + withdrawal, tuple(sorted(sessions))))
+            for drug, sessions in drugs.items():
+                if drug in open_runs:
+                    open_runs[drug][1].update(sessions)
+                else:
+                    open_runs[drug] = [day, set(sessions), self.withdrawal_days(drug)]
+        return runs
+
+    def update_day(self, day: int, entry: Dict):
+        """Re-index one edited day (compiled entry, house overrides included); only the runs around it are re-derived"""
+        self._set_day(day, entry)
+        for house, index in self._by_house.items():
+            first, last = day - 1, day + 1
+            removed = index.overlapping(first, last)
+            # Widen until no untouched run crosses the window edges
+            while True:
+                first = min([i.start for i in removed] + [day])
+                last = max([i.end for i in removed] + [day])
+                widened = index.overlapping(first, last)
+                if len(widened) == len(removed):
+                    break
+                removed = widened
+            index.replace(removed, self._derive_runs(house, first, last))
+
+    # ---------- queries ----------
+    def intervals(self, house: str) -> List[DrugInterval]:
+        return list(self._by_house[house].intervals)
+
+    def administered_on(self, day: int, house: str = None) -> Dict[str, List[DrugInterval]]:
+        """{house: intervals} of drugs given on a day"""
+        houses = [house] if house else self.houses
+        return {h: self._by_house[h].at(day) for h in houses}
+
+    def overlapping(self, start: int, end: int, house: str = None) -> Dict[str, List[DrugInterval]]:
+        houses = [house] if house else self.houses
+        return {h: self._by_house[h].overlapping(start, end) for h in houses}
+
+    def withdrawal_conflicts(self, slaughter_day: int) -> Dict[str, List[DrugInterval]]:
+        """Houses on treatment with, or inside the withdrawal window of, a drug with a withdrawal period"""
+        conflicts = {}
+        for house in self.houses:
+            blocking = self._by_house[house].withdrawal_blocking(slaughter_day)
+            if blocking:
+                conflicts[house] = blocking
+        return conflicts
+
+    def is_clear_for_slaughter(self, slaughter_day: int) -> bool:
+        return not self.withdrawal_conflicts(slaughter_day)
+
+    def earliest_clear_day(self, house: str = None) -> int:
+        """First day on which no withdrawal window is open for the house(s)"""
+        houses = [house] if house else self.houses
+        latest = 0
+        for h in houses:
+            index = self._by_house[h]
+            if index.max_withdrawal:
+                latest = max(latest, index.max_withdrawal[-1])
+        return latest + 1
+
+
+def get_slaughter_day(settings: Dict) -> Optional[int]:
+    """Program day of target_slaughter_date, counted like get_current_day"""
+    try:
+        start = datetime.strptime(settings['start_date'], '%Y-%m-%d').date()
+        target = datetime.strptime(settings['target_slaughter_date'], '%Y-%m-%d').date()
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (target - start).days + 1
@@ -1,9 +1,13 @@
 # Enhanced Chat Module with Real Gemini AI Integration
 import streamlit as st
-import google.generativeai as genai
 from datetime import datetime
 import os
 
+from farm_records import get_farm_records
+from reference_cache import day_table
+from instrumentation import timed
+from metrics import GEMINI_REQUESTS, GEMINI_SECONDS
+
 def build_farm_context(farm_data, banvit_data, current_day, calculations):
     """Build comprehensive farm context for AI analysis"""
     
@@ -18,11 +22,9 @@ def build_farm_context(farm_data, banvit_data, current_day, calculations):
     
     # Get Ross targets
     banvit_day = str(current_day)
-    target_weight = 0
-    target_fcr = 0
-    if banvit_day in banvit_data:
-        target_weight = banvit_data[banvit_day].get('ross_ağırlık', 0)
-        target_fcr = banvit_data[banvit_day].get('fcr', 0)
+    standard = day_table(banvit_data).row(current_day) or {}
+    target_weight = standard.get('canlı_ağırlık', 0)
+    target_fcr = standard.get('fcr', 0)
     
     # Get today's drug program
     today_drug = ""
@@ -36,9 +38,8 @@ def build_farm_context(farm_data, banvit_data, current_day, calculations):
         weight_deviation = ((avg_weight - target_weight) / target_weight) * 100
     
     # Get house-wise data
-    house_data = []
-    for house_name in farm_data['settings']['houses'].keys():
-        house_data.append(f"- {house_name}: Canlı={farm_data.get('daily_data', {}).get(f'day_{current_day}', {}).get(house_name, {}).get('live', 'N/A')}")
+    records = get_farm_records(farm_data)
+    house_data = [f"- {house.name}: Canlı={records.live_birds(house.name, current_day):,}" for house in records.houses]
     
     context = f"""Sen bir Ross 308 broiler çiftliği yönetim danışmanısın. Çiftlik hakkında aşağıdaki gerçek verilere dayanarak analiz ve tavsiyelerde bulun.
 
@@ -95,13 +96,18 @@ Günlük Su Hazırlama: {morning_water + evening_water:.0f}L (Sabah: {morning_wa
     return context
 
 
+@timed
 def get_ai_response(context, user_question):
     """Get response from Gemini AI"""
     try:
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
+            GEMINI_REQUESTS.inc(outcome='no_key')
             return "❌ Gemini API anahtarı bulunamadı. Lütfen ortam değişkenini ayarlayın."
         
+        # Heavy client library: imported on the first request, not at page load
+        import google.generativeai as genai
+
         genai.configure(api_key=api_key)
         model = genai.GenerativeModel('gemini-2.5-flash')
         
@@ -117,9 +123,12 @@ Lütfen:
 4. Varsa uyarıları belirt
 5. Türkçe cevap ver"""
         
-        response = model.generate_content(full_prompt)
+        with GEMINI_SECONDS.time():
+            response = model.generate_content(full_prompt)
+        GEMINI_REQUESTS.inc(outcome='ok')
         return response.text
     except Exception as e:
+        GEMINI_REQUESTS.inc(outcome='error')
         return f"❌ Gemini API hatası: {str(e)}"
 
 
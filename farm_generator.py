@@ -0,0 +1,302 @@
+# Synthetic Farm Generator
+# Seeded Ross 308 shaped flocks (from banvit_data.json) with noise, disease events, feed invoices,
+# transaction logs and chat history, streamed to JSON files, JSON lines or SQLite
+#
+#   python farm_generator.py --farms 200 --flocks 15 --backend jsonl --output farms.jsonl
+
+import argparse
+import copy
+import json
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+# Days between two flocks on the same farm: 42 days of growing plus cleaning and rest
+CYCLE_DAYS = 56
+FIRST_WEEK_MORTALITY = 0.002
+DAILY_MORTALITY = 0.0005
+SILO_START_KG = 8000
+SUPPLIERS = ['Banvit', 'Şenpiliç', 'Beypi']
+
+CHAT_TEMPLATES = [
+    ("Bugün ne yapmalıyım?", "{day}. gün: su tüketimini ve ölüm sayılarını kontrol edin, silo seviyesine bakın."),
+    ("Çiftliğin durumu nasıl?", "Ortalama ağırlık {weight:.0f} g, kümülatif ölüm %{mortality:.2f}."),
+    ("FCR'ı nasıl iyileştirebilirim?", "Yem israfını azaltın, sıcaklığı hedef aralıkta tutun ve su kalitesini kontrol edin."),
+]
+
+
+@dataclass
+class GeneratorConfig:
+    farms: int = 1
+    flocks: int = 1
+    min_houses: int = 4
+    max_houses: int = 8
+    days: int = 42
+    disease_rate: float = 0.3
+    chat_messages: int = 2
+    seed: int = 42
+    first_start_date: str = '2024-01-01'
+
+
+def _feed_type(day: int, transition: Dict) -> str:
+    if day <= transition.get('chick_to_grower', 14):
+        return 'Civciv'
+    if day <= transition.get('grower_to_finisher', 28):
+        return 'Büyütme'
+    return 'Bitirme'
+
+
+class FarmGenerator:
+    """
+    Every flock gets its own numpy Generator seeded from (seed, farm, flock),
+    so any single flock can be regenerated without producing the others.
+    """
+
+    def __init__(self, banvit_data: Dict, template: Optional[Dict] = None, config: GeneratorConfig = None):
+        self.config = config or GeneratorConfig()
+        self.template = template or {}
+        days = range(1, 43)
+        self.target_weight = np.array([banvit_data.get(str(d), {}).get('canlı_ağırlık', 0) for d in days], dtype=float)
+        self.water_per_1000 = np.array([banvit_data.get(str(d), {}).get('su_tüketimi', 0) for d in days], dtype=float)
+        self.feed_g = np.array([banvit_data.get(str(d), {}).get('yem_tüketimi', 0) for d in days], dtype=float)
+
+    def farm_layout(self, farm: int) -> Dict[str, int]:
+        """House name -> chick count; fixed for every flock of the farm"""
+        rng = np.random.default_rng([self.config.seed, farm])
+        houses = int(rng.integers(self.config.min_houses, self.config.max_houses + 1))
+        return {f'Kümes {h + 1}': int(rng.integers(9000, 12001)) for h in range(houses)}
+
+    def _disease_events(self, rng: np.random.Generator, n_houses: int) -> List[Dict]:
+        if rng.random() >= self.config.disease_rate:
+            return []
+        start = int(rng.integers(8, 36))
+        affected = sorted(rng.choice(n_houses, size=int(rng.integers(1, n_houses + 1)), replace=False).tolist())
+        return [{
+            'start_day': start,
+            'end_day': start + int(rng.integers(3, 8)) - 1,
+            'houses': affected,
+            'mortality_factor': round(float(rng.uniform(4, 10)), 2),
+        }]
+
+    def generate_flock(self, farm: int, flock: int) -> Dict:
+        """One farm_data dict: settings, daily_data, invoices, transaction log and chat history"""
+        config = self.config
+        rng = np.random.default_rng([config.seed, farm, flock])
+        layout = self.farm_layout(farm)
+        houses = list(layout)
+        n_days, n_houses = config.days, len(houses)
+        start = datetime.strptime(config.first_start_date, '%Y-%m-%d') + timedelta(days=farm % 7 + flock * CYCLE_DAYS)
+
+        # Disease multipliers per (day, house)
+        events = self._disease_events(rng, n_houses)
+        mortality_mult = np.ones((n_days, n_houses))
+        intake_mult = np.ones((n_days, n_houses))
+        for event in events:
+            rows = slice(event['start_day'] - 1, min(event['end_day'], n_days))
+            mortality_mult[rows, event['houses']] = event['mortality_factor']
+            intake_mult[rows, event['houses']] = 0.85
+
+        # Mortality: Poisson deaths on the surviving birds, first week higher
+        base_rate = np.where(np.arange(1, n_days + 1) <= 7, FIRST_WEEK_MORTALITY, DAILY_MORTALITY)[:, None]
+        rate = base_rate * rng.lognormal(0, 0.3, (n_days, n_houses)) * mortality_mult
+        live = np.array([layout[h] for h in houses], dtype=float)
+        deaths = np.zeros((n_days, n_houses), dtype=int)
+        live_by_day = np.zeros((n_days, n_houses))
+        for d in range(n_days):
+            deaths[d] = rng.poisson(live * rate[d])
+            live = np.maximum(live - deaths[d], 0)
+            live_by_day[d] = live
+
+        # Growth: per-house potential, daily weighing noise, stunting during and after disease
+        growth = rng.normal(1.0, 0.04, n_houses) * np.cumprod(np.where(intake_mult < 1, 0.99, 1.0), axis=0)
+        weight = self.target_weight[:n_days, None] * growth * rng.normal(1.0, 0.015, (n_days, n_houses))
+        water = live_by_day / 1000 * self.water_per_1000[:n_days, None] * intake_mult * rng.normal(1.0, 0.05, (n_days, n_houses))
+        feed = live_by_day * self.feed_g[:n_days, None] / 1000 * intake_mult * rng.normal(1.0, 0.03, (n_days, n_houses))
+
+        settings = copy.deepcopy(self.template.get('settings', {}))
+        settings.update({
+            'farm_name': f'Sentetik Çiftlik {farm + 1}',
+            'start_date': start.strftime('%Y-%m-%d'),
+            'target_slaughter_date': (start + timedelta(days=41)).strftime('%Y-%m-%d'),
+            'houses': {h: {'chick_count': layout[h], 'silo_capacity': 20.0} for h in houses},
+        })
+        settings.setdefault('feed_transition', {'chick_to_grower': 14, 'grower_to_finisher': 28})
+        order_sizes = [tons * 1000 for tons in settings.get('feed_order_rules', [9, 18, 27, 36])]
+
+        daily_data, invoices, log = {}, [], []
+        silo = np.full(n_houses, float(SILO_START_KG))
+        # The opening fill is invoiced like the refills, so deliveries minus silo stock is the feed eaten
+        filled = start - timedelta(days=1)
+        invoices.append({
+            'date': filled.strftime('%Y-%m-%d'),
+            'feed_type': 'Civciv',
+            'quantity': SILO_START_KG * n_houses,
+            'supplier': SUPPLIERS[0],
+            'delivery_date': filled.strftime('%Y-%m-%d'),
+        })
+        log.append({'timestamp': f"{filled.strftime('%Y-%m-%d')} 08:00:00", 'action': 'Feed Order',
+                    'details': f"{SILO_START_KG * n_houses} kg yem teslim alındı."})
+        for d in range(n_days):
+            day, date = d + 1, start + timedelta(days=d)
+            silo -= feed[d]
+            refill = silo < feed[d] * 2
+            if refill.any():
+                quantity = order_sizes[min(int(refill.sum()) - 1, len(order_sizes) - 1)]
+                silo[refill] += quantity / refill.sum()
+                invoices.append({
+                    'date': (date - timedelta(days=1)).strftime('%Y-%m-%d'),
+                    'feed_type': _feed_type(day, settings['feed_transition']),
+                    'quantity': quantity,
+                    'supplier': SUPPLIERS[int(rng.integers(len(SUPPLIERS)))],
+                    'delivery_date': date.strftime('%Y-%m-%d'),
+                })
+                log.append({'timestamp': f"{date.strftime('%Y-%m-%d')} 08:00:00", 'action': 'Feed Order',
+                            'details': f"{quantity} kg yem teslim alındı."})
+            silo = np.maximum(silo, 0)
+            daily_data[f'day_{day}'] = {
+                house: {
+                    'deaths': int(deaths[d, h]),
+                    'weight': round(float(weight[d, h]), 1),
+                    'water_consumption': round(float(water[d, h]), 1),
+                    'silo_remaining': round(float(silo[h]), 1),
+                    'feed_consumed': round(float(feed[d, h]), 1),
+                }
+                for h, house in enumerate(houses)
+            }
+            log.extend({'timestamp': f"{date.strftime('%Y-%m-%d')} 18:00:00", 'action': 'Daily Data Entry',
+                        'details': f"{house} için {day}. gün verileri kaydedildi."} for house in houses)
+
+        chat = []
+        for i in range(min(config.chat_messages, len(CHAT_TEMPLATES))):
+            question, answer = CHAT_TEMPLATES[i]
+            day = int(rng.integers(1, n_days + 1))
+            mortality = deaths[:day].sum() / sum(layout.values()) * 100
+            chat.append({'role': 'user', 'content': question})
+            chat.append({'role': 'assistant', 'content': answer.format(day=day, weight=weight[day - 1].mean(), mortality=mortality)})
+
+        farm_data = copy.deepcopy({k: v for k, v in self.template.items() if k not in ('settings', 'daily_data')})
+        farm_data.update({
+            'metadata': {
+                'version': '1.0',
+                'created': start.isoformat(),
+                'last_updated': (start + timedelta(days=n_days - 1)).isoformat(),
+                'transaction_log': log,
+                'data_version': len(log),
+                'generator': {'seed': config.seed, 'farm': farm, 'flock': flock, 'disease_events': events},
+            },
+            'settings': settings,
+            'daily_data': daily_data,
+            'feed_invoices': invoices,
+            'chat_history': chat,
+        })
+        return farm_data
+
+    def iter_flocks(self) -> Iterator[Dict]:
+        """Every flock of every farm, one at a time"""
+        for farm in range(self.config.farms):
+            for flock in range(self.config.flocks):
+                yield self.generate_flock(farm, flock)
+
+
+def flock_key(farm_data: Dict) -> str:
+    generator = farm_data['metadata']['generator']
+    return f"farm{generator['farm'] + 1:04d}_flock{generator['flock'] + 1:03d}"
+
+
+def write_json_dir(flocks: Iterable[Dict], directory: str) -> int:
+    """One farm_data.json-shaped file per flock"""
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for farm_data in flocks:
+        with open(os.path.join(directory, f"{flock_key(farm_data)}.json"), 'w', encoding='utf-8') as f:
+            json.dump(farm_data, f, ensure_ascii=False)
+        count += 1
+    return count
+
+
+def write_jsonl(flocks: Iterable[Dict], stream) -> int:
+    count = 0
+    for farm_data in flocks:
+        stream.write(json.dumps(farm_data, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS farms (
+    flock_key TEXT PRIMARY KEY,
+    farm_name TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+
+def write_sqlite(flocks: Iterable[Dict], db_path: str, batch_size: int = 50) -> int:
+    """Upsert flocks in batches, one transaction per batch"""
+    count = 0
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.executescript(SQLITE_SCHEMA)
+        batch = []
+        for farm_data in flocks:
+            settings = farm_data['settings']
+            batch.append((flock_key(farm_data), settings['farm_name'], settings['start_date'],
+                          json.dumps(farm_data, ensure_ascii=False)))
+            if len(batch) >= batch_size:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO farms VALUES (?, ?, ?, ?)", batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO farms VALUES (?, ?, ?, ?)", batch)
+            count += len(batch)
+    return count
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic farm data")
+    parser.add_argument('--farms', type=int, default=1)
+    parser.add_argument('--flocks', type=int, default=1, help="flocks per farm")
+    parser.add_argument('--min-houses', type=int, default=4)
+    parser.add_argument('--max-houses', type=int, default=8)
+    parser.add_argument('--days', type=int, default=42)
+    parser.add_argument('--disease-rate', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--banvit', default='banvit_data.json')
+    parser.add_argument('--template', default='farm_data.json', help="settings, inventory and program to copy")
+    parser.add_argument('--backend', choices=['json', 'jsonl', 'sqlite'], default='jsonl')
+    parser.add_argument('--output', default='-', help="directory (json), file or - (jsonl), database (sqlite)")
+    args = parser.parse_args(argv)
+
+    with open(args.banvit, 'r', encoding='utf-8') as f:
+        banvit = json.load(f)
+    template = {}
+    if args.template and os.path.exists(args.template):
+        with open(args.template, 'r', encoding='utf-8') as f:
+            template = json.load(f)
+    config = GeneratorConfig(farms=args.farms, flocks=args.flocks, min_houses=args.min_houses, max_houses=args.max_houses,
+                             days=args.days, disease_rate=args.disease_rate, seed=args.seed)
+    flocks = FarmGenerator(banvit, template, config).iter_flocks()
+
+    if args.backend == 'json':
+        count = write_json_dir(flocks, args.output)
+    elif args.backend == 'sqlite':
+        count = write_sqlite(flocks, args.output)
+    elif args.output == '-':
+        count = write_jsonl(flocks, sys.stdout)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            count = write_jsonl(flocks, f)
+    print(f"{count} flocks written", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
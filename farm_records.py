@@ -0,0 +1,258 @@
+# Farm Records Module
+# Typed, slotted view of farm_data, validated once per data version: houses, house-day records,
+# feed invoices and drug inventory entries, with O(1) lookups by house and day
+#
+# Field spellings are normalized here and nowhere else: 'avg_weight' in older files is read as
+# weight, and a missing or malformed value is reported once in FarmRecords.issues instead of
+# being swallowed by each reader.
+
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+from change_feed import section_version
+from metrics import record_cache
+
+# farm_data sections the records are built from
+RECORD_SECTIONS = ('settings', 'daily_data', 'feed_invoices', 'drug_inventory')
+
+# key -> (farm_data, FarmRecords); the dict is held so a new farm cannot reuse its id while cached
+_records_cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
+_RECORDS_CACHE_SIZE = 8
+_lock = threading.Lock()
+
+# Reconciliation against deliveries is only trusted within this range of the estimate
+RECONCILE_BOUNDS = (0.5, 2.0)
+
+
+@dataclass(slots=True)
+class House:
+    name: str
+    index: int
+    chick_count: int = 0
+    silo_capacity: float = 0.0  # tons
+
+
+@dataclass(slots=True)
+class DayRecord:
+    day: int
+    house: str
+    deaths: int = 0
+    weight: float = 0.0  # grams
+    water_consumption: float = 0.0
+    silo_remaining: float = 0.0  # kg
+    feed_consumed: Optional[float] = None  # kg; None when not recorded
+    recorded: bool = False  # an entry exists in daily_data
+
+
+@dataclass(slots=True)
+class Invoice:
+    date: str
+    feed_type: str
+    quantity: float  # kg
+    supplier: str = ''
+    delivery_date: str = ''
+
+
+@dataclass(slots=True)
+class DrugEntry:
+    name: str
+    dose: float = 0.0
+    unit: str = ''
+    withdrawal: int = 0
+    stock: float = 0.0
+    cost: float = 0.0
+
+
+def _number(value, field: str, where: str, issues: List[str], integer: bool = False):
+    """Non-negative number or 0, with an issue for anything else that was actually entered"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        try:
+            value = float(str(value).replace(',', '.'))
+        except ValueError:
+            issues.append(f"{where}: '{field}' sayı değil ({value!r})")
+            return 0
+    if value < 0:
+        issues.append(f"{where}: '{field}' negatif ({value})")
+        return 0
+    if integer:
+        if value % 1:
+            issues.append(f"{where}: '{field}' tam sayı olmalı ({value})")
+        return int(value)
+    return float(value)
+
+
+def day_record(day: int, house: str, raw: Mapping, issues: Optional[List[str]] = None) -> DayRecord:
+    """One daily_data[f'day_{day}'][house] entry as a DayRecord"""
+    issues = [] if issues is None else issues
+    if not isinstance(raw, Mapping) or not raw:
+        return DayRecord(day, house)
+    where = f"{house} {day}. gün"
+    feed = raw.get('feed_consumed')
+    return DayRecord(
+        day, house,
+        deaths=_number(raw.get('deaths'), 'deaths', where, issues, integer=True),
+        weight=_number(raw.get('weight') or raw.get('avg_weight'), 'weight', where, issues),
+        water_consumption=_number(raw.get('water_consumption'), 'water_consumption', where, issues),
+        silo_remaining=_number(raw.get('silo_remaining'), 'silo_remaining', where, issues),
+        feed_consumed=_number(feed, 'feed_consumed', where, issues) if feed else None,
+        recorded=True,
+    )
+
+
+class FarmRecords:
+    """
+    Houses get dense indexes in settings order; house-day records live in a
+    (day x house) grid and cumulative deaths are precomputed per house, so
+    record(), live_birds() and friends are list indexing only.
+    """
+
+    __slots__ = ('houses', 'house_index', 'max_day', 'invoices', 'drugs', 'issues',
+                 '_grid', '_cum_deaths')
+
+    def __init__(self, houses: List[House], grid: List[List[DayRecord]], invoices: List[Invoice],
+                 drugs: Dict[str, DrugEntry], issues: List[str]):
+        self.houses = houses
+        self.house_index = {house.name: house.index for house in houses}
+        self.max_day = len(grid)
+        self.invoices = invoices
+        self.drugs = drugs
+        self.issues = issues
+        self._grid = grid
+        self._cum_deaths = [list(accumulate(grid[d][h].deaths for d in range(len(grid)))) for h in range(len(houses))]
+
+    @classmethod
+    def from_farm(cls, farm_data: Dict) -> 'FarmRecords':
+        issues: List[str] = []
+        settings = farm_data.get('settings', {})
+        houses = []
+        for index, (name, info) in enumerate(settings.get('houses', {}).items()):
+            info = info if isinstance(info, Mapping) else {}
+            houses.append(House(
+                name, index,
+                _number(info.get('chick_count'), 'chick_count', name, issues, integer=True),
+                _number(info.get('silo_capacity'), 'silo_capacity', name, issues),
+            ))
+        house_index = {house.name: house.index for house in houses}
+
+        days: Dict[int, Dict] = {}
+        for key, day_data in farm_data.get('daily_data', {}).items():
+            day = int(key[4:]) if key.startswith('day_') and key[4:].isdigit() else 0
+            if day < 1 or not isinstance(day_data, Mapping):
+                issues.append(f"daily_data: geçersiz gün anahtarı '{key}'")
+                continue
+            days[day] = day_data
+
+        max_day = max(days, default=0)
+        grid = [[DayRecord(d + 1, house.name) for house in houses] for d in range(max_day)]
+        for day, day_data in days.items():
+            for name, raw in day_data.items():
+                h = house_index.get(name)
+                if h is None:
+                    issues.append(f"{day}. gün: bilinmeyen kümes '{name}'")
+                    continue
+                grid[day - 1][h] = day_record(day, name, raw, issues)
+
+        invoices = []
+        for i, raw in enumerate(farm_data.get('feed_invoices', [])):
+            if not isinstance(raw, Mapping):
+                issues.append(f"{i + 1}. yem faturası okunamadı")
+                continue
+            invoices.append(Invoice(
+                str(raw.get('date', '')), str(raw.get('feed_type', '')),
+                _number(raw.get('quantity'), 'quantity', f"{i + 1}. yem faturası", issues),
+                str(raw.get('supplier', '')), str(raw.get('delivery_date', '')),
+            ))
+
+        drugs = {}
+        for name, raw in farm_data.get('drug_inventory', {}).items():
+            raw = raw if isinstance(raw, Mapping) else {}
+            drugs[name] = DrugEntry(
+                name, _number(raw.get('dose'), 'dose', name, issues), str(raw.get('unit', '')),
+                _number(raw.get('withdrawal'), 'withdrawal', name, issues, integer=True),
+                _number(raw.get('stock'), 'stock', name, issues), _number(raw.get('cost'), 'cost', name, issues),
+            )
+
+        records = cls(houses, grid, invoices, drugs, issues)
+        for house in houses:
+            if records.cumulative_deaths(house.name, max_day) > house.chick_count:
+                issues.append(f"{house.name}: toplam ölüm başlangıç hayvan sayısını aşıyor")
+        return records
+
+    # ---------- accessors ----------
+    def house(self, name: str) -> Optional[House]:
+        index = self.house_index.get(name)
+        return None if index is None else self.houses[index]
+
+    def record(self, day: int, house: str) -> DayRecord:
+        """The house-day record; an empty one (recorded=False) when nothing was entered"""
+        h = self.house_index.get(house)
+        if h is None:
+            return DayRecord(day, house)
+        if 1 <= day <= self.max_day:
+            return self._grid[day - 1][h]
+        return DayRecord(day, house)
+
+    def day(self, day: int) -> List[DayRecord]:
+        """Every house's record for a day, in house index order"""
+        if 1 <= day <= self.max_day:
+            return self._grid[day - 1]
+        return [DayRecord(day, house.name) for house in self.houses]
+
+    def cumulative_deaths(self, house: str, day: int) -> int:
+        h = self.house_index.get(house)
+        if h is None or day < 1 or not self.max_day:
+            return 0
+        return self._cum_deaths[h][min(day, self.max_day) - 1]
+
+    def live_birds(self, house: str, day: int) -> int:
+        h = self.house_index.get(house)
+        if h is None:
+            return 0
+        return max(0, self.houses[h].chick_count - self.cumulative_deaths(house, day))
+
+    def total_live_birds(self, day: int) -> int:
+        return sum(self.live_birds(house.name, day) for house in self.houses)
+
+    @property
+    def total_chicks(self) -> int:
+        return sum(house.chick_count for house in self.houses)
+
+    @property
+    def feed_received_kg(self) -> float:
+        return sum(invoice.quantity for invoice in self.invoices)
+
+
+def reconcile_factor(delivered_kg: float, in_silo_kg: float, feed_kg: float) -> Optional[float]:
+    """
+    Scale that brings a recorded/estimated feed total to what was actually
+    used: deliveries minus what is still in the silos. None when there are no
+    deliveries or the result is outside RECONCILE_BOUNDS.
+    """
+    if delivered_kg <= 0 or feed_kg <= 0:
+        return None
+    factor = (delivered_kg - in_silo_kg) / feed_kg
+    return float(factor) if RECONCILE_BOUNDS[0] <= factor <= RECONCILE_BOUNDS[1] else None
+
+
+def get_farm_records(farm_data: Dict) -> FarmRecords:
+    """FarmRecords for the current data version; rebuilt only when its sections change"""
+    settings = farm_data.get('settings', {})
+    key = (id(farm_data), settings.get('farm_name'), settings.get('start_date'),
+           section_version(farm_data, RECORD_SECTIONS))
+    cached = _records_cache.get(key)
+    hit = cached is not None and cached[0] is farm_data
+    record_cache('farm_records', hit)
+    if hit:
+        return cached[1]
+    records = FarmRecords.from_farm(farm_data)
+    with _lock:
+        _records_cache[key] = (farm_data, records)
+        if len(_records_cache) > _RECORDS_CACHE_SIZE:
+            _records_cache.popitem(last=False)
+    return records
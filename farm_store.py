@@ -0,0 +1,472 @@
+# Farm Store Module
+# Record-level optimistic locking for farm_data.json shared by several sessions: per-record
+# versions, compare-and-swap commits with field-level merge, and an append-only change feed
+#
+# Records are addressed by JSON pointers:
+#   /daily_data/day_5/Kümes 1     one house-day
+#   /feed_invoices/3              one invoice (list item; new items are appended, never CAS'd)
+#   /settings/houses/Kümes 1      one house's settings
+#   /settings/feed_costs          any other top-level setting
+#   /drug_inventory/Enrofloksasin one entry of any other top-level dict
+
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from change_feed import BUS, ChangeEvent, bump_sections, change_event
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock still serializes sessions of one server
+    fcntl = None
+
+FARM_CHANGES_FILE = 'farm_changes.jsonl'
+
+# Metadata maintained by the store (or per session), never diffed as records
+STORE_METADATA = ('record_versions', 'change_seq', 'data_version', 'section_versions', 'last_updated')
+
+_MISSING = object()
+_commit_lock = threading.Lock()
+
+
+def encode_pointer(tokens: Tuple[str, ...]) -> str:
+    return ''.join('/' + str(t).replace('~', '~0').replace('/', '~1') for t in tokens)
+
+
+def decode_pointer(pointer: str) -> Tuple[str, ...]:
+    return tuple(t.replace('~1', '/').replace('~0', '~') for t in pointer.split('/')[1:])
+
+
+# Second-level dicts whose entries are records of their own (every daily_data/day_N is too)
+NESTED_RECORD_DICTS = {('settings', 'houses'), ('mobile_sync', 'keys'), ('mobile_sync', 'stamps')}
+
+
+def _splits(tokens: Tuple[str, ...]) -> bool:
+    """Whether the dict at this path holds separate records rather than being one"""
+    if len(tokens) <= 1:
+        return True
+    return len(tokens) == 2 and (tokens[0] == 'daily_data' or tokens in NESTED_RECORD_DICTS)
+
+
+def flatten(farm_data: Dict) -> Tuple[Dict[str, Any], Dict[str, list]]:
+    """(records by pointer, lists by pointer); list items are records of their own"""
+    records, lists = {}, {}
+
+    def walk(value, tokens):
+        if isinstance(value, dict) and _splits(tokens):
+            for key, child in value.items():
+                if tokens == ('metadata',) and key in STORE_METADATA:
+                    continue
+                walk(child, tokens + (key,))
+        elif isinstance(value, list) and len(tokens) <= 2:
+            pointer = encode_pointer(tokens)
+            lists[pointer] = value
+            for i, item in enumerate(value):
+                records[f'{pointer}/{i}'] = item
+        else:
+            records[encode_pointer(tokens)] = value
+    walk(farm_data, ())
+    return records, lists
+
+
+def get_pointer(data: Dict, pointer: str, default=_MISSING):
+    value = data
+    for token in decode_pointer(pointer):
+        if isinstance(value, list) and token.isdigit() and int(token) < len(value):
+            value = value[int(token)]
+        elif isinstance(value, dict) and token in value:
+            value = value[token]
+        else:
+            return default
+    return value
+
+
+def set_pointer(data: Dict, pointer: str, value):
+    tokens = decode_pointer(pointer)
+    parent = data
+    for token in tokens[:-1]:
+        parent = parent[int(token)] if isinstance(parent, list) else parent.setdefault(token, {})
+    if isinstance(parent, list):
+        parent[int(tokens[-1])] = value
+    else:
+        parent[tokens[-1]] = value
+
+
+def delete_pointer(data: Dict, pointer: str):
+    tokens = decode_pointer(pointer)
+    parent = get_pointer(data, encode_pointer(tokens[:-1]), None)
+    if isinstance(parent, dict):
+        parent.pop(tokens[-1], None)
+
+
+@dataclass
+class Change:
+    """One record-level write; base is what the session saw before editing"""
+    op: str  # 'set' | 'delete' | 'append' | 'replace'
+    key: str
+    value: Any = None
+    base: Any = None
+    base_version: int = 0
+
+
+def diff(base: Dict, local: Dict, versions: Dict[str, int]) -> List[Change]:
+    """Record-level changes that turn base into local"""
+    base_records, base_lists = flatten(base)
+    local_records, local_lists = flatten(local)
+    changes = []
+
+    # Lists: growth is an append (merges with other sessions' appends), anything else replaces the list
+    list_items = set()
+    for pointer, items in local_lists.items():
+        old = base_lists.get(pointer, [])
+        list_items.update(f'{pointer}/{i}' for i in range(max(len(items), len(old))))
+        if len(items) < len(old):
+            changes.append(Change('replace', pointer, items, old, versions.get(pointer, 0)))
+            continue
+        for i in range(len(old)):
+            if items[i] != old[i]:
+                key = f'{pointer}/{i}'
+                changes.append(Change('set', key, items[i], old[i], versions.get(key, 0)))
+        if len(items) > len(old):
+            changes.append(Change('append', pointer, items[len(old):], None, versions.get(pointer, 0)))
+    for pointer, old in base_lists.items():
+        list_items.update(f'{pointer}/{i}' for i in range(len(old)))
+        if pointer not in local_lists and pointer not in local_records:
+            changes.append(Change('delete', pointer, None, old, versions.get(pointer, 0)))
+
+    for key, value in local_records.items():
+        if key in list_items:
+            continue
+        old = base_records.get(key, _MISSING)
+        if old is _MISSING or old != value:
+            changes.append(Change('set', key, value, None if old is _MISSING else old, versions.get(key, 0)))
+    for key, old in base_records.items():
+        if key not in local_records and key not in list_items and key not in local_lists:
+            changes.append(Change('delete', key, None, old, versions.get(key, 0)))
+    return changes
+
+
+def merge_fields(base: Dict, ours: Dict, theirs: Dict) -> Optional[Dict]:
+    """Three-way merge of one dict record; None when both sides changed the same field differently"""
+    merged = dict(theirs)
+    for name in set(base) | set(ours):
+        mine = ours.get(name, _MISSING)
+        original = base.get(name, _MISSING)
+        if mine == original:
+            continue
+        current = theirs.get(name, _MISSING)
+        if current != original and current != mine:
+            return None
+        if mine is _MISSING:
+            merged.pop(name, None)
+        else:
+            merged[name] = mine
+    return merged
+
+
+@dataclass
+class CommitResult:
+    seq: int
+    applied: List[Dict] = field(default_factory=list)
+    merged: List[str] = field(default_factory=list)
+    conflicts: List[Dict] = field(default_factory=list)
+
+
+class FarmStore:
+    """farm_data.json plus its change feed; every commit runs under one lock (thread and file)"""
+
+    def __init__(self, data_file: str, feed_file: str = None):
+        self.data_file = data_file
+        self.feed_file = feed_file or os.path.join(os.path.dirname(os.path.abspath(data_file)), FARM_CHANGES_FILE)
+        # Change bus topic: sessions of this process on the same file hear each other's commits
+        self.topic = os.path.abspath(data_file)
+
+    @contextmanager
+    def _locked(self):
+        with _commit_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f'{self.data_file}.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self) -> Tuple[Dict, int]:
+        """(farm data, change feed size in bytes) as of now"""
+        with self._locked():
+            return self._read_data(), self._feed_size()
+
+    def _read_data(self) -> Dict:
+        if not os.path.exists(self.data_file):
+            return {}
+        with open(self.data_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _feed_size(self) -> int:
+        return os.path.getsize(self.feed_file) if os.path.exists(self.feed_file) else 0
+
+    def commit(self, changes: List[Change], session_id: str = '') -> Tuple[CommitResult, Dict, int]:
+        """
+        Apply the changes if every record is unchanged since the session's base
+        (same version, or same content) or is a dict edited in different fields
+        (merged); if any record clashes, reject the whole save. Returns (result,
+        data after commit, feed size).
+        """
+        with self._locked():
+            return self._commit(self._read_data(), changes, session_id)
+
+    def update(self, mutate: Callable[[Dict], Any], session_id: str = '') -> Tuple[CommitResult, Any]:
+        """
+        Read-modify-write as one transaction: mutate() edits a copy of the current
+        data under the store lock, so its changes can never conflict. Returns
+        (commit result, mutate's return value).
+        """
+        with self._locked():
+            current = self._read_data()
+            working = json.loads(json.dumps(current, ensure_ascii=False))
+            outcome = mutate(working)
+            versions = current.get('metadata', {}).get('record_versions', {})
+            result, _, _ = self._commit(current, diff(current, working, versions), session_id)
+        return result, outcome
+
+    def _commit(self, current: Dict, changes: List[Change], session_id: str) -> Tuple[CommitResult, Dict, int]:
+        """commit() body; the caller holds the lock"""
+        metadata = current.setdefault('metadata', {})
+        versions = metadata.setdefault('record_versions', {})
+        seq = metadata.get('change_seq', 0)
+        result = CommitResult(seq)
+        timestamp = datetime.now().isoformat()
+
+        # A save is one unit: a ledger append or log entry must not land without the
+        # record it goes with, so every change is resolved before any is applied
+        resolved = [(change, self._resolve(current, versions, change, result)) for change in changes]
+        if result.conflicts:
+            result.merged = []
+            resolved = []
+
+        for change, value in resolved:
+            if value is _MISSING:
+                continue
+            seq += 1
+            if change.op == 'append':
+                items = get_pointer(current, change.key, None)
+                if not isinstance(items, list):
+                    items = []
+                    set_pointer(current, change.key, items)
+                start = len(items)
+                items.extend(value)
+                for i in range(start, len(items)):
+                    versions[f'{change.key}/{i}'] = 1
+            elif change.op == 'delete':
+                delete_pointer(current, change.key)
+            else:
+                set_pointer(current, change.key, value)
+            if change.op == 'replace':
+                for i in range(len(value)):
+                    versions[f'{change.key}/{i}'] = versions.get(f'{change.key}/{i}', 0) + 1
+            versions[change.key] = versions.get(change.key, 0) + 1
+            result.applied.append({
+                'seq': seq, 'op': change.op, 'key': change.key, 'value': value,
+                'version': versions[change.key], 'session': session_id, 'timestamp': timestamp,
+            })
+
+        if result.applied:
+            metadata['change_seq'] = seq
+            metadata['last_updated'] = timestamp
+            self._write(current, result.applied)
+        result.seq = seq
+        feed_offset = self._feed_size()
+        if result.applied:
+            BUS.publish(self.topic, result.applied, feed_offset)
+        return result, current, feed_offset
+
+    @staticmethod
+    def _resolve(current: Dict, versions: Dict, change: Change, result: CommitResult):
+        """Value to write for one change, or _MISSING when it is a no-op or a conflict"""
+        if change.op == 'append':
+            return change.value
+        theirs = get_pointer(current, change.key)
+        parent = get_pointer(current, encode_pointer(decode_pointer(change.key)[:-1]), None)
+        if isinstance(parent, list) and theirs is _MISSING:
+            # The list was shortened elsewhere; the item this session edited is gone
+            result.conflicts.append({'key': change.key, 'ours': change.value, 'theirs': None})
+            return _MISSING
+        unchanged = versions.get(change.key, 0) == change.base_version or (
+            theirs is not _MISSING and theirs == change.base)
+        target = _MISSING if change.op == 'delete' else change.value
+        if theirs == target or (theirs is _MISSING and change.op == 'delete'):
+            return _MISSING
+        if unchanged:
+            return None if change.op == 'delete' else change.value
+        if change.op == 'set' and all(isinstance(v, dict) for v in (change.base, change.value, theirs)):
+            merged = merge_fields(change.base, change.value, theirs)
+            if merged is not None:
+                result.merged.append(change.key)
+                return merged
+        result.conflicts.append({
+            'key': change.key, 'ours': None if target is _MISSING else target,
+            'theirs': None if theirs is _MISSING else theirs,
+        })
+        return _MISSING
+
+    def _write(self, data: Dict, entries: List[Dict]):
+        tmp = f'{self.data_file}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.data_file)
+        with open(self.feed_file, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def read_feed(self, offset: int) -> Tuple[List[Dict], int]:
+        """Complete feed entries after a byte offset, and the offset to continue from"""
+        if not os.path.exists(self.feed_file):
+            return [], offset
+        entries = []
+        with open(self.feed_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                entries.append(json.loads(line))
+        return entries, offset
+
+
+def _without_store_metadata(data: Dict) -> Dict:
+    metadata = data.get('metadata')
+    if isinstance(metadata, dict):
+        for key in ('record_versions', 'change_seq'):
+            metadata.pop(key, None)
+    return data
+
+
+class FarmSession:
+    """
+    One user session's view of the store: the working copy pages edit, the
+    base it was synced from, and the versions and feed position of that base.
+    """
+
+    def __init__(self, store: FarmStore):
+        self.store = store
+        self.session_id = uuid.uuid4().hex[:12]
+        self.farm_data: Dict = {}
+        self.reloads = 0
+        self.changes: List[ChangeEvent] = []
+        self.subscription = BUS.subscribe(store.topic)
+        self._reload(self.farm_data)
+
+    def _adopt(self, farm_data: Dict, data: Dict, feed_offset: int):
+        """Bring the working copy, in place (caches keep the same id), to the authoritative data"""
+        metadata = data.get('metadata', {})
+        self.versions = dict(metadata.get('record_versions', {}))
+        self.seq = metadata.get('change_seq', 0)
+        self.offset = feed_offset
+        text = json.dumps(_without_store_metadata(data), ensure_ascii=False)
+        self.base = json.loads(text)
+        if farm_data:
+            # Only records that differ are replaced, so untouched sub-dicts keep their identity
+            # and only caches over the touched sections go stale
+            changes = diff(farm_data, json.loads(text), {})
+            for change in changes:
+                self._apply_entry(farm_data, {'op': change.op, 'key': change.key, 'value': change.value})
+            bump_sections(farm_data, [decode_pointer(change.key)[0] for change in changes])
+        else:
+            farm_data.update(json.loads(text))
+        metadata = farm_data.setdefault('metadata', {})
+        metadata['last_updated'] = data.get('metadata', {}).get('last_updated', metadata.get('last_updated'))
+
+    def _reload(self, farm_data: Dict):
+        data, feed_offset = self.store.read()
+        self.reloads += 1
+        self._adopt(farm_data, data, feed_offset)
+
+    def save(self, farm_data: Dict) -> CommitResult:
+        """Commit the session's edits; the working copy becomes the authoritative data"""
+        changes = diff(self.base, farm_data, self.versions)
+        if not changes:
+            return CommitResult(self.seq)
+        result, data, feed_offset = self.store.commit(changes, self.session_id)
+        self._adopt(farm_data, data, feed_offset)
+        return result
+
+    def update(self, farm_data: Dict, mutate: Callable[[Dict], Any]) -> Tuple[CommitResult, Any]:
+        """FarmStore.update() on the authoritative data, then catch the working copy up with it"""
+        result, outcome = self.store.update(mutate, self.session_id)
+        self.refresh(farm_data)
+        return result, outcome
+
+    def has_pending(self) -> bool:
+        """Cheap check (bus, then one stat) for changes committed since the last sync"""
+        return self.subscription.pending() or self.store._feed_size() != self.offset
+
+    def refresh(self, farm_data: Dict) -> int:
+        """Apply other sessions' committed changes; number of changes applied (see self.changes)"""
+        self.changes = []
+        batches, overflowed = self.subscription.drain()
+        feed_size = self.store._feed_size()
+        if feed_size < self.offset:
+            # Feed truncated or replaced: positions are meaningless, start over from the file
+            self._reload(farm_data)
+            return 1
+        if batches and not overflowed and batches[-1][1] == feed_size:
+            # Everything came from this process's bus; no file read needed
+            entries, offset = [entry for batch in batches for entry in batch[0]], feed_size
+        elif feed_size != self.offset:
+            entries, offset = self.store.read_feed(self.offset)
+        else:
+            return 0
+        entries = [entry for entry in entries if entry['seq'] > self.seq]
+        if entries and entries[0]['seq'] > self.seq + 1:
+            self._reload(farm_data)
+            return len(entries)
+        for entry in entries:
+            for target in (farm_data, self.base):
+                self._apply_entry(target, entry)
+            self.versions[entry['key']] = entry['version']
+            if entry['op'] in ('append', 'replace'):
+                items = get_pointer(self.base, entry['key'], [])
+                for i in range(len(items)):
+                    self.versions.setdefault(f"{entry['key']}/{i}", 1)
+            self.seq = entry['seq']
+            self.changes.append(change_event(self.store.topic, entry))
+        self.offset = offset
+        # Only caches that depend on the touched sections go stale
+        bump_sections(farm_data, [event.section for event in self.changes])
+        return len(entries)
+
+    @staticmethod
+    def _apply_entry(data: Dict, entry: Dict):
+        value = json.loads(json.dumps(entry['value'], ensure_ascii=False))
+        if entry['op'] == 'append':
+            items = get_pointer(data, entry['key'], None)
+            if not isinstance(items, list):
+                set_pointer(data, entry['key'], value)
+            else:
+                items.extend(value)
+        elif entry['op'] == 'delete':
+            delete_pointer(data, entry['key'])
+        else:
+            set_pointer(data, entry['key'], value)
+
+
+def describe_key(pointer: str) -> str:
+    """Turkish label of a record for conflict messages"""
+    tokens = decode_pointer(pointer)
+    if len(tokens) == 3 and tokens[0] == 'daily_data':
+        return f"{tokens[2]} {tokens[1].replace('day_', '')}. gün kaydı"
+    if len(tokens) == 2 and tokens[0] == 'feed_invoices':
+        return f"{int(tokens[1]) + 1}. yem faturası"
+    if tokens[:2] == ('settings', 'houses') and len(tokens) == 3:
+        return f"{tokens[2]} ayarları"
+    if tokens and tokens[0] == 'settings':
+        return f"'{'/'.join(tokens[1:])}' ayarı"
+    return '/'.join(tokens)
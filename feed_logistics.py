@@ -4,8 +4,13 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from farm_records import FarmRecords, get_farm_records
+from instrumentation import instrument_methods
+from reference_cache import day_table
+
+@instrument_methods
 class FeedLogistics:
     """Advanced feed logistics management system"""
     
@@ -13,12 +18,13 @@ class FeedLogistics:
         self.farm_data = farm_data
         self.banvit_data = banvit_data
         self.settings = farm_data['settings']
+        self.feed_per_bird = day_table(banvit_data).column('yem_tüketimi', 150)  # grams, indexed by day
         
     def get_daily_consumption_per_bird(self, day: int) -> float:
         """Get daily feed consumption per bird in grams (from Banvit data)"""
-        day_str = str(day)
-        if day_str in self.banvit_data:
-            return self.banvit_data[day_str].get('yem_tüketimi', 150) / 1000  # Convert to kg
+        grams = self.feed_per_bird[day] if 0 < day < len(self.feed_per_bird) else None
+        if grams is not None:
+            return grams / 1000  # Convert to kg
         return 0.15  # Default fallback
     
     def calculate_house_daily_consumption(self, house_name: str, day: int, live_birds: int) -> float:
@@ -95,7 +101,8 @@ class FeedLogistics:
         else:
             return ("🟢 NORMAL", f"Yem {silo_days_remaining:.1f} gün içinde tüketilecek")
     
-    def generate_order_recommendation(self, current_day: int, farm_data: Dict) -> Dict:
+    def generate_order_recommendation(self, current_day: int, farm_data: Dict,
+                                      records: Optional[FarmRecords] = None) -> Dict:
         """Generate comprehensive feed order recommendation"""
         
         recommendation = {
@@ -111,14 +118,11 @@ class FeedLogistics:
         houses_needing_order = []
         
         # Analyze each house
-        for house_name in self.settings['houses'].keys():
-            house_info = self.settings['houses'][house_name]
-            
-            # Get live birds
-            live_birds = farm_data.get('daily_data', {}).get(f'day_{current_day}', {}).get(house_name, {}).get('live', house_info['chick_count'])
-            
-            # Get current silo level
-            silo_remaining = farm_data.get('daily_data', {}).get(f'day_{current_day}', {}).get(house_name, {}).get('silo_remaining', 0)
+        records = records or get_farm_records(farm_data)
+        for record in records.day(current_day):
+            house_name = record.house
+            live_birds = records.live_birds(house_name, current_day)
+            silo_remaining = record.silo_remaining
             
             # Calculate days remaining
             days_remaining = self.calculate_days_until_empty(house_name, silo_remaining, current_day, live_birds)
@@ -139,7 +143,7 @@ class FeedLogistics:
                 "house_name": house_name,
                 "live_birds": live_birds,
                 "silo_remaining_kg": silo_remaining,
-                "silo_capacity_tons": house_info['silo_capacity'],
+                "silo_capacity_tons": records.house(house_name).silo_capacity,
                 "days_remaining": days_remaining,
                 "feed_type": feed_type,
                 "daily_consumption_kg": self.calculate_house_daily_consumption(house_name, current_day, live_birds),
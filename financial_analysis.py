@@ -0,0 +1,179 @@
+# Financial Analysis Module
+# Vectorized cost engine (feed, drugs, labor, energy) per house and day with a what-if API
+
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from chart_data import farm_cache_key
+from dosage_engine import DosagePlan
+from drug_parser import DrugNameMatcher
+from farm_records import FarmRecords
+from kpi_engine import FlockKPIs
+from metrics import record_cache
+
+FEED_TYPES = ('Civciv', 'Büyütme', 'Bitirme')
+
+_engine_cache: 'OrderedDict[tuple, FinancialEngine]' = OrderedDict()
+_ENGINE_CACHE_SIZE = 4
+
+
+def feed_type_index(settings: Dict, days: np.ndarray) -> np.ndarray:
+    """0/1/2 for Civciv/Büyütme/Bitirme per day (same cut-offs as FeedLogistics.get_feed_type_for_day)"""
+    transition = settings.get('feed_transition', {})
+    return np.searchsorted([transition.get('chick_to_grower', 14), transition.get('grower_to_finisher', 28)],
+                           days, side='left')
+
+
+def drug_price_vector(plan: DosagePlan, farm_data: Dict) -> np.ndarray:
+    """
+    Price per kg (or L) of product for each plan drug: drug_inventory cost,
+    falling back to settings.drug_costs matched by name.
+    """
+    inventory = farm_data.get('drug_inventory', {})
+    drug_costs = farm_data.get('settings', {}).get('drug_costs', {})
+    matcher = DrugNameMatcher(drug_costs)
+    prices = []
+    for drug in plan.drugs:
+        price = inventory.get(drug, {}).get('cost')
+        if not price:
+            price = drug_costs.get(matcher.match(drug), 0) if drug_costs else 0
+        prices.append(float(price or 0))
+    return np.array(prices)
+
+
+class FinancialEngine:
+    """
+    Per-(day, house) cost components computed once per data version. Feed is
+    kept as kg per feed type so a price change is one tensordot, which is what
+    makes what_if() cheap.
+    """
+
+    def __init__(self, farm_data: Dict, banvit_data: Dict, current_day: int, plan: DosagePlan,
+                 records: Optional[FarmRecords] = None):
+        self.settings = farm_data.get('settings', {})
+        records = records or FarmRecords.from_farm(farm_data)
+        self.houses = [house.name for house in records.houses]
+        self.current_day = current_day
+        n_days, n_houses = current_day, len(self.houses)
+        days = np.arange(1, n_days + 1)
+
+        # Live birds, weight and delivery-reconciled feed as the KPI engine has them, so
+        # cost per kg and what-if FCR agree with the dashboard
+        kpis = FlockKPIs.from_farm(farm_data, banvit_data, n_days, records)
+        self.live = kpis.live
+        self.weight_g = kpis.weight
+        self.biomass_kg = kpis.biomass
+        self.reconcile_factor = kpis.feed_factor or 1.0
+        feed_kg = kpis.feed
+        types = feed_type_index(self.settings, days)
+        self.feed_kg_by_type = np.stack([np.where(types[:, None] == t, feed_kg, 0) for t in range(len(FEED_TYPES))])
+
+        # Drugs: dosage plan amounts (g or ml) x price per kg/L
+        amounts = plan.amounts[:n_days].sum(axis=2) if plan.drugs else np.zeros((n_days, n_houses, 0))
+        self.drug_kg = amounts / 1000
+        self.drug_prices = drug_price_vector(plan, farm_data)
+        self.drugs = list(plan.drugs)
+
+        # Farm-level daily costs are shared by live birds
+        total_live = self.live.sum(axis=1, keepdims=True)
+        self.bird_share = np.divide(self.live, total_live, out=np.zeros_like(self.live), where=total_live > 0)
+        self.initial = kpis.initial
+
+    def default_feed_prices(self) -> np.ndarray:
+        feed_costs = self.settings.get('feed_costs', {})
+        return np.array([feed_costs.get(name, 0) for name in FEED_TYPES], dtype=float)
+
+    def costs(self, feed_prices: Optional[Dict[str, float]] = None, drug_price_factor: float = 1.0,
+              labor_cost_per_day: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """(days, houses) cost arrays per component"""
+        prices = self.default_feed_prices()
+        for name, price in (feed_prices or {}).items():
+            prices[FEED_TYPES.index(name)] = price
+        labor = self.settings.get('labor_cost_per_day', 0) if labor_cost_per_day is None else labor_cost_per_day
+        energy = self.settings.get('electricity_kwh_per_day', 0) * self.settings.get('electricity_cost_per_kwh', 0)
+
+        result = {
+            'feed': np.tensordot(prices, self.feed_kg_by_type, axes=1),
+            'drug': self.drug_kg @ (self.drug_prices * drug_price_factor),
+            'labor': self.bird_share * labor,
+            'energy': self.bird_share * energy,
+        }
+        chick_cost = np.zeros_like(result['feed'])
+        if len(chick_cost):
+            chick_cost[0] = self.initial * self.settings.get('chick_price', 0)
+        result['chicks'] = chick_cost
+        result['total'] = sum(result.values())
+        return result
+
+    def house_summary(self, **overrides) -> pd.DataFrame:
+        costs = self.costs(**overrides)
+        biomass = self.biomass_kg[-1] if len(self.biomass_kg) else np.zeros(len(self.houses))
+        totals = {name: values.sum(axis=0) for name, values in costs.items()}
+        return pd.DataFrame({
+            'Kümes': self.houses,
+            'Yem (TL)': totals['feed'].round(0),
+            'İlaç (TL)': totals['drug'].round(0),
+            'İşçilik (TL)': totals['labor'].round(0),
+            'Enerji (TL)': totals['energy'].round(0),
+            'Civciv (TL)': totals['chicks'].round(0),
+            'Toplam (TL)': totals['total'].round(0),
+            'Canlı Ağırlık (kg)': biomass.round(0),
+            'TL / kg': np.divide(totals['total'], biomass, out=np.zeros_like(biomass), where=biomass > 0).round(2),
+        })
+
+    def daily_cost_per_kg(self, **overrides) -> np.ndarray:
+        """(days,) cumulative farm cost divided by the day's live weight"""
+        cumulative = np.cumsum(self.costs(**overrides)['total'].sum(axis=1))
+        biomass = self.biomass_kg.sum(axis=1)
+        return np.divide(cumulative, biomass, out=np.zeros_like(cumulative), where=biomass > 0)
+
+    def what_if(self, feed_prices: Optional[Dict[str, float]] = None, sale_price_per_kg: Optional[float] = None,
+                drug_price_factor: float = 1.0, labor_cost_per_day: Optional[float] = None) -> Dict:
+        """Total cost, cost per kg and margin for changed prices, next to the baseline"""
+        sale_price = self.settings.get('live_weight_price', 0) if sale_price_per_kg is None else sale_price_per_kg
+        biomass = float(self.biomass_kg[-1].sum()) if len(self.biomass_kg) else 0.0
+
+        def evaluate(**overrides):
+            total = float(self.costs(**overrides)['total'].sum())
+            revenue = biomass * sale_price
+            return {
+                'total_cost': total,
+                'cost_per_kg': total / biomass if biomass else 0.0,
+                'revenue': revenue,
+                'margin': revenue - total,
+                'margin_pct': (revenue - total) / revenue * 100 if revenue else 0.0,
+            }
+
+        scenario = evaluate(feed_prices=feed_prices, drug_price_factor=drug_price_factor,
+                            labor_cost_per_day=labor_cost_per_day)
+        baseline = evaluate()
+        scenario['delta_cost'] = scenario['total_cost'] - baseline['total_cost']
+        scenario['baseline'] = baseline
+        return scenario
+
+    def financial_data(self) -> Dict:
+        """Values for farm_data['financial_data'] at settings prices"""
+        result = self.what_if()
+        return {
+            'total_revenue': round(result['revenue'], 2),
+            'total_expenses': round(result['total_cost'], 2),
+            'profit_margin': round(result['margin_pct'], 2),
+        }
+
+
+def get_financial_engine(farm_data: Dict, banvit_data: Dict, current_day: int, plan: DosagePlan) -> FinancialEngine:
+    """FinancialEngine cached per data version and day"""
+    key = (farm_cache_key(farm_data), current_day)
+    engine = _engine_cache.get(key)
+    record_cache('financial_engine', engine is not None)
+    if engine is None:
+        engine = FinancialEngine(farm_data, banvit_data, current_day, plan)
+        _engine_cache[key] = engine
+        if len(_engine_cache) > _ENGINE_CACHE_SIZE:
+            _engine_cache.popitem(last=False)
+    else:
+        _engine_cache.move_to_end(key)
+    return engine
@@ -0,0 +1,186 @@
+# Instrumentation Module
+# Per-rerun timing spans for hot paths, a ring buffer of recent reruns,
+# the hidden "Performans" sidebar panel and JSONL export
+
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional
+
+import streamlit as st
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+RUN_BUFFER_SIZE = 50
+PERF_EXPORT_FILE = 'performance_log.jsonl'
+
+_runs: deque = deque(maxlen=RUN_BUFFER_SIZE)
+_runs_lock = threading.Lock()
+# Streamlit runs every session's script in its own thread
+_local = threading.local()
+
+
+def begin_run(label: str = ''):
+    """Start recording a rerun; a run left open by st.stop()/st.rerun() is closed first"""
+    if getattr(_local, 'run', None) is not None:
+        end_run(interrupted=True)
+    _local.run = {'label': label, 'started_at': datetime.now().isoformat(), 'spans': []}
+    _local.stack = []
+    _local.start = time.perf_counter()
+
+
+def end_run(label: Optional[str] = None, interrupted: bool = False) -> Optional[Dict]:
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return None
+    _local.run = None
+    if label is not None:
+        run['label'] = label
+    run['total_ms'] = round((time.perf_counter() - _local.start) * 1000, 3)
+    run['interrupted'] = interrupted
+    with _runs_lock:
+        _runs.append(run)
+    return run
+
+
+@contextmanager
+def span(name: str):
+    """Time a block inside the current run; free when nothing is recording"""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    record = {'name': name, 'parent': _local.stack[-1] if _local.stack else None, 'depth': len(_local.stack),
+              'start_ms': round((start - _local.start) * 1000, 3)}
+    run['spans'].append(record)
+    _local.stack.append(len(run['spans']) - 1)
+    try:
+        yield
+    finally:
+        record['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        _local.stack.pop()
+
+
+def timed(func: Callable = None, *, name: str = None):
+    """Decorator form of span(); the span is named after the function unless given"""
+    if func is None:
+        return functools.partial(timed, name=name)
+    label = name or func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, 'run', None) is None:
+            return func(*args, **kwargs)
+        with span(label):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def instrument_methods(cls):
+    """Class decorator: time every public method and every _build_* chart builder"""
+    for attr, value in list(vars(cls).items()):
+        if callable(value) and not attr.startswith('__') and (not attr.startswith('_') or attr.startswith('_build_')):
+            setattr(cls, attr, timed(value, name=f'{cls.__name__}.{attr}'))
+    return cls
+
+
+def recent_runs() -> List[Dict]:
+    """Newest first"""
+    with _runs_lock:
+        return list(reversed(_runs))
+
+
+def clear_runs():
+    with _runs_lock:
+        _runs.clear()
+
+
+def summarize(run: Dict) -> 'pd.DataFrame':
+    """Calls, total and self time per span name, slowest first"""
+    import pandas as pd
+
+    spans = run.get('spans', [])
+    if not spans:
+        return pd.DataFrame(columns=['name', 'calls', 'total_ms', 'self_ms'])
+    child_ms = [0.0] * len(spans)
+    for s in spans:
+        if s['parent'] is not None:
+            child_ms[s['parent']] += s.get('duration_ms', 0)
+    df = pd.DataFrame({
+        'name': [s['name'] for s in spans],
+        'total_ms': [s.get('duration_ms', 0) for s in spans],
+        'self_ms': [max(s.get('duration_ms', 0) - c, 0) for s, c in zip(spans, child_ms)],
+        # Recursive calls would count their time twice in total_ms
+        'outermost': [not _has_ancestor(spans, i, s['name']) for i, s in enumerate(spans)],
+    })
+    df['total_ms'] = df['total_ms'].where(df['outermost'], 0)
+    summary = df.groupby('name').agg(calls=('name', 'size'), total_ms=('total_ms', 'sum'), self_ms=('self_ms', 'sum'))
+    return summary.round(3).sort_values('total_ms', ascending=False).reset_index()
+
+
+def _has_ancestor(spans: List[Dict], index: int, name: str) -> bool:
+    parent = spans[index]['parent']
+    while parent is not None:
+        if spans[parent]['name'] == name:
+            return True
+        parent = spans[parent]['parent']
+    return False
+
+
+def flame_data(run: Dict) -> Dict[str, list]:
+    """ids/labels/parents/values for a Plotly icicle: one box per span, sized by self time under the rerun root"""
+    spans = run.get('spans', [])
+    child_ms = [0.0] * len(spans)
+    for s in spans:
+        if s['parent'] is not None:
+            child_ms[s['parent']] += s.get('duration_ms', 0)
+    root = f"rerun ({run.get('total_ms', 0):.0f} ms)"
+    tracked_ms = sum(s.get('duration_ms', 0) for s in spans if s['parent'] is None)
+    data = {'ids': ['root'], 'labels': [root], 'parents': [''],
+            'values': [max(run.get('total_ms', 0) - tracked_ms, 0)]}
+    for i, s in enumerate(spans):
+        data['ids'].append(str(i))
+        data['labels'].append(s['name'])
+        data['parents'].append('root' if s['parent'] is None else str(s['parent']))
+        data['values'].append(max(s.get('duration_ms', 0) - child_ms[i], 0))
+    return data
+
+
+def export_runs(runs: Iterable[Dict], path: str = PERF_EXPORT_FILE) -> int:
+    """Append runs to a JSONL file, one rerun per line"""
+    count = 0
+    with open(path, 'a', encoding='utf-8') as f:
+        for run in runs:
+            f.write(json.dumps(run, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def render_performance_panel():
+    """Sidebar panel; streamlit_app shows it only with ?perf=1 in the URL"""
+    import plotly.graph_objects as go
+
+    runs = [run for run in recent_runs() if run.get('spans')]
+    with st.sidebar.expander("⏱️ Performans", expanded=False):
+        if not runs:
+            st.caption("Henüz ölçülmüş bir yeniden çalıştırma yok.")
+            return
+        labels = [f"{run['started_at'][11:19]} · {run['label']} · {run['total_ms']:.0f} ms" for run in runs]
+        choice = st.selectbox("Çalıştırma", range(len(runs)), format_func=lambda i: labels[i], key='perf_run')
+        run = runs[choice or 0]
+        st.dataframe(summarize(run), hide_index=True, use_container_width=True)
+
+        flame = flame_data(run)
+        fig = go.Figure(go.Icicle(branchvalues='remainder', tiling=dict(orientation='v'), **flame))
+        fig.update_layout(height=320, margin=dict(t=10, l=0, r=0, b=0))
+        st.plotly_chart(fig, use_container_width=True)
+
+        if st.button("📤 JSONL'e aktar", key='perf_export'):
+            count = export_runs(reversed(runs))
+            st.success(f"{count} çalıştırma {PERF_EXPORT_FILE} dosyasına eklendi.")
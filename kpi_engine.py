@@ -0,0 +1,266 @@
+# KPI Engine Module
+# EPEF, livability, daily gain, feed per bird and corrected FCR per house and day
+
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from change_feed import farm_token, section_version
+from farm_records import FarmRecords, day_record, reconcile_factor
+from metrics import record_cache
+from reference_cache import day_table
+
+# Corrected FCR: FCR adjusted to a 2.5 kg bird, one FCR point per 4.5 kg of weight difference
+CFCR_REFERENCE_WEIGHT = 2500
+CFCR_WEIGHT_PER_POINT = 4500
+
+# EPEF lower bounds for the performance grade shown on both dashboards
+EPEF_GRADES = (
+    (400, "🌟 Mükemmel"),
+    (350, "⭐ Çok İyi"),
+    (300, "✅ İyi"),
+    (250, "⚠️ Orta"),
+    (200, "🟡 Zayıf"),
+)
+
+_kpi_cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
+_KPI_CACHE_SIZE = 8
+KPI_SECTIONS = ('daily_data', 'settings', 'feed_invoices')
+
+
+def epef(livability_pct, weight_g, age, fcr):
+    """European Production Efficiency Factor: livability % x weight kg / (age x FCR) x 100"""
+    livability_pct, weight_g, age, fcr = np.broadcast_arrays(*map(np.asarray, (livability_pct, weight_g, age, fcr)))
+    valid = (fcr > 0) & (age > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(valid, livability_pct * weight_g / 1000 / (age * fcr) * 100, 0.0)
+
+
+def epef_grade(value: float) -> str:
+    for threshold, grade in EPEF_GRADES:
+        if value >= threshold:
+            return grade
+    return "🔴 Kritik"
+
+
+class FlockKPIs:
+    """
+    (day, house) KPI arrays computed in one pass. Inputs are deaths, measured
+    weight (0 = not weighed: the last weighing carried along the Ross curve,
+    the Ross target before the first one) and recorded feed (NaN = not
+    recorded, Banvit g/bird x live birds used). When deliveries are known the
+    feed is scaled to deliveries minus silo stock, as FinancialEngine does;
+    without them the feed-based KPIs are estimates (feed_estimated).
+    update_day() recomputes only the rows from the edited day onward.
+    """
+
+    def __init__(self, houses: List[str], initial: np.ndarray, deaths: np.ndarray, measured_weight: np.ndarray,
+                 recorded_feed: np.ndarray, target_weight: np.ndarray, target_feed_g: np.ndarray,
+                 delivered_kg: float = 0.0, silo_kg: Optional[np.ndarray] = None):
+        self.houses = list(houses)
+        self.house_index = {house: h for h, house in enumerate(self.houses)}
+        self.initial = np.asarray(initial, dtype=float)
+        self.deaths = np.asarray(deaths, dtype=float)
+        self.measured_weight = np.asarray(measured_weight, dtype=float)
+        self.recorded_feed = np.asarray(recorded_feed, dtype=float)
+        self.target_weight = np.asarray(target_weight, dtype=float)
+        self.target_feed_g = np.asarray(target_feed_g, dtype=float)
+        self.days = len(self.deaths)
+        self.age = np.arange(1, self.days + 1, dtype=float)[:, None]
+        # Deliveries and the silo stock on the last day, for the feed reconciliation
+        self.delivered_kg = float(delivered_kg)
+        self.silo_kg = np.zeros(len(self.houses)) if silo_kg is None else np.asarray(silo_kg, dtype=float)
+        self.feed_factor: Optional[float] = None
+
+        shape = self.deaths.shape
+        for name in ('cum_deaths', 'live', 'weight', 'raw_feed', 'feed', 'cum_feed', 'biomass', 'livability',
+                     'daily_gain', 'feed_per_bird', 'fcr', 'cfcr', 'epef'):
+            setattr(self, name, np.zeros(shape))
+        self._recompute(0)
+
+    @classmethod
+    def from_farm(cls, farm_data: Dict, banvit_data: Dict, current_day: int,
+                  records: Optional[FarmRecords] = None) -> 'FlockKPIs':
+        """streamlit_app data: daily_data['day_N'][house] records"""
+        records = records or FarmRecords.from_farm(farm_data)
+        houses = [house.name for house in records.houses]
+        deaths = np.zeros((current_day, len(houses)))
+        weight = np.zeros((current_day, len(houses)))
+        feed = np.full((current_day, len(houses)), np.nan)
+        for d in range(current_day):
+            for h, record in enumerate(records.day(d + 1)):
+                deaths[d, h], weight[d, h] = record.deaths, record.weight
+                if record.feed_consumed:
+                    feed[d, h] = record.feed_consumed
+        initial = [house.chick_count for house in records.houses]
+        silo = [record.silo_remaining for record in records.day(current_day)]
+        return cls(houses, initial, deaths, weight, feed, *cls._targets(banvit_data, current_day),
+                   delivered_kg=records.feed_received_kg, silo_kg=silo)
+
+    @classmethod
+    def from_daily_lists(cls, daily: Dict, chick_counts: List[int], banvit_data: Dict, current_day: int,
+                         delivered_kg: float = 0.0) -> 'FlockKPIs':
+        """
+        app.py data: gunluk_veriler[day] = {'olum': [...], 'agirlik': [...], 'silo': [...]}
+        with one value per house; delivered_kg is the yem_irsaliyesi total
+        """
+        n = len(chick_counts)
+        deaths = np.zeros((current_day, n))
+        weight = np.zeros((current_day, n))
+        silo = np.zeros(n)
+        for day, record in daily.items():
+            d = int(day) - 1
+            if not isinstance(record, dict) or not 0 <= d < current_day:
+                continue
+            deaths[d] = (list(record.get('olum', [])) + [0] * n)[:n]
+            weight[d] = (list(record.get('agirlik', [])) + [0] * n)[:n]
+            if d == current_day - 1:
+                silo = np.array((list(record.get('silo', [])) + [0] * n)[:n], dtype=float)
+        houses = [f"Kümes {i + 1}" for i in range(n)]
+        return cls(houses, chick_counts, deaths, weight, np.full((current_day, n), np.nan),
+                   *cls._targets(banvit_data, current_day), delivered_kg=delivered_kg, silo_kg=silo)
+
+    @staticmethod
+    def _targets(banvit_data: Dict, current_day: int):
+        standards = day_table(banvit_data)
+        return (np.array(standards.series('canlı_ağırlık', current_day), dtype=float),
+                np.array(standards.series('yem_tüketimi', current_day), dtype=float))
+
+    @property
+    def feed_estimated(self) -> bool:
+        """Some feed comes from the Banvit standard and could not be checked against deliveries"""
+        return self.feed_factor is None and bool(np.isnan(self.recorded_feed).any())
+
+    def _projected_weight(self, rows: slice) -> np.ndarray:
+        """Measured weight, else the house's last weighing scaled along the Ross curve"""
+        measured = self.measured_weight > 0
+        last = np.maximum.accumulate(np.where(measured, np.arange(self.days)[:, None], -1), axis=0)[rows]
+        weighed = np.maximum(last, 0)
+        at_weighing = self.measured_weight[weighed, np.arange(len(self.houses))]
+        target_then = self.target_weight[weighed]
+        target = np.broadcast_to(self.target_weight[rows, None], last.shape)
+        projected = np.divide(at_weighing * target, target_then, out=target.copy(), where=(last >= 0) & (target_then > 0))
+        return np.where(measured[rows], self.measured_weight[rows], projected)
+
+    def _recompute(self, start: int):
+        """Fill every derived array for rows start..end; earlier rows are reused"""
+        rows = slice(start, self.days)
+        previous_deaths = self.cum_deaths[start - 1] if start else 0
+        self.cum_deaths[rows] = previous_deaths + np.cumsum(self.deaths[rows], axis=0)
+        self.live[rows] = np.maximum(self.initial - self.cum_deaths[rows], 0)
+        self.weight[rows] = self._projected_weight(rows)
+        self.raw_feed[rows] = np.where(np.isnan(self.recorded_feed[rows]),
+                                       self.live[rows] * self.target_feed_g[rows, None] / 1000, self.recorded_feed[rows])
+        factor = reconcile_factor(self.delivered_kg, float(self.silo_kg.sum()), float(self.raw_feed.sum()))
+        if factor != self.feed_factor:
+            # The delivery scale covers every day, so a new one redoes the feed columns from day 1
+            self.feed_factor, start = factor, 0
+            rows = slice(0, self.days)
+        self.feed[rows] = self.raw_feed[rows] * (factor or 1.0)
+        previous_feed = self.cum_feed[start - 1] if start else 0
+        self.cum_feed[rows] = previous_feed + np.cumsum(self.feed[rows], axis=0)
+        self.biomass[rows] = self.live[rows] * self.weight[rows] / 1000
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.livability[rows] = np.where(self.initial > 0, self.live[rows] / self.initial * 100, 0)
+            self.daily_gain[rows] = self.weight[rows] / self.age[rows]
+            self.feed_per_bird[rows] = np.where(self.live[rows] > 0, self.cum_feed[rows] / self.live[rows], 0)
+            self.fcr[rows] = np.where(self.biomass[rows] > 0, self.cum_feed[rows] / self.biomass[rows], 0)
+        self.cfcr[rows] = np.where(self.fcr[rows] > 0,
+                                   self.fcr[rows] + (CFCR_REFERENCE_WEIGHT - self.weight[rows]) / CFCR_WEIGHT_PER_POINT, 0)
+        self.epef[rows] = epef(self.livability[rows], self.weight[rows], self.age[rows], self.fcr[rows])
+
+    def update_day(self, day: int, house: str, record: Dict):
+        """Apply one saved daily_data record and recompute from that day on"""
+        if not 1 <= day <= self.days or house not in self.house_index:
+            return
+        d, h = day - 1, self.house_index[house]
+        record = day_record(day, house, record)
+        self.deaths[d, h], self.measured_weight[d, h] = record.deaths, record.weight
+        self.recorded_feed[d, h] = record.feed_consumed if record.feed_consumed else np.nan
+        if day == self.days:
+            self.silo_kg[h] = record.silo_remaining
+        self._recompute(d)
+
+    def house_table(self, day: int) -> pd.DataFrame:
+        d = day - 1
+        return pd.DataFrame({
+            'Kümes': self.houses,
+            'Canlı': self.live[d].astype(int),
+            'Yaşama Gücü (%)': self.livability[d].round(2),
+            'Ağırlık (g)': self.weight[d].round(0),
+            'Günlük Kazanç (g)': self.daily_gain[d].round(1),
+            'Hayvan Başı Yem (kg)': self.feed_per_bird[d].round(3),
+            'FCR': self.fcr[d].round(3),
+            'Düz. FCR': self.cfcr[d].round(3),
+            'EPEF': self.epef[d].round(0),
+        })
+
+    def farm(self, day: int) -> Dict:
+        """Farm-level KPIs for one day, bird-weighted over houses"""
+        d = day - 1
+        live, initial = self.live[d].sum(), self.initial.sum()
+        biomass, cum_feed = self.biomass[d].sum(), self.cum_feed[d].sum()
+        weight = biomass / live * 1000 if live else 0.0
+        livability = live / initial * 100 if initial else 0.0
+        fcr = cum_feed / biomass if biomass else 0.0
+        value = float(epef(livability, weight, day, fcr))
+        return {
+            'live_birds': int(live),
+            'livability': livability,
+            'avg_weight': weight,
+            'daily_gain': weight / day,
+            'feed_per_bird': cum_feed / live if live else 0.0,
+            'fcr': fcr,
+            'cfcr': fcr + (CFCR_REFERENCE_WEIGHT - weight) / CFCR_WEIGHT_PER_POINT if fcr else 0.0,
+            'epef': value,
+            'grade': epef_grade(value),
+            'feed_estimated': self.feed_estimated,
+        }
+
+    def farm_fcr(self) -> np.ndarray:
+        """Farm-level cumulative FCR for every day"""
+        biomass = self.biomass.sum(axis=1)
+        return np.divide(self.cum_feed.sum(axis=1), biomass, out=np.zeros(self.days), where=biomass > 0)
+
+
+def _cache_key(farm_data: Dict, current_day: int) -> tuple:
+    settings = farm_data.get('settings', {})
+    return (farm_token(farm_data), settings.get('farm_name'), settings.get('start_date'), current_day)
+
+
+def _data_version(farm_data: Dict) -> int:
+    # Chat, invoices or drug edits from other sessions do not touch the KPIs
+    return section_version(farm_data, KPI_SECTIONS)
+
+
+def get_flock_kpis(farm_data: Dict, banvit_data: Dict, current_day: int) -> FlockKPIs:
+    """FlockKPIs for the current data version; a full build only when no incremental update applied"""
+    key = _cache_key(farm_data, current_day)
+    cached = _kpi_cache.get(key)
+    hit = cached is not None and cached[0] == _data_version(farm_data)
+    record_cache('flock_kpis', hit)
+    if not hit:
+        cached = (_data_version(farm_data), FlockKPIs.from_farm(farm_data, banvit_data, current_day))
+        _kpi_cache[key] = cached
+        if len(_kpi_cache) > _KPI_CACHE_SIZE:
+            _kpi_cache.popitem(last=False)
+    _kpi_cache.move_to_end(key)
+    return cached[1]
+
+
+def update_flock_kpis(farm_data: Dict, current_day: int, day: int, house: str) -> Optional[FlockKPIs]:
+    """
+    Call right after a daily record is saved and log_transaction bumped the
+    version; any other change in between forces the next get_flock_kpis() to rebuild.
+    """
+    key = _cache_key(farm_data, current_day)
+    cached = _kpi_cache.get(key)
+    if cached is None or cached[0] != _data_version(farm_data) - 1:
+        return None
+    record = farm_data.get('daily_data', {}).get(f'day_{day}', {}).get(house, {})
+    cached[1].update_day(day, house, record)
+    _kpi_cache[key] = (_data_version(farm_data), cached[1])
+    return cached[1]
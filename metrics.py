@@ -0,0 +1,263 @@
+# Metrics Module
+# Process-wide counters, gauges and histograms in Prometheus text format,
+# served from a local HTTP endpoint and/or dropped to a .prom file
+#
+#   KUMES_METRICS_PORT=9464            serve http://127.0.0.1:9464/metrics
+#   KUMES_METRICS_FILE=kumes.prom      rewrite the file at most every FILE_DROP_INTERVAL seconds
+
+import bisect
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Seconds; covers a fast JSON save up to a slow Gemini answer
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FILE_DROP_INTERVAL = 15.0
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}'
+                for key, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last = +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels) -> '_Timer':
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, key)} {count}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"{metric.name} is already registered as a {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+def write_textfile(registry: MetricsRegistry, path: str):
+    """Atomic file drop for node_exporter's textfile collector"""
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+
+class MetricsServer:
+    """GET /metrics on a daemon thread; binds to localhost by default"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9464):
+        # Only needed when the endpoint is enabled; keeps http.server out of the app's cold start
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> 'MetricsServer':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ============ APP METRICS ============
+REGISTRY = MetricsRegistry()
+
+SAVE_SECONDS = REGISTRY.histogram('kumes_save_seconds', 'JSON save latency', ('file',))
+SAVE_ERRORS = REGISTRY.counter('kumes_save_errors_total', 'Failed JSON saves', ('file',))
+FILE_BYTES = REGISTRY.gauge('kumes_file_bytes', 'Size of the last saved data file', ('file',))
+GEMINI_SECONDS = REGISTRY.histogram('kumes_gemini_request_seconds', 'Gemini request latency')
+GEMINI_REQUESTS = REGISTRY.counter('kumes_gemini_requests_total', 'Gemini requests by outcome', ('outcome',))
+CACHE_REQUESTS = REGISTRY.counter('kumes_cache_requests_total', 'Derived-data cache lookups', ('cache', 'result'))
+RERUN_SECONDS = REGISTRY.histogram('kumes_rerun_seconds', 'Page rerun duration', ('page',))
+
+_exporter_lock = threading.Lock()
+_server: Optional[MetricsServer] = None
+_last_drop = 0.0
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def start_exporter(registry: MetricsRegistry = REGISTRY) -> Optional[MetricsServer]:
+    """Start the HTTP endpoint once per process when KUMES_METRICS_PORT is set"""
+    global _server
+    port = os.environ.get('KUMES_METRICS_PORT')
+    if not port:
+        return None
+    with _exporter_lock:
+        if _server is None:
+            try:
+                _server = MetricsServer(registry, port=int(port)).start()
+            except (OSError, ValueError):
+                return None
+    return _server
+
+
+def drop_textfile(registry: MetricsRegistry = REGISTRY, force: bool = False):
+    """Rewrite KUMES_METRICS_FILE, throttled to one write per FILE_DROP_INTERVAL"""
+    global _last_drop
+    path = os.environ.get('KUMES_METRICS_FILE')
+    now = time.monotonic()
+    if not path or (not force and now - _last_drop < FILE_DROP_INTERVAL):
+        return
+    _last_drop = now
+    try:
+        write_textfile(registry, path)
+    except OSError:
+        pass
@@ -0,0 +1,340 @@
+# Mobile Ingest Module
+# Offline-first daily entry from the barn: phones queue house-day readings and sync them in
+# batches to a small JSON API; each batch is validated and applied in one farm store transaction
+#
+#   KUMES_INGEST_PORT=8765        serve POST http://<host>:8765/ingest from the app process
+#   KUMES_INGEST_TOKEN=...        required "Authorization: Bearer <token>"; no server without it
+#   KUMES_INGEST_HOST=0.0.0.0     interface to bind (default: all, so phones on the farm LAN reach it)
+#
+# Request:  {"device_id": "tel-1", "entries": [{"key": "<uuid>", "client_ts": "2026-03-01T06:10:00",
+#            "day": 12, "house": "Kümes 1", "deaths": 3, "weight": 410.5}]}
+# Response: {"applied": n, "results": [{"key": ..., "status": "applied|stale|duplicate|rejected", ...}]}
+#
+# The same field of the same house-day entered on two phones resolves to the reading with the
+# latest client timestamp (ties: device id, then key), so the result does not depend on which
+# batch reaches the server first. Fields saved in the web app are stamped with their save time
+# (stamp_fields), so a reading taken before that but synced after it does not overwrite them.
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from anomaly_detection import AnomalyDetector
+from farm_store import FarmStore
+from reference_cache import load_reference
+
+# Entry field -> daily_data record field, as in the daily entry form
+INGEST_FIELDS = {
+    'deaths': 'deaths',
+    'weight': 'weight',
+    'water': 'water_consumption',
+    'water_consumption': 'water_consumption',
+    'silo': 'silo_remaining',
+    'silo_remaining': 'silo_remaining',
+}
+MAX_BATCH_ENTRIES = 500
+MAX_DAY = 42
+# Idempotency keys are remembered this long after arrival; a replay after that is still
+# harmless, it just comes back as 'stale' instead of 'duplicate'
+IDEMPOTENCY_TTL_DAYS = 30
+INGEST_SESSION = 'mobile-ingest'
+# Device id in the stamps of fields saved through the web app
+WEB_DEVICE = 'web'
+
+
+class IngestError(Exception):
+    """A whole batch was refused (malformed body or too many entries)"""
+
+
+def _payload_hash(entry: Dict) -> str:
+    body = {k: v for k, v in entry.items() if k != 'key'}
+    return hashlib.sha1(json.dumps(body, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _normalize_ts(value) -> str:
+    """Client timestamp as naive UTC ISO text, so timestamps compare as strings"""
+    stamp = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if stamp.tzinfo is not None:
+        stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return stamp.isoformat(timespec='milliseconds')
+
+
+def stamp_fields(farm_data: Dict, day: int, house: str, fields, device_id: str = WEB_DEVICE):
+    """Stamp daily_data fields saved outside the ingest API (entry form, bulk import) with the current time"""
+    stamps = farm_data.setdefault('mobile_sync', {}).setdefault('stamps', {})
+    now = _utcnow().isoformat(timespec='milliseconds')
+    for field in fields:
+        stamps[f"day_{day}/{house}/{field}"] = [now, device_id, '']
+
+
+class MobileIngest:
+    """Validates queued mobile entries and applies a batch in one farm store transaction"""
+
+    def __init__(self, store: FarmStore, banvit_file: str = 'banvit_data.json', max_day: int = MAX_DAY):
+        self.store = store
+        self.banvit_file = banvit_file
+        self.max_day = max_day
+
+    def _banvit(self) -> Dict:
+        try:
+            return load_reference(self.banvit_file)
+        except (OSError, ValueError):
+            return {}
+
+    def validate(self, entry: Dict, houses: Dict, device_id: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """(normalized entry, None) or (None, Turkish error)"""
+        if not isinstance(entry, dict) or not entry.get('key'):
+            return None, "Kayıt anahtarı (key) eksik"
+        try:
+            client_ts = _normalize_ts(entry.get('client_ts'))
+        except (TypeError, ValueError):
+            return None, "client_ts ISO tarih/saat olmalı"
+        day = entry.get('day')
+        if not isinstance(day, int) or isinstance(day, bool) or not 1 <= day <= self.max_day:
+            return None, f"gün 1-{self.max_day} arasında tam sayı olmalı"
+        if not isinstance(entry.get('house'), str) or entry['house'] not in houses:
+            return None, f"bilinmeyen kümes '{entry.get('house')}'"
+
+        fields = {}
+        for name, field in INGEST_FIELDS.items():
+            value = entry.get(name)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                return None, f"'{name}' geçersiz veya negatif"
+            if field == 'deaths' and value % 1 != 0:
+                return None, "ölüm sayısı tam sayı olmalı"
+            fields[field] = int(value) if field == 'deaths' else float(value)
+        if not fields:
+            return None, "En az bir veri alanı gerekli: deaths, weight, water, silo"
+        return {
+            'key': str(entry['key']), 'device_id': str(entry.get('device_id') or device_id),
+            'client_ts': client_ts, 'day': day, 'house': entry['house'], 'fields': fields,
+            'hash': _payload_hash(entry),
+        }, None
+
+    def ingest(self, batch: Dict) -> Dict:
+        """Apply one batch; raises IngestError when the batch itself is malformed"""
+        if not isinstance(batch, dict) or not isinstance(batch.get('entries'), list):
+            raise IngestError("Gövde {'entries': [...]} biçiminde olmalı")
+        if len(batch['entries']) > MAX_BATCH_ENTRIES:
+            raise IngestError(f"Bir pakette en fazla {MAX_BATCH_ENTRIES} kayıt gönderilebilir")
+        device_id = str(batch.get('device_id', ''))
+        result, results = self.store.update(lambda data: self._apply(data, batch['entries'], device_id),
+                                            INGEST_SESSION)
+        return {
+            'applied': sum(1 for r in results if r['status'] == 'applied'),
+            'seq': result.seq,
+            'results': results,
+        }
+
+    def _apply(self, farm_data: Dict, entries: List[Dict], device_id: str) -> List[Dict]:
+        houses = farm_data.get('settings', {}).get('houses', {})
+        sync = farm_data.setdefault('mobile_sync', {})
+        seen = sync.setdefault('keys', {})
+        stamps = sync.setdefault('stamps', {})
+        daily_data = farm_data.setdefault('daily_data', {})
+        results, touched = [], set()
+        received = _utcnow().isoformat()
+
+        for raw in entries:
+            entry, error = self.validate(raw, houses, device_id)
+            key = raw.get('key') if isinstance(raw, dict) else None
+            if error:
+                results.append({'key': key, 'status': 'rejected', 'error': error})
+                continue
+            previous = seen.get(entry['key'])
+            if previous is not None:
+                if previous['hash'] != entry['hash']:
+                    results.append({'key': key, 'status': 'rejected',
+                                    'error': "Aynı anahtar farklı verilerle tekrar gönderildi"})
+                else:
+                    results.append({'key': key, 'status': 'duplicate'})
+                continue
+            seen[entry['key']] = {'hash': entry['hash'], 'received': received}
+
+            # Last writer by client time wins per field, whatever order batches arrive in
+            stamp = [entry['client_ts'], entry['device_id'], entry['key']]
+            record = daily_data.setdefault(f"day_{entry['day']}", {}).setdefault(entry['house'], {})
+            won = []
+            for field, value in entry['fields'].items():
+                stamp_key = f"day_{entry['day']}/{entry['house']}/{field}"
+                if stamps.get(stamp_key) is None or stamps[stamp_key] < stamp:
+                    stamps[stamp_key] = stamp
+                    record[field] = value
+                    won.append(field)
+            if won:
+                touched.add((entry['day'], entry['house']))
+            results.append({'key': key, 'status': 'applied' if won else 'stale', 'fields': won})
+
+        if touched:
+            self._update_anomalies(farm_data, touched)
+            farm_data.setdefault('metadata', {}).setdefault('transaction_log', []).append({
+                'timestamp': str(datetime.now()),
+                'action': 'Mobile Sync',
+                'details': f"{len(touched)} kümes-gün kaydı mobil cihazdan eşitlendi ({device_id or 'bilinmeyen cihaz'}).",
+            })
+        self._prune(seen)
+        return results
+
+    def _update_anomalies(self, farm_data: Dict, touched):
+        detector = AnomalyDetector(farm_data, self._banvit())
+        state_days = {house: state.get('day', 0) for house, state in detector.state.items()}
+        if any(day < state_days.get(house, 0) for day, house in touched):
+            # A reading from an earlier day arrived late: replay so baselines match day order
+            detector.rebuild()
+            return
+        for day, house in sorted(touched):
+            detector.update(house, day, farm_data['daily_data'][f'day_{day}'][house])
+
+    @staticmethod
+    def _prune(seen: Dict):
+        cutoff = (_utcnow() - timedelta(days=IDEMPOTENCY_TTL_DAYS)).isoformat()
+        for key in [k for k, v in seen.items() if v['received'] < cutoff]:
+            del seen[key]
+
+
+class IngestServer:
+    """POST /ingest on a daemon thread, in the style of metrics.MetricsServer"""
+
+    def __init__(self, ingest: MobileIngest, host: str = '127.0.0.1', port: int = 8765, token: str = None):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        ingest_ref = ingest
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: Dict):
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                if self.path.split('?')[0] != '/ingest':
+                    self._reply(404, {'error': 'not found'})
+                    return
+                if token and self.headers.get('Authorization') != f'Bearer {token}':
+                    self._reply(401, {'error': 'Yetkisiz'})
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    batch = json.loads(self.rfile.read(length).decode('utf-8'))
+                    self._reply(200, ingest_ref.ingest(batch))
+                except (ValueError, IngestError) as e:
+                    self._reply(400, {'error': str(e)})
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> 'IngestServer':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_server_lock = threading.Lock()
+_server: Optional[IngestServer] = None
+
+
+def start_ingest_server(data_file: str) -> Optional[IngestServer]:
+    """
+    Start the ingest API once per process when KUMES_INGEST_PORT is set. It writes
+    daily_data, so it is never served without KUMES_INGEST_TOKEN.
+    """
+    global _server
+    port, token = os.environ.get('KUMES_INGEST_PORT'), os.environ.get('KUMES_INGEST_TOKEN')
+    if not port or not token:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = IngestServer(MobileIngest(FarmStore(data_file)),
+                                       host=os.environ.get('KUMES_INGEST_HOST', '0.0.0.0'),
+                                       port=int(port), token=token).start()
+            except (OSError, ValueError):
+                return None
+    return _server
+
+
+# ============ STUB CLIENT ============
+
+class MobileQueueClient:
+    """
+    Reference phone client: readings are queued locally (optionally in a JSON file, so
+    they survive a restart) and sent in batches; entries leave the queue only once the
+    server has answered for them, so a dropped connection just means a later retry.
+    """
+
+    def __init__(self, device_id: str, transport: Callable[[Dict], Dict], queue_file: str = None):
+        self.device_id = device_id
+        self.transport = transport
+        self.queue_file = queue_file
+        self.queue: List[Dict] = []
+        if queue_file and os.path.exists(queue_file):
+            with open(queue_file, 'r', encoding='utf-8') as f:
+                self.queue = json.load(f)
+
+    @classmethod
+    def over_http(cls, device_id: str, url: str, token: str = None, queue_file: str = None,
+                  timeout: float = 10.0) -> 'MobileQueueClient':
+        import urllib.request
+
+        def transport(batch: Dict) -> Dict:
+            request = urllib.request.Request(url, data=json.dumps(batch, ensure_ascii=False).encode('utf-8'),
+                                             headers={'Content-Type': 'application/json'}, method='POST')
+            if token:
+                request.add_header('Authorization', f'Bearer {token}')
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        return cls(device_id, transport, queue_file)
+
+    def _persist(self):
+        if self.queue_file:
+            with open(self.queue_file, 'w', encoding='utf-8') as f:
+                json.dump(self.queue, f, ensure_ascii=False)
+
+    def record(self, day: int, house: str, client_ts: str = None, **fields) -> Dict:
+        entry = {
+            'key': uuid.uuid4().hex, 'client_ts': client_ts or _utcnow().isoformat(),
+            'device_id': self.device_id, 'day': day, 'house': house, **fields,
+        }
+        self.queue.append(entry)
+        self._persist()
+        return entry
+
+    def flush(self, batch_size: int = MAX_BATCH_ENTRIES) -> List[Dict]:
+        """Send the queue; returns the server results. Stops (keeping the rest) on a network error."""
+        results = []
+        while self.queue:
+            batch = self.queue[:batch_size]
+            try:
+                response = self.transport({'device_id': self.device_id, 'entries': batch})
+            except OSError:
+                break
+            answered = {r['key'] for r in response.get('results', [])}
+            self.queue = [e for e in self.queue if e['key'] not in answered]
+            self._persist()
+            results.extend(response.get('results', []))
+            if not answered:
+                break
+        return results
@@ -0,0 +1,155 @@
+# Mock Streamlit Module
+# Headless stand-in for `streamlit` that renders nothing and counts every st.* call
+
+import sys
+from collections import Counter
+from datetime import datetime
+
+
+class MockSessionState(dict):
+    """st.session_state: attribute and item access over one dict"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        del self[name]
+
+
+class MockStreamlit:
+    """
+    Widgets return their default value (buttons and form submits return False),
+    so pages render their read-only path. Any st.* call not defined here is
+    accepted and counted, so new widgets do not break the benchmark.
+    """
+
+    def __init__(self):
+        self.session_state = MockSessionState(farm_data={}, banvit_data={}, drug_program={}, chat_history=[])
+        self.secrets = {"GEMINI_API_KEY": "mock_api_key"}
+        self.query_params = {}
+        self.calls = Counter()
+
+    def _count(self, name):
+        self.calls[name] += 1
+
+    def reset_calls(self):
+        self.calls = Counter()
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def widget(*args, **kwargs):
+            self._count(name)
+            return None
+        return widget
+
+    @property
+    def sidebar(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    # Containers
+    def form(self, *args, **kwargs):
+        self._count('form')
+        return self
+
+    def expander(self, *args, **kwargs):
+        self._count('expander')
+        return self
+
+    def spinner(self, *args, **kwargs):
+        self._count('spinner')
+        return self
+
+    def columns(self, spec, *args, **kwargs):
+        self._count('columns')
+        return [self] * (spec if isinstance(spec, int) else len(spec))
+
+    def tabs(self, labels, *args, **kwargs):
+        self._count('tabs')
+        return [self] * len(labels)
+
+    # Inputs
+    def button(self, *args, **kwargs):
+        self._count('button')
+        return False
+
+    def form_submit_button(self, *args, **kwargs):
+        self._count('form_submit_button')
+        return False
+
+    def checkbox(self, label, value=False, *args, **kwargs):
+        self._count('checkbox')
+        return value
+
+    def text_input(self, label, value="", *args, **kwargs):
+        self._count('text_input')
+        return value
+
+    def text_area(self, label, value="", *args, **kwargs):
+        self._count('text_area')
+        return value
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, *args, **kwargs):
+        self._count('number_input')
+        if value is not None:
+            return value
+        return min_value if min_value is not None else 0
+
+    def date_input(self, label, value=None, *args, **kwargs):
+        self._count('date_input')
+        return value or datetime.now().date()
+
+    def selectbox(self, label, options, index=0, *args, **kwargs):
+        self._count('selectbox')
+        options = list(options)
+        return options[index] if options else None
+
+    def radio(self, label, options, index=0, *args, **kwargs):
+        self._count('radio')
+        options = list(options)
+        return options[index] if options else None
+
+    def multiselect(self, label, options, default=None, *args, **kwargs):
+        self._count('multiselect')
+        return list(default or [])
+
+    def slider(self, label, min_value=None, max_value=None, value=None, *args, **kwargs):
+        self._count('slider')
+        return value if value is not None else min_value
+
+    def file_uploader(self, *args, **kwargs):
+        self._count('file_uploader')
+        return None
+
+    # Control flow
+    def rerun(self):
+        self._count('rerun')
+
+    def stop(self):
+        self._count('stop')
+
+    def fragment(self, func=None, *, run_every=None):
+        """Fragments run inline, once per page render"""
+        if func is None:
+            return lambda f: f
+        return func
+
+
+def install() -> MockStreamlit:
+    """Replace `streamlit` in sys.modules; must run before any app module is imported"""
+    mock = MockStreamlit()
+    sys.modules['streamlit'] = mock
+    return mock
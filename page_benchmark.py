@@ -0,0 +1,218 @@
+# Page Benchmark Module
+# Renders every streamlit_app page headless (mock_streamlit) on synthetic farms of growing size;
+# records wall time, st.* call counts and peak memory, and fails on regressions against a baseline
+#
+#   python page_benchmark.py                      # compare with page_benchmark_baseline.json
+#   python page_benchmark.py --update-baseline    # record a new baseline
+#   python page_benchmark.py --sizes small --repeat 3
+#   python page_benchmark.py --imports            # -X importtime breakdown of the app's cold start
+
+import argparse
+import copy
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import instrumentation
+import mock_streamlit
+from farm_generator import FarmGenerator, GeneratorConfig
+
+BASELINE_FILE = 'page_benchmark_baseline.json'
+
+# name -> (houses, days, archived flocks)
+SIZES = {
+    'small': (2, 14, 0),
+    'medium': (6, 28, 5),
+    'large': (20, 42, 30),
+}
+
+# A page regresses when it is this much slower (ratio) and at least MIN_SLOWDOWN_MS slower in absolute terms
+TIME_TOLERANCE = 0.5
+MIN_SLOWDOWN_MS = 25.0
+CALL_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.5
+MIN_MEMORY_GROWTH_KB = 512
+
+# Must not be imported at app start; pages import them on first use
+DEFERRED_MODULES = ('pandas', 'numpy', 'plotly', 'google.generativeai')
+
+
+def make_farm(template: Dict, banvit_data: Dict, houses: int, days: int, flocks: int, seed: int = 0) -> Dict:
+    """Generated farm (farm_generator) on day `days` today, with `flocks` generated past flocks as benchmarks"""
+    from benchmarking import build_benchmark_index, flock_curves
+    from dashboard_analytics import DashboardAnalytics
+
+    config = GeneratorConfig(min_houses=houses, max_houses=houses, days=days, seed=seed)
+    farm = FarmGenerator(banvit_data, template, config).generate_flock(0, flocks)
+    farm['settings']['start_date'] = (datetime.now().date() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+    # Past flocks of the same farm, grown to slaughter age
+    past_flocks = FarmGenerator(banvit_data, template, GeneratorConfig(min_houses=houses, max_houses=houses, seed=seed))
+    archive = []
+    for i in range(flocks):
+        past = past_flocks.generate_flock(0, i)
+        analyzer = DashboardAnalytics(past, banvit_data, past_flocks.config.days, 0, 0, 0, 0)
+        archive.append({'flock_id': f'synthetic:{i}', **flock_curves(analyzer.get_historical_data())})
+    farm['performance_benchmarks'] = build_benchmark_index(archive) if archive else {}
+    return farm
+
+
+def _load(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def render(st, page) -> Tuple[float, int]:
+    """(milliseconds, st.* calls) for one render, recorded like an app rerun"""
+    st.reset_calls()
+    start = time.perf_counter()
+    instrumentation.begin_run()
+    page()
+    instrumentation.end_run()
+    return (time.perf_counter() - start) * 1000, sum(st.calls.values())
+
+
+def peak_memory_kb(page) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        page()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(sizes: List[str], repeat: int = 3) -> Dict[str, Dict[str, Dict]]:
+    """{size: {page: {cold_ms, warm_ms, calls, peak_kb}}}"""
+    st = mock_streamlit.install()
+    import streamlit_app
+
+    template, banvit, program = _load(streamlit_app.DATA_FILE), _load(streamlit_app.BANVIT_FILE), _load(streamlit_app.DRUG_PROGRAM_FILE)
+    results = {}
+    for size in sizes:
+        houses, days, flocks = SIZES[size]
+        farm = make_farm(template, banvit, houses, days, flocks)
+        results[size] = {}
+        for name, page in streamlit_app.PAGES.items():
+            st.session_state = mock_streamlit.MockSessionState(
+                farm_data=copy.deepcopy(farm), banvit_data=banvit, drug_program=program, chat_history=[])
+            cold_ms, calls = render(st, page)
+            warm = [render(st, page)[0] for _ in range(repeat)]
+            results[size][name] = {
+                'cold_ms': round(cold_ms, 2),
+                'warm_ms': round(statistics.median(warm), 2),
+                'calls': calls,
+                'peak_kb': round(peak_memory_kb(page), 1),
+            }
+    return results
+
+
+def import_time_report(module: str = 'streamlit_app') -> List[Dict]:
+    """
+    `python -X importtime` of importing `module` under the mock in a fresh
+    interpreter; one row per imported module in import order, depth 0 = top level.
+    """
+    code = f"import mock_streamlit; mock_streamlit.install(); import {module}"
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        prefix, cumulative_us, name = line.split('|', 2)
+        self_us = prefix.split(':', 1)[1]
+        label = name[1:]
+        rows.append({
+            'module': label.strip(),
+            'depth': (len(label) - len(label.lstrip())) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def format_import_report(rows: List[Dict], top: int = 20) -> str:
+    total = sum(r['cumulative_ms'] for r in rows if r['depth'] == 0)
+    lines = [f"{'module':<40}{'self ms':>10}{'cum ms':>10}", f"{'(all top-level imports)':<40}{'':>10}{total:>10.1f}"]
+    for r in sorted(rows, key=lambda r: r['cumulative_ms'], reverse=True)[:top]:
+        lines.append(f"{'  ' * r['depth'] + r['module']:<40}{r['self_ms']:>10.1f}{r['cumulative_ms']:>10.1f}")
+    deferred = [m for m in DEFERRED_MODULES if any(r['module'] == m for r in rows)]
+    lines.append(f"Deferred modules imported at start: {', '.join(deferred) or 'none'}")
+    return '\n'.join(lines)
+
+
+def compare(results: Dict, baseline: Dict) -> List[str]:
+    """Human-readable regressions of results against baseline (pages missing from the baseline are skipped)"""
+    regressions = []
+    for size, pages in results.items():
+        for page, current in pages.items():
+            previous = baseline.get(size, {}).get(page)
+            if not previous:
+                continue
+            for metric in ('cold_ms', 'warm_ms'):
+                limit = max(previous[metric] * (1 + TIME_TOLERANCE), previous[metric] + MIN_SLOWDOWN_MS)
+                if current[metric] > limit:
+                    regressions.append(f"{size} / {page}: {metric} {current[metric]:.1f} > {limit:.1f}")
+            if current['calls'] > previous['calls'] * (1 + CALL_TOLERANCE):
+                regressions.append(f"{size} / {page}: calls {current['calls']} > {previous['calls']}")
+            limit = max(previous['peak_kb'] * (1 + MEMORY_TOLERANCE), previous['peak_kb'] + MIN_MEMORY_GROWTH_KB)
+            if current['peak_kb'] > limit:
+                regressions.append(f"{size} / {page}: peak_kb {current['peak_kb']:.0f} > {limit:.0f}")
+    return regressions
+
+
+def format_results(results: Dict) -> str:
+    lines = [f"{'size':<8}{'page':<26}{'cold ms':>10}{'warm ms':>10}{'calls':>8}{'peak KB':>10}"]
+    for size, pages in results.items():
+        for page, r in pages.items():
+            lines.append(f"{size:<8}{page:<26}{r['cold_ms']:>10.1f}{r['warm_ms']:>10.1f}{r['calls']:>8}{r['peak_kb']:>10.0f}")
+    return '\n'.join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Headless page render benchmark")
+    parser.add_argument('--sizes', default=','.join(SIZES), help="comma separated: " + ', '.join(SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--imports', action='store_true', help="only report app import time")
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        rows = import_time_report()
+        print(format_import_report(rows))
+        return 1 if any(r['module'] in DEFERRED_MODULES for r in rows) else 0
+
+    results = run_benchmark([s for s in args.sizes.split(',') if s], args.repeat)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.update_baseline:
+        baseline = _load(args.baseline) if os.path.exists(args.baseline) else {}
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline")
+        return 0
+    regressions = compare(results, _load(args.baseline))
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
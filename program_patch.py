@@ -0,0 +1,233 @@
+# Drug Program Patch Module
+# Structured program diffs, validation against withdrawal/inventory, versioned apply and rollback
+
+import copy
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from drug_parser import SESSIONS, compile_program, get_session_text, unwrap_program
+from drug_schedule import DrugScheduleIndex, get_slaughter_day
+from drug_compatibility import CompatibilityMatrix, ProgramCompatibilityValidator
+
+SESSION_LABELS = {'morning': 'Sabah', 'evening': 'Akşam'}
+
+
+class PatchConflict(Exception):
+    """The program changed since the patch was prepared"""
+
+
+@dataclass
+class SessionChange:
+    """One session of one day: the value before and after (complete_drug_program.json session dicts)"""
+    day: int
+    session: str
+    old: Optional[Dict]
+    new: Optional[Dict]
+
+    def to_dict(self) -> Dict:
+        return {'day': self.day, 'session': self.session, 'old': self.old, 'new': self.new}
+
+
+@dataclass
+class ProgramPatch:
+    description: str
+    changes: List[SessionChange]
+    source: str = 'user'
+    patch_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+
+    @property
+    def days(self) -> List[int]:
+        return sorted({change.day for change in self.changes})
+
+    def summary_rows(self) -> List[Dict]:
+        return [{
+            'Gün': change.day,
+            'Seans': SESSION_LABELS[change.session],
+            'Önce': (change.old or {}).get('drug', ''),
+            'Sonra': (change.new or {}).get('drug', ''),
+            'Dozaj': (change.new or {}).get('dosage', ''),
+        } for change in self.changes]
+
+
+def make_patch(program: Dict, edits: Dict[int, Dict[str, Dict]], description: str,
+               source: str = 'user') -> ProgramPatch:
+    """
+    Diff {day: {session: {'drug': ..., 'dosage': ...}}} against the current
+    program; sessions that would not change are left out.
+    """
+    days = unwrap_program(program)
+    changes = []
+    for day in sorted(edits):
+        entry = days.get(str(day), {})
+        for session in SESSIONS:
+            if session not in edits[day]:
+                continue
+            old = copy.deepcopy(entry.get(session)) if isinstance(entry.get(session), dict) else None
+            new = {**(old or {}), **edits[day][session]}
+            if (old or {}).get('drug', '') != new.get('drug', '') or (old or {}).get('dosage', '') != new.get('dosage', ''):
+                changes.append(SessionChange(day, session, old, new))
+    return ProgramPatch(description, changes, source)
+
+
+def _patched_days(program: Dict, patch: ProgramPatch) -> Dict:
+    """Program days with the patch applied; only the touched days are copied"""
+    days = dict(unwrap_program(program))
+    for change in patch.changes:
+        entry = dict(days.get(str(change.day), {'day': change.day}))
+        entry[change.session] = change.new
+        days[str(change.day)] = entry
+    return days
+
+
+def validate_patch(patch: ProgramPatch, program: Dict, farm_data: Dict, max_day: int = 42) -> Tuple[List[str], List[str]]:
+    """(errors, warnings): withdrawal at slaughter and incompatible mixes are errors; stock gaps are warnings"""
+    errors, warnings = [], []
+    if not patch.changes:
+        return ["Değişiklik içermeyen öneri"], warnings
+    for change in patch.changes:
+        if not 1 <= change.day <= max_day:
+            errors.append(f"{change.day}. gün program aralığı dışında")
+    if errors:
+        return errors, warnings
+
+    inventory = farm_data.get('drug_inventory', {})
+    settings = farm_data.get('settings', {})
+    houses = list(settings.get('houses', {}).keys())
+    compiled = compile_program(_patched_days(program, patch), farm_data.get('drug_program', {}), inventory)
+
+    farm_program = unwrap_program(farm_data.get('drug_program', {}))
+    for change in patch.changes:
+        if get_session_text(farm_program.get(str(change.day), {}), change.session).strip():
+            warnings.append(f"{change.day}. gün {SESSION_LABELS[change.session]}: çiftlik programındaki kayıt bu değişikliği geçersiz kılar")
+
+    for day in patch.days:
+        for session in SESSIONS:
+            for record in compiled.get(day, {}).get(session, []):
+                if not record['matched']:
+                    warnings.append(f"{day}. gün: '{record['drug']}' envanterde yok")
+                elif not inventory[record['drug']].get('stock'):
+                    warnings.append(f"{day}. gün: {record['drug']} stokta yok")
+
+    slaughter_day = get_slaughter_day(settings)
+    if slaughter_day:
+        before = DrugScheduleIndex.from_farm(farm_data, compile_program(program, farm_data.get('drug_program', {}), inventory), max_day)
+        after = DrugScheduleIndex.from_farm(farm_data, compiled, max_day)
+        existing = {(h, i.drug, i.start) for h, found in before.withdrawal_conflicts(slaughter_day).items() for i in found}
+        for house, intervals in after.withdrawal_conflicts(slaughter_day).items():
+            for interval in intervals:
+                if (house, interval.drug, interval.start) not in existing:
+                    errors.append(f"{house}: {interval.drug} arınma süresi {interval.withdrawal_end}. güne kadar, "
+                                  f"kesim {slaughter_day}. gün")
+
+    validator = ProgramCompatibilityValidator(CompatibilityMatrix.from_farm(farm_data),
+                                              {day: compiled.get(day, {}) for day in patch.days}, houses, max_day)
+    for issue in validator.issues(severity='critical'):
+        errors.append(f"{issue['day']}. gün {SESSION_LABELS[issue['session']]}: {' + '.join(issue['drugs'])} uyumsuz")
+    return sorted(set(errors)), sorted(set(warnings))
+
+
+def patched_program(program: Dict, patches: Dict) -> Dict:
+    """Reference program days with the sessions patched in farm_data['program_patches'] laid over them"""
+    days = dict(unwrap_program(program))
+    for day, sessions in patches.get('days', {}).items():
+        entry = dict(days.get(day, {'day': int(day)}))
+        for session, value in sessions.items():
+            if value is None:
+                entry.pop(session, None)
+            else:
+                entry[session] = value
+        days[day] = entry
+    return days
+
+
+class ProgramVersionStore:
+    """
+    Patches over the veterinary reference program (complete_drug_program.json),
+    kept in farm_data['program_patches'] = {'version', 'days', 'history'} so
+    they are saved and shared through the farm store; the reference file is
+    never written. Every apply/rollback bumps the version; history keeps each
+    patch's before/after values so a rollback only rewrites the sessions the
+    patch touched.
+    """
+
+    def __init__(self, program: Dict, patches: Dict):
+        self.base = program
+        self.patches = patches
+
+    @property
+    def version(self) -> int:
+        return self.patches.get('version', 0)
+
+    @property
+    def history(self) -> List[Dict]:
+        return self.patches.get('history', [])
+
+    @property
+    def program(self) -> Dict:
+        """The program in effect: reference days with the patches applied"""
+        return patched_program(self.base, self.patches)
+
+    def _reference(self, change: SessionChange) -> Optional[Dict]:
+        return unwrap_program(self.base).get(str(change.day), {}).get(change.session)
+
+    def _current(self, change: SessionChange) -> Optional[Dict]:
+        sessions = self.patches.get('days', {}).get(str(change.day), {})
+        return sessions[change.session] if change.session in sessions else self._reference(change)
+
+    def _write(self, changes: List[SessionChange], use_old: bool):
+        days = self.patches.setdefault('days', {})
+        for change in changes:
+            value = change.old if use_old else change.new
+            sessions = days.setdefault(str(change.day), {})
+            if value == self._reference(change):
+                # Back to the reference value: nothing to keep for this session
+                sessions.pop(change.session, None)
+                if not sessions:
+                    del days[str(change.day)]
+            else:
+                sessions[change.session] = copy.deepcopy(value)
+
+    def _check_current(self, changes: List[SessionChange], use_old: bool):
+        for change in changes:
+            expected = change.old if use_old else change.new
+            if self._current(change) != expected:
+                raise PatchConflict(f"{change.day}. gün {SESSION_LABELS[change.session]} değişmiş")
+
+    def apply(self, patch: ProgramPatch, approved_by: str = '') -> int:
+        """All-or-nothing: every touched session must still hold the patch's 'old' value"""
+        self._check_current(patch.changes, use_old=True)
+        self._write(patch.changes, use_old=False)
+        self.patches['version'] = self.version + 1
+        self.patches.setdefault('history', []).append({
+            'version': self.version,
+            'patch_id': patch.patch_id,
+            'description': patch.description,
+            'source': patch.source,
+            'approved_by': approved_by,
+            'applied_at': str(datetime.now()),
+            'status': 'applied',
+            'changes': [change.to_dict() for change in patch.changes],
+        })
+        return self.version
+
+    def last_applied(self) -> Optional[Dict]:
+        for entry in reversed(self.history):
+            if entry['status'] == 'applied':
+                return entry
+        return None
+
+    def rollback(self) -> Optional[Dict]:
+        """Undo the most recent applied patch by restoring only its sessions"""
+        entry = self.last_applied()
+        if entry is None:
+            return None
+        changes = [SessionChange(**change) for change in entry['changes']]
+        self._check_current(changes, use_old=False)
+        self._write(changes, use_old=True)
+        self.patches['version'] = self.version + 1
+        entry['status'] = 'rolled_back'
+        entry['rolled_back_at'] = str(datetime.now())
+        entry['rolled_back_version'] = self.version
+        return entry
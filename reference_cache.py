@@ -0,0 +1,116 @@
+# Reference Cache Module
+# Read-only reference JSON (Banvit targets) parsed once per process and shared by every session,
+# and day-keyed tables ({'1': {...}, '2': {...}}) turned into lists indexed by the day number
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional
+
+# path -> ((mtime_ns, size), parsed)
+_reference_cache: Dict[str, tuple] = {}
+_lock = threading.Lock()
+
+# id(data) -> (data, DayTable); the data is held so its id cannot be reused while cached
+_day_tables: 'OrderedDict[int, tuple]' = OrderedDict()
+_DAY_TABLES_SIZE = 8
+
+
+def _signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_reference(path: str) -> Any:
+    """
+    Parsed JSON shared across sessions; reparsed only when the file changes.
+    Callers must not mutate the result. Raises like json.load / open.
+    """
+    signature = _signature(path)
+    cached = _reference_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with _lock:
+        cached = _reference_cache.get(path)
+        if cached is None or cached[0] != signature:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = (signature, json.load(f))
+            _reference_cache[path] = cached
+    return cached[1]
+
+
+def warm_up(paths: Iterable[str]) -> Dict[str, float]:
+    """Parse reference files ahead of the first session that needs them; milliseconds per file"""
+    timings = {}
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            load_reference(path)
+        except (OSError, ValueError):
+            continue
+        timings[path] = round((time.perf_counter() - start) * 1000, 3)
+    return timings
+
+
+class DayTable:
+    """
+    Rows of a day-keyed mapping in a list indexed by the day itself: day 0 and
+    days without a row hold None. Keys may be day strings (Banvit targets, the
+    vet program) or ints (compiled drug program).
+    """
+
+    __slots__ = ('rows', '_columns')
+
+    def __init__(self, data: Mapping):
+        days = {}
+        for key, row in data.items():
+            day = key if isinstance(key, int) else int(key) if isinstance(key, str) and key.isdigit() else 0
+            if day > 0 and isinstance(row, Mapping):
+                days[day] = row
+        self.rows: List[Optional[Mapping]] = [None] * (max(days, default=0) + 1)
+        for day, row in days.items():
+            self.rows[day] = row
+        self._columns: Dict[tuple, list] = {}
+
+    @property
+    def max_day(self) -> int:
+        return len(self.rows) - 1
+
+    def row(self, day: int) -> Optional[Mapping]:
+        return self.rows[day] if 0 < day < len(self.rows) else None
+
+    def column(self, field: str, default: Any = 0) -> list:
+        """field per day, `default` where a row lacks it and None for days without a row"""
+        column = self._columns.get((field, default))
+        if column is None:
+            column = [None if row is None else row.get(field, default) for row in self.rows]
+            self._columns[(field, default)] = column
+        return column
+
+    def series(self, field: str, n_days: int, default: Any = 0) -> list:
+        """field for days 1..n_days, `default` for days the table does not have"""
+        column = self.column(field, default)
+        values = [default if value is None else value for value in column[1:n_days + 1]]
+        return values + [default] * (n_days - len(values))
+
+
+def day_table(data: Mapping) -> DayTable:
+    """DayTable for a read-only day-keyed mapping, built once per object"""
+    cached = _day_tables.get(id(data))
+    if cached is not None and cached[0] is data:
+        return cached[1]
+    table = DayTable(data)
+    with _lock:
+        _day_tables[id(data)] = (data, table)
+        if len(_day_tables) > _DAY_TABLES_SIZE:
+            _day_tables.popitem(last=False)
+    return table
+
+
+def clear():
+    with _lock:
+        _reference_cache.clear()
+        _day_tables.clear()
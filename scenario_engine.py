@@ -0,0 +1,196 @@
+# Scenario Engine Module
+# Copy-on-write forks of farm_data for what-if runs of the calculation, logistics and finance engines
+
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Tuple
+
+import pandas as pd
+
+from dashboard_analytics import build_house_frame
+from dosage_engine import build_dosage_plan
+from feed_logistics import FeedLogistics
+from farm_records import FarmRecords
+from financial_analysis import FEED_TYPES, FinancialEngine
+
+BASELINE_NAME = 'Mevcut'
+
+METRIC_LABELS = {
+    'live_birds': 'Canlı Hayvan',
+    'mortality_pct': 'Kümülatif Ölüm (%)',
+    'avg_weight': 'Ort. Ağırlık (g)',
+    'fcr': 'FCR',
+    'feed_kg': 'Toplam Yem (kg)',
+    'finisher_kg': 'Bitirme Yemi (kg)',
+    'feed_type_today': 'Bugünkü Yem Tipi',
+    'min_feed_days': 'En Az Kalan Yem (gün)',
+    'total_cost': 'Toplam Maliyet (TL)',
+    'cost_per_kg': 'Maliyet (TL/kg)',
+    'margin': 'Kâr (TL)',
+}
+
+
+class CowDict(MutableMapping):
+    """
+    Copy-on-write view over a farm_data dict. Reads fall through to the base;
+    writes land in a per-level overlay. Nested dicts are wrapped on read and
+    only kept once something is written under them, so a fork holds just the
+    changed keys and the path to them. Lists are shared with the base: replace
+    them, never mutate them in place.
+    """
+
+    def __init__(self, base: Dict, parent: 'CowDict' = None, key=None):
+        self._base = base
+        self._overlay: Dict = {}
+        self._deleted = set()
+        self._parent = parent
+        self._key = key
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            return self._overlay[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        value = self._base[key]
+        return CowDict(value, self, key) if isinstance(value, dict) else value
+
+    def __setitem__(self, key, value):
+        self._overlay[key] = value
+        self._deleted.discard(key)
+        self._attach()
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._overlay.pop(key, None)
+        if key in self._base:
+            self._deleted.add(key)
+        self._attach()
+
+    def __contains__(self, key) -> bool:
+        return key in self._overlay or (key in self._base and key not in self._deleted)
+
+    def __iter__(self) -> Iterator:
+        for key in self._base:
+            if key not in self._deleted:
+                yield key
+        for key in self._overlay:
+            if key not in self._base:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"CowDict({self.materialize()!r})"
+
+    def _attach(self):
+        """Register this level with its parent the first time it is written to"""
+        if self._parent is not None and self._parent._overlay.get(self._key) is not self:
+            self._parent[self._key] = self
+
+    @property
+    def footprint(self) -> int:
+        """Number of overlay entries held by this fork (changed leaves plus the path to them)"""
+        return len(self._deleted) + sum(
+            1 + (value.footprint if isinstance(value, CowDict) else 0) for value in self._overlay.values()
+        )
+
+    def materialize(self) -> Dict:
+        """Plain dict; unchanged subtrees are shared with the base, not copied"""
+        result = {}
+        for key in self:
+            value = self._overlay[key] if key in self._overlay else self._base[key]
+            result[key] = value.materialize() if isinstance(value, CowDict) else value
+        return result
+
+
+def set_path(data: MutableMapping, path: Tuple, value):
+    """data[path[0]]...[path[-1]] = value, creating missing levels"""
+    node = data
+    for key in path[:-1]:
+        if key not in node:
+            node[key] = {}
+        node = node[key]
+    node[path[-1]] = value
+
+
+class Scenario:
+    """A named fork of farm_data and the changes made to it"""
+
+    def __init__(self, name: str, farm_data: Dict):
+        self.name = name
+        self.farm_data = CowDict(farm_data)
+        self.changes: List[str] = []
+
+    @property
+    def footprint(self) -> int:
+        return self.farm_data.footprint
+
+    def set(self, path: Tuple, value, label: str = None) -> 'Scenario':
+        set_path(self.farm_data, path, value)
+        self.changes.append(label or f"{'.'.join(map(str, path))} = {value}")
+        return self
+
+    def switch_feed(self, transition: str, day: int) -> 'Scenario':
+        """transition: 'chick_to_grower' or 'grower_to_finisher'; the last day of the earlier feed"""
+        return self.set(('settings', 'feed_transition', transition), int(day),
+                        f"Yem geçişi ({transition}): {day}. gün")
+
+    def set_feed_price(self, feed_type: str, price: float) -> 'Scenario':
+        return self.set(('settings', 'feed_costs', feed_type), float(price), f"{feed_type} yem: {price} TL/kg")
+
+    def scale_mortality(self, first_day: int, last_day: int, factor: float) -> 'Scenario':
+        """Multiply the recorded deaths of every house over [first_day, last_day]"""
+        daily_data = self.farm_data.get('daily_data', {})
+        for day in range(first_day, last_day + 1):
+            for house, record in daily_data.get(f'day_{day}', {}).items():
+                if record.get('deaths'):
+                    set_path(self.farm_data, ('daily_data', f'day_{day}', house, 'deaths'),
+                             int(round(record['deaths'] * factor)))
+        self.changes.append(f"Ölüm x{factor:g} ({first_day}-{last_day}. gün)")
+        return self
+
+
+def evaluate_farm(farm_data, banvit_data: Dict, current_day: int, compiled_program: Dict[int, Dict]) -> Dict:
+    """Headline calculation, logistics and finance figures for one farm_data (real or forked)"""
+    houses = list(farm_data['settings']['houses'].keys())
+    records = FarmRecords.from_farm(farm_data)
+    frame = build_house_frame(farm_data, banvit_data, current_day, records)
+    latest = frame[frame['day'] == current_day]
+    initial = latest['initial_birds'].sum()
+
+    plan = build_dosage_plan(compiled_program, houses, farm_data, banvit_data, records=records)
+    finance = FinancialEngine(farm_data, banvit_data, current_day, plan, records)
+    outcome = finance.what_if()
+    feed_kg = finance.feed_kg_by_type.sum(axis=(1, 2))
+    live = finance.live[-1].sum() if current_day else 0
+    biomass = finance.biomass_kg[-1].sum() if current_day else 0
+
+    logistics = FeedLogistics(farm_data, banvit_data)
+    recommendation = logistics.generate_order_recommendation(current_day, farm_data, records)
+    days_remaining = [house['days_remaining'] for house in recommendation['houses'].values()]
+
+    return {
+        'live_birds': int(latest['live_birds'].sum()),
+        'mortality_pct': round(latest['cum_deaths'].sum() / initial * 100, 2) if initial else 0.0,
+        'avg_weight': round(biomass / live * 1000, 1) if live else 0.0,
+        'fcr': round(feed_kg.sum() / biomass, 3) if biomass else 0.0,
+        'feed_kg': round(float(feed_kg.sum()), 0),
+        'finisher_kg': round(float(feed_kg[FEED_TYPES.index('Bitirme')]), 0),
+        'feed_type_today': logistics.get_feed_type_for_day(current_day),
+        'min_feed_days': round(min(days_remaining), 1) if days_remaining else 0.0,
+        'total_cost': round(outcome['total_cost'], 0),
+        'cost_per_kg': round(outcome['cost_per_kg'], 2),
+        'margin': round(outcome['margin'], 0),
+    }
+
+
+def compare_scenarios(farm_data: Dict, scenarios: List[Scenario], banvit_data: Dict, current_day: int,
+                      compiled_program: Dict[int, Dict]) -> pd.DataFrame:
+    """Metrics (rows) for the real farm and each scenario (columns)"""
+    columns = {BASELINE_NAME: evaluate_farm(farm_data, banvit_data, current_day, compiled_program)}
+    for scenario in scenarios:
+        columns[scenario.name] = evaluate_farm(scenario.farm_data, banvit_data, current_day, compiled_program)
+    df = pd.DataFrame(columns)
+    df.index = [METRIC_LABELS[metric] for metric in df.index]
+    return df
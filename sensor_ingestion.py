@@ -0,0 +1,343 @@
+# Sensor Ingestion Module
+# Streaming intake of hourly water-meter and silo load-cell readings with daily rollups
+
+import argparse
+import csv
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+from contextlib import closing, nullcontext
+from datetime import datetime, date
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+SENSOR_DB_FILE = 'sensor_data.db'
+
+# A socket connection commits what it has buffered at least this often, and whenever the client goes quiet
+FLUSH_SECONDS = 1.0
+
+# Yielded by a reading stream to commit the rows buffered so far
+FLUSH = object()
+
+# water: litres consumed during the hour, summed into a daily total
+# silo: load-cell weight in kg at the hour, the last reading is the day's level
+SENSOR_METRICS = ('water', 'silo')
+
+# A metered day with fewer hours than this is treated as incomplete
+MIN_HOURS_PER_DAY = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    house TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (house, metric, ts)
+);
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    house TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    total REAL NOT NULL,
+    last REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    count INTEGER NOT NULL,
+    last_ts TEXT NOT NULL,
+    PRIMARY KEY (house, metric, day)
+);
+"""
+
+
+def parse_reading(raw: Dict, start_date: date) -> Optional[Tuple[str, str, str, int, float]]:
+    """Normalize one raw reading to (house, metric, hour_ts, day, value); None if invalid"""
+    try:
+        metric = str(raw['metric']).strip().lower()
+        if metric not in SENSOR_METRICS:
+            return None
+        ts = datetime.fromisoformat(str(raw['timestamp']).strip())
+        value = float(raw['value'])
+        house = str(raw['house']).strip()
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not house or value < 0:
+        return None
+    day = (ts.date() - start_date).days + 1
+    if day < 1:
+        return None
+    hour_ts = ts.replace(minute=0, second=0, microsecond=0).isoformat()
+    return (house, metric, hour_ts, day, value)
+
+
+def iter_csv_readings(lines: Iterable[str]) -> Iterator[Dict]:
+    """Stream readings from CSV lines with a timestamp,house,metric,value header"""
+    for row in csv.DictReader(lines):
+        yield row
+
+
+def iter_jsonl_readings(lines: Iterable[str]) -> Iterator[Dict]:
+    """Stream readings from JSON Lines; malformed lines come through as empty (rejected) readings"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield {}
+
+
+class SensorStore:
+    """SQLite time-series store of hourly readings and their daily rollups"""
+
+    def __init__(self, db_path: str = SENSOR_DB_FILE):
+        self.db_path = db_path
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def write_batch(self, rows: List[Tuple[str, str, str, int, float]]) -> int:
+        """Upsert hourly rows and refresh the rollups of the days they touch, in one transaction"""
+        if not rows:
+            return 0
+        touched = {(house, metric, day) for house, metric, _, day, _ in rows}
+        with closing(self._connect()) as conn:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO readings (house, metric, ts, day, value) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                for house, metric, day in touched:
+                    conn.execute(
+                        """
+                        INSERT OR REPLACE INTO daily_rollup
+                            (house, metric, day, total, last, min, max, count, last_ts)
+                        SELECT house, metric, day, SUM(value),
+                               (SELECT value FROM readings r2
+                                 WHERE r2.house = r.house AND r2.metric = r.metric AND r2.day = r.day
+                                 ORDER BY ts DESC LIMIT 1),
+                               MIN(value), MAX(value), COUNT(*), MAX(ts)
+                        FROM readings r
+                        WHERE house = ? AND metric = ? AND day = ?
+                        GROUP BY house, metric, day
+                        """,
+                        (house, metric, day)
+                    )
+        return len(rows)
+
+    def get_daily_rollup(self, day: int, metric: str) -> Dict[str, Dict]:
+        """Return {house: rollup} for one day and metric"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "SELECT house, total, last, min, max, count, last_ts FROM daily_rollup WHERE day = ? AND metric = ?",
+                (day, metric)
+            )
+            return {
+                house: {'total': total, 'last': last, 'min': min_, 'max': max_, 'count': count, 'last_ts': last_ts}
+                for house, total, last, min_, max_, count, last_ts in cursor
+            }
+
+    def get_daily_water(self, day: int, min_hours: int = 0) -> Dict[str, float]:
+        """Total metered water (L) per house for a day, skipping days with too few hours"""
+        return {
+            house: r['total'] for house, r in self.get_daily_rollup(day, 'water').items()
+            if r['count'] >= min_hours
+        }
+
+    def get_silo_levels(self, day: int) -> Dict[str, float]:
+        """Latest load-cell silo level (kg) per house for a day"""
+        return {house: r['last'] for house, r in self.get_daily_rollup(day, 'silo').items()}
+
+    def get_hourly(self, house: str, metric: str, day: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Hourly (timestamp, value) series for a house, optionally limited to one day"""
+        query = "SELECT ts, value FROM readings WHERE house = ? AND metric = ?"
+        params: list = [house, metric]
+        if day is not None:
+            query += " AND day = ?"
+            params.append(day)
+        with closing(self._connect()) as conn:
+            return conn.execute(query + " ORDER BY ts", params).fetchall()
+
+
+_stores: Dict[str, SensorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path: str = SENSOR_DB_FILE) -> SensorStore:
+    """One SensorStore per database file and process, so the schema script runs once"""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = SensorStore(db_path)
+    return store
+
+
+def farm_start_date(data_file: str) -> date:
+    """settings.start_date of the saved farm data; today when it is missing"""
+    try:
+        with open(data_file, 'r', encoding='utf-8') as f:
+            return datetime.strptime(json.load(f)['settings']['start_date'], '%Y-%m-%d').date()
+    except (OSError, ValueError, KeyError, TypeError):
+        return date.today()
+
+
+class SensorIngestor:
+    """
+    Validates raw readings and writes them to the store in fixed-size batches.
+    start_date may be a callable, read once per ingest() call, so a long-running
+    server follows the flock that is current when a gateway connects.
+    """
+
+    def __init__(self, store: SensorStore, start_date: Union[date, Callable[[], date]], batch_size: int = 500):
+        self.store = store
+        self.start_date = start_date
+        self.batch_size = batch_size
+        self.accepted = 0
+        self.rejected = 0
+
+    def _write(self, batch: List[Tuple[str, str, str, int, float]], lock: Optional[threading.Lock]):
+        with lock or nullcontext():
+            self.accepted += self.store.write_batch(batch)
+
+    def ingest(self, readings: Iterable, lock: Optional[threading.Lock] = None) -> Dict[str, int]:
+        """
+        Consume an iterable of raw readings without materializing it. A FLUSH item
+        commits the rows buffered so far; lock, if given, is held per commit only.
+        """
+        accepted_before, rejected_before = self.accepted, self.rejected
+        start_date = self.start_date() if callable(self.start_date) else self.start_date
+        batch = []
+        for raw in readings:
+            if raw is FLUSH:
+                self._write(batch, lock)
+                batch = []
+                continue
+            row = parse_reading(raw, start_date)
+            if row is None:
+                self.rejected += 1
+                continue
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._write(batch, lock)
+                batch = []
+        self._write(batch, lock)
+        return {
+            'accepted': self.accepted - accepted_before,
+            'rejected': self.rejected - rejected_before
+        }
+
+    def ingest_file(self, file_path: str) -> Dict[str, int]:
+        """Ingest a .csv or .jsonl batch file line by line"""
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            if file_path.lower().endswith('.csv'):
+                return self.ingest(iter_csv_readings(f))
+            return self.ingest(iter_jsonl_readings(f))
+
+
+class _ReadingStreamHandler(socketserver.BaseRequestHandler):
+    """
+    Reads JSONL readings from a TCP client until it closes its side. Buffered
+    rows are committed every batch_size readings, every flush_seconds and as
+    soon as the client goes quiet, so a gateway that keeps its connection open
+    has its readings stored as they arrive; ingest_lock is held per commit.
+    """
+
+    def _readings(self) -> Iterator:
+        flush_seconds = self.server.flush_seconds
+        self.request.settimeout(flush_seconds)
+        buffer, last_flush = b'', time.monotonic()
+        while True:
+            try:
+                chunk = self.request.recv(65536)
+            except socket.timeout:
+                chunk = None
+            if chunk == b'':
+                break
+            if chunk:
+                *lines, buffer = (buffer + chunk).split(b'\n')
+                yield from iter_jsonl_readings(line.decode('utf-8', errors='replace') for line in lines)
+            if chunk is None or time.monotonic() - last_flush >= flush_seconds:
+                yield FLUSH
+                last_flush = time.monotonic()
+        yield from iter_jsonl_readings([buffer.decode('utf-8', errors='replace')])
+
+    def handle(self):
+        result = self.server.ingestor.ingest(self._readings(), lock=self.server.ingest_lock)
+        self.request.settimeout(None)
+        self.request.sendall((json.dumps(result) + '\n').encode('utf-8'))
+
+
+class SensorSocketServer(socketserver.ThreadingTCPServer):
+    """Local TCP endpoint for gateways that push JSONL readings"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, ingestor: SensorIngestor, host: str = '127.0.0.1', port: int = 0,
+                 flush_seconds: float = FLUSH_SECONDS):
+        super().__init__((host, port), _ReadingStreamHandler)
+        self.ingestor = ingestor
+        self.flush_seconds = flush_seconds
+        self.ingest_lock = threading.Lock()
+
+    def start_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+_server_lock = threading.Lock()
+_server: Optional[SensorSocketServer] = None
+
+
+def start_sensor_server(data_file: str, db_path: str = SENSOR_DB_FILE) -> Optional[SensorSocketServer]:
+    """
+    Start the sensor socket once per process when KUMES_SENSOR_PORT is set. It
+    has no authentication, so it listens on KUMES_SENSOR_HOST (default 127.0.0.1).
+    """
+    global _server
+    port = os.environ.get('KUMES_SENSOR_PORT')
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                ingestor = SensorIngestor(get_store(db_path), lambda: farm_start_date(data_file))
+                _server = SensorSocketServer(ingestor, host=os.environ.get('KUMES_SENSOR_HOST', '127.0.0.1'),
+                                             port=int(port))
+                _server.start_background()
+            except (OSError, ValueError):
+                return None
+    return _server
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Ingest hourly sensor readings into the sensor store')
+    parser.add_argument('files', nargs='*', help='.csv or .jsonl batch files')
+    parser.add_argument('--farm', default='farm_data.json', help='farm data file holding the flock start date')
+    parser.add_argument('--db', default=SENSOR_DB_FILE)
+    parser.add_argument('--serve', metavar='HOST:PORT', help='listen for gateways after ingesting the files')
+    args = parser.parse_args(argv)
+
+    ingestor = SensorIngestor(get_store(args.db), lambda: farm_start_date(args.farm))
+    for file_path in args.files:
+        print(json.dumps({'file': file_path, **ingestor.ingest_file(file_path)}, ensure_ascii=False))
+    if args.serve:
+        host, port = args.serve.rsplit(':', 1)
+        server = SensorSocketServer(ingestor, host, int(port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
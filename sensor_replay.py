@@ -0,0 +1,112 @@
+# Sensor Replay Generator
+# Produces hourly water-meter and silo load-cell readings shaped by the Banvit table
+
+import argparse
+import csv
+import json
+import random
+import socket
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List
+
+# Share of the daily water drunk in each hour (birds drink mostly in the light period)
+HOURLY_WATER_PROFILE = [0.01] * 5 + [0.05] * 17 + [0.02] * 2
+_PROFILE_TOTAL = sum(HOURLY_WATER_PROFILE)
+
+
+def generate_sample_readings(banvit_data: Dict, houses: Dict[str, int], start_date: str,
+                             days: int = 42, seed: int = 42, silo_start_kg: float = 8000,
+                             refill_kg: float = 9000) -> Iterator[Dict]:
+    """
+    Yield hourly readings in timestamp order for every house.
+
+    houses maps house name to bird count. Water follows the Banvit su_tüketimi
+    curve with a diurnal profile and noise; silo levels drop with the Banvit
+    feed curve and are refilled when they get low.
+    """
+    rng = random.Random(seed)
+    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+    silo_levels = {house: silo_start_kg for house in houses}
+
+    for day in range(1, days + 1):
+        standard = banvit_data.get(str(day), {})
+        water_per_1000 = standard.get('su_tüketimi', 300)
+        feed_per_bird_kg = standard.get('yem_tüketimi', 150) / 1000
+        for hour in range(24):
+            ts = start_dt + timedelta(days=day - 1, hours=hour)
+            share = HOURLY_WATER_PROFILE[hour] / _PROFILE_TOTAL
+            for house, birds in houses.items():
+                daily_water = birds / 1000 * water_per_1000
+                water = daily_water * share * rng.uniform(0.9, 1.1)
+                yield {'timestamp': ts.isoformat(), 'house': house, 'metric': 'water', 'value': round(water, 2)}
+
+                silo_levels[house] -= birds * feed_per_bird_kg * share
+                if silo_levels[house] < birds * feed_per_bird_kg:
+                    silo_levels[house] += refill_kg
+                level = max(0.0, silo_levels[house] + rng.gauss(0, 5))
+                yield {'timestamp': ts.isoformat(), 'house': house, 'metric': 'silo', 'value': round(level, 1)}
+
+
+def write_jsonl(readings: Iterable[Dict], stream) -> int:
+    count = 0
+    for reading in readings:
+        stream.write(json.dumps(reading, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def write_csv(readings: Iterable[Dict], stream) -> int:
+    writer = csv.DictWriter(stream, fieldnames=['timestamp', 'house', 'metric', 'value'])
+    writer.writeheader()
+    count = 0
+    for reading in readings:
+        writer.writerow(reading)
+        count += 1
+    return count
+
+
+def replay_to_socket(readings: Iterable[Dict], host: str, port: int) -> Dict:
+    """Push readings to a SensorSocketServer and return its ingest summary"""
+    with socket.create_connection((host, port)) as conn:
+        for reading in readings:
+            conn.sendall((json.dumps(reading, ensure_ascii=False) + '\n').encode('utf-8'))
+        conn.shutdown(socket.SHUT_WR)
+        response = b''
+        while not response.endswith(b'\n'):
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            response += chunk
+    return json.loads(response.decode('utf-8')) if response else {}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Replay sample hourly sensor readings')
+    parser.add_argument('--banvit', default='banvit_data.json')
+    parser.add_argument('--farm', default='farm_data.json')
+    parser.add_argument('--days', type=int, default=42)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--socket', help='host:port of a running sensor socket server')
+    args = parser.parse_args(argv)
+
+    with open(args.banvit, 'r', encoding='utf-8') as f:
+        banvit_data = json.load(f)
+    with open(args.farm, 'r', encoding='utf-8') as f:
+        settings = json.load(f).get('settings', {})
+    houses = {name: info.get('chick_count', 0) for name, info in settings.get('houses', {}).items()}
+    start_date = settings.get('start_date', datetime.now().strftime('%Y-%m-%d'))
+
+    readings = generate_sample_readings(banvit_data, houses, start_date, args.days, args.seed)
+    if args.socket:
+        host, port = args.socket.rsplit(':', 1)
+        print(json.dumps(replay_to_socket(readings, host, int(port))))
+    elif args.format == 'csv':
+        write_csv(readings, sys.stdout)
+    else:
+        write_jsonl(readings, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
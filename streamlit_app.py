@@ -1,20 +1,31 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import json
 import os
-from datetime import datetime, timedelta
-import numpy as np
-from typing import Dict, List, Tuple, Optional
-import google.generativeai as genai
-
-# Import modular components
-from dashboard_analytics import render_dashboard
-from enhanced_chat import render_chat_page
-from feed_logistics import render_feed_logistics_page
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Tuple, Optional
+
+# Import modular components. Only stdlib-only modules are imported here; pandas, numpy,
+# plotly, Gemini and the page modules built on them are imported by the page that needs
+# them, so a cold start (and every light page) skips them.
+from anomaly_detection import AnomalyDetector, get_active_alerts
+from sensor_ingestion import SensorStore, SENSOR_DB_FILE, MIN_HOURS_PER_DAY, get_store, start_sensor_server
+from drug_schedule import DrugScheduleIndex, get_slaughter_day
+from drug_parser import load_compiled_program, session_summary
+from farm_records import FarmRecords, get_farm_records
+from farm_store import FarmSession, FarmStore, describe_key
+from mobile_ingest import stamp_fields, start_ingest_server
+from instrumentation import begin_run, end_run, render_performance_panel, span, timed
+from metrics import FILE_BYTES, RERUN_SECONDS, SAVE_ERRORS, SAVE_SECONDS, drop_textfile, start_exporter
+from reference_cache import day_table, load_reference, warm_up
+
+if TYPE_CHECKING:
+    from dosage_engine import DosagePlan
+    from drug_compatibility import ProgramCompatibilityValidator
 
 # ============ CONFIGURATION ============
+# Everything from here to the end of main() is one recorded rerun
+begin_run()
+
 st.set_page_config(
     page_title="Murat Özkan Kümes İşletim Sistemi",
     layout="wide",
@@ -40,6 +51,9 @@ DATA_FILE = 'farm_data.json'
 BANVIT_FILE = 'banvit_data.json'
 DRUG_PROGRAM_FILE = 'complete_drug_program.json'
 
+# Read-only reference files shared by every session (parsed once per process)
+warm_up([BANVIT_FILE])
+
 def initialize_data_file(file_path, default_data):
     """If a data file doesn't exist, create it with default data."""
     if not os.path.exists(file_path):
@@ -52,9 +66,13 @@ def initialize_data_file(file_path, default_data):
             st.stop()
     return None
 
-def load_json(file_path):
+@timed
+def load_json(file_path, shared: bool = False):
+    """shared=True for read-only reference files: one parsed copy per process, never mutate it"""
     if os.path.exists(file_path):
         try:
+            if shared:
+                return load_reference(file_path)
             with open(file_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except (json.JSONDecodeError, FileNotFoundError) as e:
@@ -62,16 +80,34 @@ def load_json(file_path):
             return {}
     return {}
 
+@timed
 def save_json(data, file_path):
+    """The session's farm data is committed record by record through the farm store;
+    records another user changed in the meantime are merged or, if any clashes, the save is dropped."""
+    file_name = os.path.basename(file_path)
+    farm_sync = st.session_state.get('farm_sync') if file_path == DATA_FILE else None
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with SAVE_SECONDS.time(file=file_name):
+            if farm_sync is not None and data is st.session_state.farm_data:
+                result = farm_sync.save(data)
+            else:
+                result = None
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+        if result is not None and result.conflicts:
+            records = ', '.join(describe_key(conflict['key']) for conflict in result.conflicts)
+            st.warning(f"⚠️ {records} siz düzenlerken başka bir kullanıcı tarafından değiştirildi. "
+                       f"Bu işlemdeki değişikliklerinizin hiçbiri kaydedilmedi; güncel hali yüklendi.")
+        FILE_BYTES.set(os.path.getsize(file_path), file=file_name)
         return True
     except Exception as e:
+        SAVE_ERRORS.inc(file=file_name)
         st.error(f"Dosya kaydetme hatası: {e}")
         return False
 
 def log_transaction(data, action, details):
+    """Append to the transaction log; every transaction bumps metadata.data_version,
+    which derived caches use as their invalidation key."""
     transaction = {
         "timestamp": str(datetime.now()),
         "action": action,
@@ -83,12 +119,116 @@ def log_transaction(data, action, details):
         data["metadata"]["transaction_log"] = []
     data["metadata"]["transaction_log"].append(transaction)
     data["metadata"]["last_updated"] = str(datetime.now())
+    data["metadata"]["data_version"] = data["metadata"].get("data_version", 0) + 1
+
+def get_sensor_store() -> Optional[SensorStore]:
+    """Sensor time-series store (opened once per process), or None when no sensor data has been ingested"""
+    if os.path.exists(SENSOR_DB_FILE):
+        return get_store(SENSOR_DB_FILE)
+    return None
+
+def get_program_store():
+    """Read-only view of the veterinary program with this farm's applied patches"""
+    from program_patch import ProgramVersionStore
+    return ProgramVersionStore(st.session_state.drug_program, st.session_state.farm_data.get('program_patches', {}))
+
+def update_farm(mutate):
+    """Run mutate(farm_data) as one store transaction on the saved data (compare-and-set edits such as
+    program patches); other sessions see the result through the change feed"""
+    farm_sync = st.session_state.get('farm_sync')
+    if farm_sync is None:
+        outcome = mutate(st.session_state.farm_data)
+        save_json(st.session_state.farm_data, DATA_FILE)
+        return outcome
+    _, outcome = farm_sync.update(st.session_state.farm_data, mutate)
+    return outcome
+
+# Sections the compiled program and its indexes are built from, besides program_patches
+PROGRAM_SOURCES = ('drug_program', 'drug_inventory', 'settings', 'drug_compatibility_matrix',
+                   'drug_incompatibility_matrix')
+
+def _program_sources_version(farm_data) -> tuple:
+    versions = farm_data.get('metadata', {}).get('section_versions', {})
+    return tuple(versions.get(section, 0) for section in PROGRAM_SOURCES)
+
+def update_program(mutate, days):
+    """update_farm() for a program patch or rollback. When nothing else the program depends on changed,
+    only the touched days are recompiled and updated in the cached drug schedule and compatibility
+    validator instead of rebuilding them"""
+    from chart_data import farm_cache_key
+    from drug_parser import compile_program
+    farm_data = st.session_state.farm_data
+    key, sources = farm_cache_key(farm_data), _program_sources_version(farm_data)
+    cached = {name: st.session_state.get(name) for name in ('compiled_program', 'drug_schedule', 'compatibility_validator')}
+    outcome = update_farm(mutate)
+    program = cached.pop('compiled_program')
+    if _program_sources_version(farm_data) != sources or program is None or program[0] != key:
+        return outcome
+    edited = compile_program(get_program_store().program, farm_data.get('drug_program', {}),
+                             farm_data.get('drug_inventory', {}), days)
+    # Compiled programs are shared read-only (day_table), so the edited days go into a new dict
+    new_key = farm_cache_key(farm_data)
+    st.session_state.compiled_program = (new_key, {**program[1], **edited})
+    for name, entry in cached.items():
+        if entry is not None and entry[0] == key:
+            for day in days:
+                entry[1].update_day(day, edited.get(day, {}))
+            st.session_state[name] = (new_key, entry[1])
+    return outcome
+
+def get_compiled_program() -> Dict[int, Dict]:
+    """Parsed drug program (vet program + farm edits); reparsed only when its sources change"""
+    from chart_data import farm_cache_key
+    key = farm_cache_key(st.session_state.farm_data)
+    cached = st.session_state.get('compiled_program')
+    if cached is None or cached[0] != key:
+        farm_data = st.session_state.farm_data
+        cached = (key, load_compiled_program(get_program_store().program, farm_data.get('drug_program', {}),
+                                             farm_data.get('drug_inventory', {})))
+        st.session_state.compiled_program = cached
+    return cached[1]
+
+def get_drug_schedule() -> DrugScheduleIndex:
+    """Drug schedule index, recompiled only when farm data changes"""
+    from chart_data import farm_cache_key
+    key = farm_cache_key(st.session_state.farm_data)
+    cached = st.session_state.get('drug_schedule')
+    if cached is None or cached[0] != key:
+        cached = (key, DrugScheduleIndex.from_farm(st.session_state.farm_data, get_compiled_program()))
+        st.session_state.drug_schedule = cached
+    return cached[1]
+
+def get_dosage_plan() -> 'DosagePlan':
+    """Dosage plan over the compiled drug program, cached per data version"""
+    from chart_data import farm_cache_key
+    from dosage_engine import build_dosage_plan
+    key = farm_cache_key(st.session_state.farm_data)
+    cached = st.session_state.get('dosage_plan')
+    if cached is None or cached[0] != key:
+        houses = list(st.session_state.farm_data.get('settings', {}).get('houses', {}).keys())
+        cached = (key, build_dosage_plan(get_compiled_program(), houses, st.session_state.farm_data,
+                                         st.session_state.banvit_data))
+        st.session_state.dosage_plan = cached
+    return cached[1]
+
+def get_compatibility_validator() -> 'ProgramCompatibilityValidator':
+    """Mixing matrix and whole-program validation, cached per data version"""
+    from chart_data import farm_cache_key
+    from drug_compatibility import CompatibilityMatrix, ProgramCompatibilityValidator
+    key = farm_cache_key(st.session_state.farm_data)
+    cached = st.session_state.get('compatibility_validator')
+    if cached is None or cached[0] != key:
+        farm_data = st.session_state.farm_data
+        houses = list(farm_data.get('settings', {}).get('houses', {}).keys())
+        validator = ProgramCompatibilityValidator(CompatibilityMatrix.from_farm(farm_data), get_compiled_program(), houses)
+        cached = (key, validator)
+        st.session_state.compatibility_validator = cached
+    return cached[1]
 
 # ============ INITIALIZATION & ERROR HANDLING ============
-# Check for API Key first
+# Check for API Key first (the Gemini client itself is imported on the first AI request)
 try:
     GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
-    genai.configure(api_key=GEMINI_API_KEY)
 except (KeyError, Exception) as e:
     st.error("🔴 KRİTİK HATA: Gemini API anahtarı bulunamadı veya geçersiz. Lütfen Streamlit Cloud > Settings > Secrets bölümüne `GEMINI_API_KEY = '...'` olarak ekleyin.")
     st.stop()
@@ -96,7 +236,12 @@ except (KeyError, Exception) as e:
 # Initialize and load data files
 if 'farm_data' not in st.session_state:
     initialize_data_file(DATA_FILE, {"settings": {"houses": {}}, "daily_data": {}})
-    st.session_state.farm_data = load_json(DATA_FILE)
+    try:
+        st.session_state.farm_sync = FarmSession(FarmStore(DATA_FILE))
+        st.session_state.farm_data = st.session_state.farm_sync.farm_data
+    except (json.JSONDecodeError, OSError) as e:
+        st.error(f"{DATA_FILE} okunurken hata oluştu: {e}. Dosya bozuk veya bulunamıyor.")
+        st.session_state.farm_data = {}
     if not st.session_state.farm_data:
         st.error("farm_data.json yüklenemedi veya boş. Uygulama başlatılamıyor.")
         st.stop()
@@ -112,14 +257,22 @@ if 'farm_data' not in st.session_state:
             'grower_to_finisher': 28
         }
 
+elif 'farm_sync' in st.session_state:
+    # Other users' saves arrive through the change feed instead of a full reload
+    farm_sync = st.session_state.farm_sync
+    if farm_sync.refresh(st.session_state.farm_data) and farm_sync.changes:
+        labels = list(dict.fromkeys(event.label() for event in farm_sync.changes))
+        st.toast("🔄 Başka bir kullanıcının değişiklikleri yüklendi: " + ", ".join(labels[:3])
+                 + (" ..." if len(labels) > 3 else ""))
+
 if 'banvit_data' not in st.session_state:
-    st.session_state.banvit_data = load_json(BANVIT_FILE)
+    st.session_state.banvit_data = load_json(BANVIT_FILE, shared=True)
     if not st.session_state.banvit_data:
         st.warning("banvit_data.json bulunamadı. Hedef değerler olmadan çalışılacak.")
         st.session_state.banvit_data = {}
 
 if 'drug_program' not in st.session_state:
-    st.session_state.drug_program = load_json(DRUG_PROGRAM_FILE)
+    st.session_state.drug_program = load_json(DRUG_PROGRAM_FILE, shared=True)
     if not st.session_state.drug_program:
         st.warning("complete_drug_program.json bulunamadı. İlaç programı boş olacak.")
         st.session_state.drug_program = {}
@@ -136,151 +289,120 @@ def get_current_day():
     except (ValueError, TypeError):
         return 1
 
+def get_records() -> FarmRecords:
+    """Typed, validated view of the session's farm data (rebuilt when its data version changes)"""
+    return get_farm_records(st.session_state.farm_data)
+
+@timed
 def calculate_live_birds_per_house(house_name: str, current_day: int) -> int:
-    try:
-        initial = st.session_state.farm_data['settings']['houses'][house_name]['chick_count']
-        deaths = sum(
-            st.session_state.farm_data.get('daily_data', {}).get(f'day_{day}', {}).get(house_name, {}).get('deaths', 0)
-            for day in range(1, current_day + 1)
-        )
-        return max(0, initial - deaths)
-    except (KeyError, TypeError):
-        return 0
+    return get_records().live_birds(house_name, current_day)
 
+@timed
 def calculate_total_live_birds(current_day: int) -> int:
-    try:
-        return sum(calculate_live_birds_per_house(h, current_day) for h in st.session_state.farm_data.get('settings', {}).get('houses', {}).keys())
-    except (KeyError, TypeError):
-        return 0
+    return get_records().total_live_birds(current_day)
 
+@timed
 def calculate_average_weight(current_day: int) -> float:
     """Çiftlik ortalaması canlı ağırlık (gram)"""
-    try:
-        total_weight = 0
-        total_birds = 0
-        
-        for house_name in st.session_state.farm_data['settings']['houses'].keys():
-            day_key = f"day_{current_day}"
-            if day_key in st.session_state.farm_data['daily_data']:
-                day_data = st.session_state.farm_data['daily_data'][day_key]
-                if house_name in day_data and 'weight' in day_data[house_name]:
-                    weight = day_data[house_name]['weight']
-                    live_birds = calculate_live_birds_per_house(house_name, current_day)
-                    total_weight += weight * live_birds
-                    total_birds += live_birds
-        
-        if total_birds > 0:
-            return total_weight / total_birds
-        return 0
-    except:
-        return 0
-
+    records = get_records()
+    total_weight = 0
+    total_birds = 0
+    for record in records.day(current_day):
+        if record.weight > 0:
+            live_birds = records.live_birds(record.house, current_day)
+            total_weight += record.weight * live_birds
+            total_birds += live_birds
+
+    if total_birds > 0:
+        return total_weight / total_birds
+    return 0
+
+@timed
 def calculate_fcr(current_day: int) -> float:
-    """Çiftlik FCR hesapla: (Toplam Gelen Yem - Siloda Kalan) / Toplam Canlı Hayvan"""
-    try:
-        # Toplam gelen yem
-        total_feed_received = 0
-        for invoice in st.session_state.farm_data.get('feed_invoices', []):
-            total_feed_received += invoice.get('quantity', 0)
-        
-        # Toplam siloda kalan yem
-        total_silo_remaining = 0
-        day_key = f"day_{current_day}"
-        if day_key in st.session_state.farm_data['daily_data']:
-            day_data = st.session_state.farm_data['daily_data'][day_key]
-            for house_name in st.session_state.farm_data['settings']['houses'].keys():
-                if house_name in day_data and 'silo_remaining' in day_data[house_name]:
-                    total_silo_remaining += day_data[house_name]['silo_remaining']
-        
-        # Net tüketilen yem
-        net_consumed = total_feed_received - total_silo_remaining
-        total_live = calculate_total_live_birds(current_day)
-        
-        if total_live > 0 and net_consumed > 0:
-            return net_consumed / total_live
-        return 0
-    except:
-        return 0
+    """Çiftlik kümülatif FCR'ı: KPI motorundan (yem, gelen yem - siloda kalan ile düzeltilir)"""
+    from kpi_engine import get_flock_kpis
+    return get_flock_kpis(st.session_state.farm_data, st.session_state.banvit_data, current_day).farm(current_day)['fcr']
 
+@timed
 def calculate_death_rate(current_day: int) -> float:
     """Ölüm oranı (%) hesapla"""
-    try:
-        total_deaths = 0
-        total_initial = 0
-        
-        for house_name, house_info in st.session_state.farm_data['settings']['houses'].items():
-            total_initial += house_info['chick_count']
-            
-            for day in range(1, current_day + 1):
-                day_key = f"day_{day}"
-                if day_key in st.session_state.farm_data['daily_data']:
-                    day_data = st.session_state.farm_data['daily_data'][day_key]
-                    if house_name in day_data and 'deaths' in day_data[house_name]:
-                        total_deaths += day_data[house_name]['deaths']
-        
-        if total_initial > 0:
-            return (total_deaths / total_initial) * 100
-        return 0
-    except:
-        return 0
-
+    records = get_records()
+    total_initial = records.total_chicks
+    if total_initial > 0:
+        total_deaths = sum(records.cumulative_deaths(house.name, current_day) for house in records.houses)
+        return (total_deaths / total_initial) * 100
+    return 0
+
+@timed
 def calculate_feed_days_remaining(current_day: int) -> Dict[str, float]:
     """Her kümes için siloda kaç günlük yem kaldığını hesapla"""
     result = {}
-    
-    try:
-        day_data_key = f"day_{current_day}"
-        banvit_day = str(current_day)
-        
-        if banvit_day not in st.session_state.banvit_data:
-            return result
-        
-        daily_consumption_per_bird = st.session_state.banvit_data[banvit_day].get('yem_tüketimi', 150) / 1000  # gram to kg
-        
-        for house_name in st.session_state.farm_data['settings']['houses'].keys():
-            live_birds = calculate_live_birds_per_house(house_name, current_day)
-            daily_need = live_birds * daily_consumption_per_bird
-            
-            silo_remaining = 0
-            if day_data_key in st.session_state.farm_data['daily_data']:
-                day_data = st.session_state.farm_data['daily_data'][day_data_key]
-                if house_name in day_data and 'silo_remaining' in day_data[house_name]:
-                    silo_remaining = day_data[house_name]['silo_remaining']
-            
-            if daily_need > 0:
-                days_remaining = silo_remaining / daily_need
-            else:
-                days_remaining = 0
-            
-            result[house_name] = days_remaining
-            
-        return result
-    except:
+    standard = day_table(st.session_state.banvit_data).row(current_day)
+    if standard is None:
         return result
 
+    daily_consumption_per_bird = standard.get('yem_tüketimi', 150) / 1000  # gram to kg
+
+    # Load-cell levels are fresher than the manual entry when a silo is instrumented
+    store = get_sensor_store()
+    sensor_levels = store.get_silo_levels(current_day) if store else {}
+
+    records = get_records()
+    for record in records.day(current_day):
+        daily_need = records.live_birds(record.house, current_day) * daily_consumption_per_bird
+        silo_remaining = sensor_levels.get(record.house, record.silo_remaining)
+        result[record.house] = silo_remaining / daily_need if daily_need > 0 else 0
+
+    return result
+
+@timed
 def calculate_water_preparation(current_day: int) -> Tuple[float, float]:
     """Sabah ve akşam hazırlanması gereken su miktarını hesapla"""
-    try:
-        banvit_day = str(current_day)
-        if banvit_day not in st.session_state.banvit_data:
-            return 0, 0
-        
-        water_per_1000_birds = st.session_state.banvit_data[banvit_day].get('su_tüketimi', 300)
-        total_live = calculate_total_live_birds(current_day)
-        
-        total_water = (total_live / 1000) * water_per_1000_birds
-        
-        # Sabah %60, Akşam %40
-        return total_water * 0.6, total_water * 0.4
-    except:
+    water = day_table(st.session_state.banvit_data).column('su_tüketimi', 300)
+    water_per_1000_birds = water[current_day] if 0 < current_day < len(water) else None
+    if water_per_1000_birds is None:
         return 0, 0
 
+    records = get_records()
+    total_water = (records.total_live_birds(current_day) / 1000) * water_per_1000_birds
+
+    # Metered houses: yesterday's measured water scaled along the Banvit curve
+    store = get_sensor_store()
+    if store and current_day > 1:
+        measured = store.get_daily_water(current_day - 1, min_hours=MIN_HOURS_PER_DAY)
+        previous_standard = day_table(st.session_state.banvit_data).column('su_tüketimi', 0)[current_day - 1] or 0
+        if measured and previous_standard > 0:
+            growth = water_per_1000_birds / previous_standard
+            total_water = 0
+            for house in records.houses:
+                if house.name in measured:
+                    total_water += measured[house.name] * growth
+                else:
+                    total_water += records.live_birds(house.name, current_day) / 1000 * water_per_1000_birds
+
+    # Sabah %60, Akşam %40
+    return total_water * 0.6, total_water * 0.4
+
 def get_drug_program_for_day(current_day: int) -> Dict:
-    """Belirli bir gün için ilaç programını döndürür"""
-    return st.session_state.drug_program.get(str(current_day), {})
+    """Belirli bir gün için derlenmiş ilaç programını döndürür"""
+    return day_table(get_compiled_program()).row(current_day) or {}
 
 # ============ PAGE RENDERING FUNCTIONS ============
+# Seconds between checks for other users' saves while the dashboard is open
+LIVE_REFRESH_SECONDS = 15
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_refresh():
+    """Rerun when another session has committed; the rerun applies its changes from the
+    change feed and only rebuilds the metrics and charts over the sections it touched"""
+    farm_sync = st.session_state.get('farm_sync')
+    if farm_sync is not None and farm_sync.has_pending():
+        st.rerun()
+
 def page_dashboard():
+    from dashboard_analytics import render_dashboard
+
+    live_refresh()
     current_day = get_current_day()
     total_live_birds = calculate_total_live_birds(current_day)
     avg_weight = calculate_average_weight(current_day)
@@ -304,6 +426,19 @@ def page_daily_entry():
     # Ensure daily_data for current day exists
     st.session_state.farm_data.setdefault('daily_data', {}).setdefault(f'day_{current_day}', {})
 
+    for alert in get_active_alerts(st.session_state.farm_data, current_day):
+        if alert['severity'] == 'critical':
+            st.error(f"🔴 {alert['message']}")
+        else:
+            st.warning(f"🟡 {alert['message']}")
+
+    # Malformed values read as 0 everywhere; list them here so they can be corrected
+    issues = get_records().issues
+    if issues:
+        with st.expander(f"⚠️ {len(issues)} kayıtta veri sorunu"):
+            for issue in issues[:50]:
+                st.caption(issue)
+
     for i in range(1, len(st.session_state.farm_data.get('settings', {}).get('houses', {})) + 1):
         house_name = f"Kümes {i}"
         house_settings = st.session_state.farm_data['settings']['houses'].get(house_name, {})
@@ -337,18 +472,60 @@ def page_daily_entry():
                 )
 
                 if st.form_submit_button(f"{house_name} Verilerini Kaydet"):
-                    st.session_state.farm_data['daily_data'][f'day_{current_day}'][house_name] = {
+                    record = {
                         'deaths': deaths,
                         'weight': weight,
                         'water_consumption': water_consumption,
                         'silo_remaining': silo_remaining
                     }
-                    save_json(st.session_state.farm_data, DATA_FILE)
+                    from benchmarking import record_fcr_projection
+                    from kpi_engine import update_flock_kpis
+
+                    # A phone reading taken before this save must not overwrite what was changed here
+                    stamp_fields(st.session_state.farm_data, current_day, house_name,
+                                 [field for field, value in record.items() if current_daily_data.get(field) != value])
+                    st.session_state.farm_data['daily_data'][f'day_{current_day}'][house_name] = record
+                    AnomalyDetector(st.session_state.farm_data, st.session_state.banvit_data).update(house_name, current_day, record)
                     log_transaction(st.session_state.farm_data, "Daily Data Entry", f"{house_name} için {current_day}. gün verileri kaydedildi.")
+                    update_flock_kpis(st.session_state.farm_data, current_day, current_day, house_name)
+                    record_fcr_projection(st.session_state.farm_data, current_day, calculate_fcr(current_day))
+                    save_json(st.session_state.farm_data, DATA_FILE)
                     st.success(f"✅ {house_name} için {current_day}. gün verileri kaydedildi!")
                     st.rerun()
 
+    st.markdown("---")
+    st.subheader("📥 Toplu Veri Aktarımı (CSV/Excel)")
+    st.caption("Sütunlar: day, house, deaths, weight, water, silo (gün, kümes, ölüm, ağırlık, su, silo da kabul edilir)")
+    uploaded = st.file_uploader("Geçmiş günlük veri dosyası", type=["csv", "xlsx"], key="bulk_import_file")
+    if uploaded is not None and st.button("📥 Dosyayı İçe Aktar"):
+        from bulk_import import BulkImporter, read_import_file
+
+        importer = BulkImporter(st.session_state.farm_data)
+        try:
+            clean, errors = importer.validate(read_import_file(uploaded, uploaded.name))
+        except ValueError as e:
+            clean, errors = None, [str(e)]
+        if errors:
+            st.error(f"İçe aktarma iptal edildi, {len(errors)} hata bulundu. Hiçbir kayıt değiştirilmedi.")
+            for error in errors[:20]:
+                st.write(f"- {error}")
+        elif clean.empty:
+            st.warning("Dosyada aktarılacak satır bulunamadı.")
+        else:
+            summary = importer.apply(clean)
+            AnomalyDetector(st.session_state.farm_data, st.session_state.banvit_data).rebuild()
+            log_transaction(
+                st.session_state.farm_data, "Bulk Import",
+                f"{uploaded.name}: {summary['rows']} kayıt ({summary['first_day']}-{summary['last_day']}. günler, {summary['houses']} kümes) içe aktarıldı."
+            )
+            save_json(st.session_state.farm_data, DATA_FILE)
+            st.success(f"✅ {summary['rows']} kayıt içe aktarıldı!")
+            st.rerun()
+
 def page_drug_program():
+    import pandas as pd
+    from program_patch import ProgramVersionStore, PatchConflict, make_patch, validate_patch
+
     st.title("💊 İlaç Programı")
 
     current_day = get_current_day()
@@ -358,29 +535,162 @@ def page_drug_program():
 
     if drug_info:
         st.markdown("### Bugünün İlaç Programı")
-        st.write(f"**Stratejik Odak**: {drug_info.get('Stratejik Odak', 'N/A')}")
-        st.write(f"**Sabah İlacı**: {drug_info.get('Sabah İlacı', 'N/A')}")
-        st.write(f"**Akşam İlacı**: {drug_info.get('Akşam İlacı', 'N/A')}")
-        st.write(f"**Dozaj Notu**: {drug_info.get('Dozaj Notu', 'N/A')}")
-        st.write(f"**Veteriner Notu**: {drug_info.get('Veteriner Notu', 'N/A')}")
+        st.write(f"**Stratejik Odak**: {drug_info.get('strategic_focus') or 'N/A'}")
+        st.write(f"**Sabah İlacı**: {session_summary(drug_info['morning']) or drug_info['morning_text'] or 'N/A'}")
+        st.write(f"**Akşam İlacı**: {session_summary(drug_info['evening']) or drug_info['evening_text'] or 'N/A'}")
+        unmatched = [r['drug'] for r in drug_info['morning'] + drug_info['evening'] if not r['matched']]
+        if unmatched:
+            st.caption(f"Envanterde eşleşmeyen: {', '.join(unmatched)}")
+        st.write(f"**Veteriner Notu**: {drug_info.get('note') or 'N/A'}")
     else:
         st.info("Bugün için belirlenmiş bir ilaç programı bulunmamaktadır.")
 
+    for issue in get_compatibility_validator().issues(day=current_day):
+        a, b = issue['drugs']
+        session = 'Sabah' if issue['session'] == 'morning' else 'Akşam'
+        if issue['severity'] == 'critical':
+            st.error(f"❌ {session}: {a} + {b} birlikte karıştırılmamalı ({', '.join(issue['houses'])})")
+        else:
+            st.warning(f"❔ {session}: {a} + {b} karışım uyumu doğrulanmadı")
+
+    schedule = get_drug_schedule()
+    st.markdown("---")
+    st.markdown("### Arınma (Withdrawal) Kontrolü")
+    slaughter_day = get_slaughter_day(st.session_state.farm_data.get('settings', {}))
+    if slaughter_day:
+        conflicts = schedule.withdrawal_conflicts(slaughter_day)
+        if conflicts:
+            st.error(f"⚠️ {slaughter_day}. gün kesim için arınma süresi dolmamış kümesler var. "
+                     f"En erken temiz gün: {schedule.earliest_clear_day()}")
+            st.dataframe(pd.DataFrame([
+                {'Kümes': house, 'İlaç': i.drug, 'Başlangıç': i.start, 'Bitiş': i.end, 'Arınma Sonu': i.withdrawal_end}
+                for house, intervals in conflicts.items() for i in intervals
+            ]), use_container_width=True)
+        else:
+            st.success(f"✅ {slaughter_day}. gün kesim için tüm kümeslerde arınma süreleri tamamlanıyor.")
+
+    in_withdrawal = sorted({
+        (i.drug, i.withdrawal_end)
+        for intervals in schedule.withdrawal_conflicts(current_day).values()
+        for i in intervals if i.in_withdrawal(current_day)
+    })
+    for drug, withdrawal_end in in_withdrawal:
+        st.warning(f"💊 {drug}: arınma süresi {withdrawal_end}. güne kadar devam ediyor")
+
+    st.markdown("---")
+    st.markdown("### 💧 Dozaj Planı")
+    plan = get_dosage_plan()
+    dose_day = st.number_input("Gün", min_value=1, max_value=plan.max_day, value=min(max(current_day, 1), plan.max_day),
+                               key="dosage_day")
+    session_df = plan.session_table(int(dose_day))
+    if session_df.empty:
+        st.info("Bu gün için suya ilaç verilmiyor.")
+    else:
+        st.dataframe(session_df, use_container_width=True)
+    if plan.unknown_drugs:
+        st.caption(f"Envanterde dozu tanımlı olmayan ilaçlar hesaba katılmadı: {', '.join(plan.unknown_drugs)}")
+
+    st.markdown("#### 🛒 Kalan Program İçin Satın Alma")
+    purchase = plan.purchase_totals(st.session_state.farm_data.get('drug_inventory', {}), first_day=max(current_day, 1))
+    if purchase.empty:
+        st.info("Kalan günlerde envanterden ilaç ihtiyacı yok.")
+    else:
+        st.dataframe(purchase, use_container_width=True)
+
+    st.markdown("---")
+    st.markdown("### ✏️ Program Değişikliği")
+    with st.form("drug_patch_form"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            first_day = st.number_input("Başlangıç Günü", min_value=1, max_value=42, value=current_day)
+        with col2:
+            last_day = st.number_input("Bitiş Günü", min_value=1, max_value=42, value=current_day)
+        with col3:
+            session = st.selectbox("Seans", ['morning', 'evening'], format_func=lambda s: 'Sabah' if s == 'morning' else 'Akşam')
+        new_drug = st.text_input("İlaç (örn. Hepato + Vitamin C)")
+        new_dosage = st.text_input("Dozaj (örn. 100 mg/L su)")
+        if st.form_submit_button("Değişikliği Kontrol Et") and new_drug.strip():
+            edits = {day: {session: {'drug': new_drug.strip(), 'dosage': new_dosage.strip()}}
+                     for day in range(int(first_day), int(last_day) + 1)}
+            st.session_state.pending_patch = make_patch(get_program_store().program, edits, f"{first_day}-{last_day}. gün: {new_drug.strip()}")
+
+    patch = st.session_state.get('pending_patch')
+    if patch is not None:
+        errors, warnings = validate_patch(patch, get_program_store().program, st.session_state.farm_data)
+        st.dataframe(pd.DataFrame(patch.summary_rows()), use_container_width=True)
+        for error in errors:
+            st.error(f"⛔ {error}")
+        for warning in warnings:
+            st.warning(f"⚠️ {warning}")
+        col_apply, col_cancel = st.columns(2)
+        with col_apply:
+            if st.button("✅ Onayla ve Uygula", disabled=bool(errors), key="apply_drug_patch"):
+                def apply_patch(data):
+                    # Checked against the saved patches, so a stale session cannot overwrite another's patch
+                    version = ProgramVersionStore(st.session_state.drug_program,
+                                                  data.setdefault('program_patches', {})).apply(patch)
+                    log_transaction(data, "Drug Program Patch",
+                                    f"İlaç programı değişikliği uygulandı: {patch.description} (sürüm {version}).")
+                    return version
+
+                try:
+                    version = update_program(apply_patch, patch.days)
+                except PatchConflict as e:
+                    st.error(f"⛔ Program bu arada değişti: {e}")
+                else:
+                    del st.session_state.pending_patch
+                    st.success(f"İlaç programı güncellendi (sürüm {version}).")
+                    st.rerun()
+        with col_cancel:
+            if st.button("❌ Vazgeç", key="cancel_drug_patch"):
+                del st.session_state.pending_patch
+                st.rerun()
+
+    last_patch = get_program_store().last_applied()
+    if last_patch and st.button(f"↩️ Geri Al: {last_patch['description']} (sürüm {last_patch['version']})", key="rollback_drug_patch"):
+        def rollback_patch(data):
+            store = ProgramVersionStore(st.session_state.drug_program, data.setdefault('program_patches', {}))
+            entry = store.last_applied()
+            if entry is None or entry['patch_id'] != last_patch['patch_id']:
+                raise PatchConflict("son değişiklik başka bir oturumda değişti")
+            store.rollback()
+            log_transaction(data, "Drug Program Rollback",
+                            f"İlaç programı değişikliği geri alındı: {last_patch['description']} (sürüm {store.version}).")
+
+        try:
+            update_program(rollback_patch, sorted({change['day'] for change in last_patch['changes']}))
+        except PatchConflict as e:
+            st.error(f"⛔ Geri alınamadı: {e}")
+        else:
+            st.rerun()
+
     st.markdown("---")
     st.markdown("### Tüm 42 Günlük Program Özeti")
     if st.session_state.drug_program:
-        df_drug = pd.DataFrame.from_dict(st.session_state.drug_program, orient='index')
+        df_drug = pd.DataFrame.from_dict({
+            day: {
+                'Stratejik Odak': entry.get('strategic_focus', ''),
+                'Sabah': session_summary(entry['morning']),
+                'Akşam': session_summary(entry['evening']),
+                'Not': entry.get('note', ''),
+            }
+            for day, entry in sorted(get_compiled_program().items())
+        }, orient='index')
         df_drug.index.name = 'Gün'
         st.dataframe(df_drug, use_container_width=True)
     else:
         st.warning("İlaç programı verisi yüklenemedi.")
 
 def page_feed_logistics():
+    from feed_logistics import render_feed_logistics_page
+
     current_day = get_current_day()
     live_birds_per_house = {h: calculate_live_birds_per_house(h, current_day) for h in st.session_state.farm_data.get('settings', {}).get('houses', {}).keys()}
     render_feed_logistics_page(st.session_state.farm_data, st.session_state.banvit_data, current_day, live_birds_per_house)
 
 def page_ai_assistant():
+    from enhanced_chat import render_chat_page
+
     render_chat_page(st.session_state.farm_data, st.session_state.banvit_data, st.session_state.drug_program, get_current_day())
 
 def page_calculations():
@@ -418,9 +728,78 @@ def page_ai_knowledge_base():
     # Placeholder for future functionality
 
 def page_drug_inventory():
+    import pandas as pd
+    from drug_inventory import DrugLedger, MOVEMENT_LABELS
+
     st.title("💉 İlaç Envanteri")
-    st.write("Bu bölümde, mevcut ilaç envanteri takip edilecek ve ilaçların karıştırılabilirlik durumları görüntülenecektir.")
-    # Placeholder for future functionality
+
+    current_day = get_current_day()
+    ledger = DrugLedger(st.session_state.farm_data)
+    plan = get_dosage_plan()
+
+    st.subheader("📦 Stok ve Tükenme Tahmini")
+    projection = ledger.project(plan, current_day)
+    to_order = projection[projection['Sipariş Gerekli']]
+    if not to_order.empty:
+        st.error(f"🛒 Sipariş noktasının altındaki ilaçlar: {', '.join(to_order['İlaç'])}")
+    st.dataframe(projection, use_container_width=True)
+
+    st.subheader(f"✅ {current_day}. Gün Uygulama Onayı")
+    if ledger.is_confirmed(current_day):
+        st.success(f"{current_day}. günün ilaçları stoktan düşüldü.")
+    elif not plan.daily_totals()[current_day - 1].any():
+        st.info("Bugün için envanterden düşülecek ilaç yok.")
+    elif st.button("💊 Bugünün ilaçları verildi, stoktan düş", key="confirm_drug_day"):
+        deducted = ledger.confirm_day(current_day, plan)
+        used = ', '.join(f"{drug} {amount:g}" for drug, amount in deducted.items())
+        log_transaction(st.session_state.farm_data, "Drug Day Confirmed", f"{current_day}. günün ilaçları stoktan düşüldü: {used}.")
+        save_json(st.session_state.farm_data, DATA_FILE)
+        st.success("Stok güncellendi.")
+        st.rerun()
+
+    st.subheader("➕ İlaç Alımı / Stok Düzeltme")
+    with st.form("drug_movement_form"):
+        drug = st.selectbox("İlaç", sorted(ledger.inventory.keys()))
+        kind = st.radio("Hareket", ['purchase', 'adjustment'], format_func=MOVEMENT_LABELS.get, horizontal=True)
+        quantity = st.number_input("Miktar (alım için pozitif, düzeltmede +/-)", value=0.0, step=100.0)
+        note = st.text_input("Not")
+        if st.form_submit_button("Kaydet") and quantity != 0:
+            ledger.record(drug, quantity, kind, current_day, note)
+            log_transaction(st.session_state.farm_data, "Drug Stock Movement",
+                            f"{drug} için {MOVEMENT_LABELS[kind].lower()} kaydedildi ({quantity:+g}).")
+            save_json(st.session_state.farm_data, DATA_FILE)
+            st.success(f"{drug} stoğu güncellendi.")
+            st.rerun()
+
+    st.subheader("🧪 Karışabilirlik")
+    validator = get_compatibility_validator()
+    st.dataframe(validator.matrix.to_frame(), use_container_width=True)
+    if validator.matrix.unmapped:
+        st.caption(f"Envanterde bulunamayan uyumluluk kayıtları: {', '.join(validator.matrix.unmapped)}")
+    program_issues = validator.issues()
+    critical = [i for i in program_issues if i['severity'] == 'critical']
+    if critical:
+        st.error(f"❌ Programda {len(critical)} uyumsuz karışım var.")
+    if program_issues:
+        st.dataframe(pd.DataFrame([{
+            'Gün': issue['day'],
+            'Seans': 'Sabah' if issue['session'] == 'morning' else 'Akşam',
+            'Karışım': ' + '.join(issue['drugs']),
+            'Durum': 'Uyumsuz' if issue['severity'] == 'critical' else 'Doğrulanmadı',
+            'Kümesler': ', '.join(issue['houses']),
+        } for issue in program_issues]), use_container_width=True)
+    else:
+        st.success("✅ Programdaki tüm karışımlar uyumlu.")
+
+    st.subheader("📜 Hareket Geçmişi")
+    history_drug = st.selectbox("İlaç filtresi", ['Tümü'] + sorted(ledger.inventory.keys()), key="drug_history_filter")
+    history = ledger.history(drug=None if history_drug == 'Tümü' else history_drug)
+    if history:
+        df_history = pd.DataFrame(history[::-1])
+        df_history['type'] = df_history['type'].map(MOVEMENT_LABELS)
+        st.dataframe(df_history, use_container_width=True)
+    else:
+        st.info("Henüz stok hareketi yok.")
 
 def page_status_analysis():
     st.title("📈 Durum Analizi")
@@ -428,11 +807,88 @@ def page_status_analysis():
     # Placeholder for future functionality
 
 def page_financial_analysis():
+    import plotly.graph_objects as go
+    from financial_analysis import FEED_TYPES, get_financial_engine
+    from scenario_engine import Scenario, compare_scenarios
+
     st.title("💰 Finansal Analiz")
-    st.write("Bu bölümde, çiftliğin finansal performansı detaylı olarak analiz edilecektir.")
-    # Placeholder for future functionality
+
+    current_day = get_current_day()
+    settings = st.session_state.farm_data.get('settings', {})
+    engine = get_financial_engine(st.session_state.farm_data, st.session_state.banvit_data, current_day, get_dosage_plan())
+
+    st.subheader(f"📊 Kümes Bazında Maliyet ({current_day}. Gün)")
+    st.dataframe(engine.house_summary(), use_container_width=True)
+    if engine.reconcile_factor != 1.0:
+        st.caption(f"Yem tüketimi fatura ve silo kayıtlarına göre x{engine.reconcile_factor:.2f} düzeltildi.")
+
+    cost_per_kg = engine.daily_cost_per_kg()
+    fig = go.Figure(go.Scatter(x=list(range(1, current_day + 1)), y=cost_per_kg, mode='lines+markers', name='TL / kg'))
+    fig.update_layout(title="Kümülatif Maliyet / Canlı Ağırlık", xaxis_title="Gün", yaxis_title="TL / kg")
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("🔮 Ya Olursa? (What-if)")
+    feed_costs = settings.get('feed_costs', {})
+    cols = st.columns(len(FEED_TYPES) + 1)
+    feed_prices = {
+        name: cols[i].number_input(f"{name} yem (TL/kg)", min_value=0.0, value=float(feed_costs.get(name, 0)),
+                                   step=0.1, key=f"what_if_feed_{i}")
+        for i, name in enumerate(FEED_TYPES)
+    }
+    sale_price = cols[-1].number_input("Canlı satış (TL/kg)", min_value=0.0,
+                                       value=float(settings.get('live_weight_price', 0)), step=0.5, key="what_if_sale_price")
+    result = engine.what_if(feed_prices=feed_prices, sale_price_per_kg=sale_price)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Toplam Maliyet (TL)", f"{result['total_cost']:,.0f}", f"{result['delta_cost']:+,.0f}", delta_color="inverse")
+    col2.metric("Maliyet (TL/kg)", f"{result['cost_per_kg']:.2f}",
+                f"{result['cost_per_kg'] - result['baseline']['cost_per_kg']:+.2f}", delta_color="inverse")
+    if sale_price > 0:
+        col3.metric("Kâr Marjı", f"{result['margin']:,.0f} TL", f"%{result['margin_pct']:.1f}")
+    else:
+        col3.info("Marj için canlı satış fiyatı girin.")
+
+    financial = engine.financial_data()
+    if st.button("💾 Finansal özeti kaydet", key="save_financial_data"):
+        st.session_state.farm_data['financial_data'] = financial
+        log_transaction(st.session_state.farm_data, "Financial Data Update",
+                        f"Finansal özet kaydedildi: gider {financial['total_expenses']:,.0f} TL, "
+                        f"gelir {financial['total_revenue']:,.0f} TL.")
+        save_json(st.session_state.farm_data, DATA_FILE)
+        st.success("Finansal özet kaydedildi.")
+
+    st.subheader("🧪 Senaryo Karşılaştırma")
+    st.caption("Senaryolar gerçek veriyi değiştirmez; yalnızca değişen alanlar kopyalanır.")
+    transition = settings.get('feed_transition', {})
+    scenarios = []
+    for i, col in enumerate(st.columns(2)):
+        with col:
+            name = st.text_input("Senaryo adı", value=f"Senaryo {i + 1}", key=f"scenario_name_{i}")
+            grower_day = st.number_input("Büyütme yemine geçiş (son civciv günü)", 1, 42,
+                                         int(transition.get('chick_to_grower', 14)), key=f"scenario_grower_{i}")
+            finisher_day = st.number_input("Bitirme yemine geçiş (son büyütme günü)", 1, 42,
+                                           int(transition.get('grower_to_finisher', 28)), key=f"scenario_finisher_{i}")
+            mortality_factor = st.number_input("Son 7 gün ölüm çarpanı", 0.0, 10.0, 1.0, step=0.5,
+                                               key=f"scenario_mortality_{i}")
+        scenario = Scenario(name, st.session_state.farm_data)
+        if grower_day != transition.get('chick_to_grower', 14):
+            scenario.switch_feed('chick_to_grower', grower_day)
+        if finisher_day != transition.get('grower_to_finisher', 28):
+            scenario.switch_feed('grower_to_finisher', finisher_day)
+        if mortality_factor != 1.0:
+            scenario.scale_mortality(max(current_day - 6, 1), current_day, mortality_factor)
+        scenarios.append(scenario)
+
+    comparison = compare_scenarios(st.session_state.farm_data, scenarios, st.session_state.banvit_data,
+                                   current_day, get_compiled_program())
+    st.dataframe(comparison.astype(str), use_container_width=True)
+    for scenario in scenarios:
+        if scenario.changes:
+            st.caption(f"**{scenario.name}**: {'; '.join(scenario.changes)}")
 
 def page_settings():
+    from benchmarking import archive_flock, build_benchmark_index, load_archive, record_fcr_projection
+
     st.title("⚙️ Ayarlar")
 
     st.subheader("Genel Ayarlar")
@@ -443,8 +899,8 @@ def page_settings():
         if st.form_submit_button("Genel Ayarları Kaydet"):
             st.session_state.farm_data.setdefault('settings', {})['farm_name'] = farm_name
             st.session_state.farm_data['settings']['start_date'] = start_date.strftime('%Y-%m-%d')
-            save_json(st.session_state.farm_data, DATA_FILE)
             log_transaction(st.session_state.farm_data, "General Settings Update", "Genel ayarlar güncellendi.")
+            save_json(st.session_state.farm_data, DATA_FILE)
             st.success("Genel ayarlar kaydedildi!")
             st.rerun()
 
@@ -469,8 +925,8 @@ def page_settings():
                         'chick_count': chick_count,
                         'silo_capacity': silo_capacity
                     }
-                    save_json(st.session_state.farm_data, DATA_FILE)
                     log_transaction(st.session_state.farm_data, "House Settings Update", f"{house_name} ayarları güncellendi.")
+                    save_json(st.session_state.farm_data, DATA_FILE)
                     st.success(f"✅ {house_name} ayarları kaydedildi!")
                     st.rerun()
 
@@ -484,8 +940,8 @@ def page_settings():
                 'chick_to_grower': chick_to_grower,
                 'grower_to_finisher': grower_to_finisher
             }
-            save_json(st.session_state.farm_data, DATA_FILE)
             log_transaction(st.session_state.farm_data, "Feed Transition Settings Update", "Yem geçiş ayarları güncellendi.")
+            save_json(st.session_state.farm_data, DATA_FILE)
             st.success("✅ Yem geçiş ayarları kaydedildi!")
             st.rerun()
 
@@ -497,32 +953,65 @@ def page_settings():
         if st.form_submit_button("Diğer Ayarları Kaydet"):
             st.session_state.farm_data.setdefault('settings', {})['min_feed_days'] = min_feed_days
             st.session_state.farm_data.setdefault('settings', {})['feed_stale_days'] = feed_stale_days
-            save_json(st.session_state.farm_data, DATA_FILE)
             log_transaction(st.session_state.farm_data, "Other Settings Update", "Diğer ayarlar güncellendi.")
+            save_json(st.session_state.farm_data, DATA_FILE)
             st.success("✅ Diğer ayarlar kaydedildi!")
             st.rerun()
 
+    st.subheader("📦 Sürü Arşivi")
+    archive = load_archive()
+    st.write(f"Arşivdeki sürü sayısı: {len(archive)}")
+    if st.button("Bu sürüyü arşive ekle ve kıyas endeksini güncelle", key="archive_flock"):
+        from dashboard_analytics import DashboardAnalytics
+
+        current_day = get_current_day()
+        history = DashboardAnalytics(st.session_state.farm_data, st.session_state.banvit_data,
+                                     current_day, 0, 0, 0, 0).get_historical_data()
+        record = archive_flock(st.session_state.farm_data, history)
+        settings = st.session_state.farm_data.get('settings', {})
+        st.session_state.farm_data['performance_benchmarks'] = build_benchmark_index(
+            load_archive(), target_day=get_slaughter_day(settings) or 42)
+        record_fcr_projection(st.session_state.farm_data, current_day, calculate_fcr(current_day))
+        log_transaction(st.session_state.farm_data, "Flock Archived",
+                        f"{record['flock_id']} sürüsü ({record['days']} gün) arşive eklendi, kıyas endeksi güncellendi.")
+        save_json(st.session_state.farm_data, DATA_FILE)
+        st.success(f"✅ {record['flock_id']} arşivlendi, kıyas endeksi güncellendi.")
+        st.rerun()
+
 # ============ MAIN APP LOGIC ============
+PAGES = {
+    "🏠 Dashboard": page_dashboard,
+    "📊 Günlük Veri Girişi": page_daily_entry,
+    "💊 İlaç Programı": page_drug_program,
+    "🚚 Yem Lojistiği": page_feed_logistics,
+    "💬 AI Asistan": page_ai_assistant,
+    "🧮 Hesaplamalar": page_calculations,
+    "🤖 AI Bilgi Bankası": page_ai_knowledge_base,
+    "💉 İlaç Envanteri": page_drug_inventory,
+    "📈 Durum Analizi": page_status_analysis,
+    "💰 Finansal Analiz": page_financial_analysis,
+    "⚙️ Ayarlar": page_settings,
+}
+
 def main():
+    start_exporter()
+    start_ingest_server(DATA_FILE)
+    start_sensor_server(DATA_FILE)
     st.sidebar.title("Murat Özkan Kümes IS")
-    
-    pages = {
-        "🏠 Dashboard": page_dashboard,
-        "📊 Günlük Veri Girişi": page_daily_entry,
-        "💊 İlaç Programı": page_drug_program,
-        "🚚 Yem Lojistiği": page_feed_logistics,
-        "💬 AI Asistan": page_ai_assistant,
-        "🧮 Hesaplamalar": page_calculations,
-        "🤖 AI Bilgi Bankası": page_ai_knowledge_base,
-        "💉 İlaç Envanteri": page_drug_inventory,
-        "📈 Durum Analizi": page_status_analysis,
-        "💰 Finansal Analiz": page_financial_analysis,
-        "⚙️ Ayarlar": page_settings,
-    }
 
-    selection = st.sidebar.radio("Gezinme", list(pages.keys()))
-    page = pages[selection]
-    page()
+    selection = st.sidebar.radio("Gezinme", list(PAGES.keys()))
+    page = PAGES[selection]
+    try:
+        with span(selection):
+            page()
+    finally:
+        run = end_run(selection)
+        if run:
+            RERUN_SECONDS.observe(run['total_ms'] / 1000, page=selection)
+        drop_textfile()
+
+    if st.query_params.get("perf") == "1":
+        render_performance_panel()
 
 if __name__ == "__main__":
     main()
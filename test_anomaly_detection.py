@@ -0,0 +1,109 @@
+import json
+
+from anomaly_detection import AnomalyDetector, get_death_threshold, get_active_alerts
+
+
+def load_banvit():
+    with open('banvit_data.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def make_farm():
+    return {
+        'settings': {
+            'houses': {'Kümes 1': {'chick_count': 10000, 'silo_capacity': 20.0}},
+            'death_thresholds': {'1-7': 1.0, '8-14': 0.5}
+        },
+        'daily_data': {},
+        'anomaly_alerts': []
+    }
+
+
+def normal_record(banvit, day, live=10000):
+    return {
+        'deaths': 5,
+        'weight': banvit[str(day)]['canlı_ağırlık'],
+        'water_consumption': live / 1000 * banvit[str(day)]['su_tüketimi'],
+        'silo_remaining': 1000
+    }
+
+
+def test_death_threshold_bands():
+    settings = make_farm()['settings']
+    assert get_death_threshold(settings, 3) == 1.0
+    assert get_death_threshold(settings, 10) == 0.5
+
+
+def test_normal_days_raise_no_alerts():
+    banvit = load_banvit()
+    farm = make_farm()
+    detector = AnomalyDetector(farm, banvit)
+    for day in range(1, 8):
+        assert detector.update('Kümes 1', day, normal_record(banvit, day)) == []
+    assert farm['anomaly_alerts'] == []
+
+
+def test_water_drop_flagged_in_same_save():
+    banvit = load_banvit()
+    farm = make_farm()
+    detector = AnomalyDetector(farm, banvit)
+    for day in range(1, 6):
+        detector.update('Kümes 1', day, normal_record(banvit, day))
+
+    record = normal_record(banvit, 6)
+    record['water_consumption'] *= 0.7
+    alerts = detector.update('Kümes 1', 6, record)
+
+    water_alerts = [a for a in alerts if a['metric'] == 'water']
+    assert water_alerts and water_alerts[0]['severity'] == 'critical'
+    assert water_alerts[0] in farm['anomaly_alerts']
+
+
+def test_age_banded_mortality_threshold():
+    banvit = load_banvit()
+    farm = make_farm()
+    detector = AnomalyDetector(farm, banvit)
+    record = normal_record(banvit, 9)
+    record['deaths'] = 60  # 0.6% is fine in week 1 but above the 0.5% day-8+ band
+    alerts = detector.update('Kümes 1', 9, record)
+    assert [a['severity'] for a in alerts if a['metric'] == 'mortality'] == ['critical']
+
+    farm = make_farm()
+    detector = AnomalyDetector(farm, banvit)
+    record = normal_record(banvit, 3)
+    record['deaths'] = 60
+    assert not [a for a in detector.update('Kümes 1', 3, record) if a['metric'] == 'mortality']
+
+
+def test_resave_replaces_alerts_and_baseline():
+    banvit = load_banvit()
+    farm = make_farm()
+    detector = AnomalyDetector(farm, banvit)
+    for day in range(1, 4):
+        detector.update('Kümes 1', day, normal_record(banvit, day))
+    before = json.dumps(farm['anomaly_state'], sort_keys=True)
+
+    bad = normal_record(banvit, 4)
+    bad['water_consumption'] *= 0.5
+    detector.update('Kümes 1', 4, bad)
+    assert get_active_alerts(farm, 4)
+
+    detector.update('Kümes 1', 4, normal_record(banvit, 4))
+    assert get_active_alerts(farm, 4) == []
+    assert farm['anomaly_state']['Kümes 1']['prev']['metrics'] == json.loads(before)['Kümes 1']['metrics']
+
+
+def test_rebuild_matches_incremental():
+    banvit = load_banvit()
+    farm = make_farm()
+    detector = AnomalyDetector(farm, banvit)
+    for day in range(1, 10):
+        record = normal_record(banvit, day)
+        if day == 7:
+            record['water_consumption'] *= 0.6
+        farm['daily_data'][f'day_{day}'] = {'Kümes 1': record}
+        detector.update('Kümes 1', day, record)
+    incremental = [(a['day'], a['metric'], a['severity']) for a in farm['anomaly_alerts']]
+
+    AnomalyDetector(farm, banvit).rebuild()
+    assert [(a['day'], a['metric'], a['severity']) for a in farm['anomaly_alerts']] == incremental
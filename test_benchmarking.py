@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from benchmarking import (BenchmarkIndex, archive_flock, build_benchmark_index, flock_curves, load_archive,
+                          record_fcr_projection)
+
+
+def make_history(weight_scale, fcr_scale, days=42, deaths=10):
+    day = np.arange(1, days + 1)
+    return pd.DataFrame({
+        'day': day,
+        'avg_weight': np.where(day % 7 == 0, 60.0 * day * weight_scale, 0),
+        'fcr': 0.03 * day * fcr_scale,
+        'death_rate': np.full(days, deaths / 1000 * 100),
+    })
+
+
+def make_flocks():
+    return [
+        {'flock_id': f'F{i}', **flock_curves(make_history(1 + i / 10, 1 - i / 20))}
+        for i in range(5)
+    ]
+
+
+def test_curves_skip_days_without_measurements():
+    curves = flock_curves(make_history(1, 1, days=10))
+    assert curves['weight'][6] == 420 and curves['weight'][5] is None
+    assert len(curves['fcr']) == 42 and curves['fcr'][10] is None
+    assert np.isclose(curves['mortality'][9], 10.0)
+
+
+def test_bands_and_placement():
+    index = BenchmarkIndex(build_benchmark_index(make_flocks()))
+    band = index.band('weight', 14)
+    assert np.allclose(band, np.percentile([840 * (1 + i / 10) for i in range(5)], [10, 50, 90]))
+    assert index.band('weight', 13) is None
+
+    high = index.place('weight', 14, 2000)
+    assert high['label'] == 'P90 üstü' and high['better_than_median']
+    median_fcr = index.band('fcr', 14)[1]
+    placed = index.place('fcr', 14, median_fcr * 1.01)
+    assert placed['label'] == 'P50–P90' and not placed['better_than_median']
+
+    projection = index.project_fcr(0.5, 21)
+    # FCR grows linearly with the day in every archived flock
+    assert np.isclose(projection['p50'], 1.0) and projection['flock_count'] == 5
+    assert BenchmarkIndex({}).empty and BenchmarkIndex({}).place('fcr', 14, 1.0) is None
+
+    farm = {'performance_benchmarks': build_benchmark_index(make_flocks())}
+    assert record_fcr_projection(farm, 21, 0.5) == farm['fcr_projections']['21'] == projection
+    assert record_fcr_projection({}, 21, 0.5) is None
+
+
+def test_archive_replaces_same_flock(tmp_path):
+    path = str(tmp_path / 'archive.jsonl')
+    farm = {'settings': {'farm_name': 'Test', 'start_date': '2026-01-01'}}
+    archive_flock(farm, make_history(1, 1), path)
+    archive_flock(farm, make_history(1.2, 1), path)
+    farm['settings']['start_date'] = '2026-03-01'
+    archive_flock(farm, make_history(1, 1, days=35), path)
+    flocks = load_archive(path)
+    assert [f['flock_id'] for f in flocks] == ['Test:2026-01-01', 'Test:2026-03-01']
+    assert flocks[0]['weight'][6] == 420 * 1.2 and flocks[1]['days'] == 35
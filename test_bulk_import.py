@@ -0,0 +1,78 @@
+import io
+
+from bulk_import import BulkImporter, read_import_file
+
+
+def make_farm():
+    return {
+        'settings': {'houses': {
+            'Kümes 1': {'chick_count': 1000, 'silo_capacity': 20.0},
+            'Kümes 2': {'chick_count': 1000, 'silo_capacity': 20.0},
+        }},
+        'daily_data': {'day_1': {'Kümes 1': {'deaths': 3, 'weight': 55.0, 'note': 'elle girildi'}}}
+    }
+
+
+def csv_file(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def test_valid_file_is_applied_in_one_merge():
+    rows = ['gün,kümes,ölüm,ağırlık,su,silo']
+    for day in range(1, 43):
+        for house in (1, 2):
+            rows.append(f'{day},{house},2,{50 + day * 60},{day * 10},{5000 - day * 100}')
+    farm = make_farm()
+    importer = BulkImporter(farm)
+    clean, errors = importer.validate(read_import_file(csv_file('\n'.join(rows)), 'gecmis.csv'))
+    assert errors == []
+
+    summary = importer.apply(clean)
+    assert summary == {'rows': 84, 'days': 42, 'houses': 2, 'first_day': 1, 'last_day': 42}
+    assert farm['daily_data']['day_42']['Kümes 2'] == {
+        'deaths': 2, 'weight': 2570.0, 'water_consumption': 420.0, 'silo_remaining': 800.0
+    }
+    # Fields not present in the file survive the merge
+    assert farm['daily_data']['day_1']['Kümes 1']['note'] == 'elle girildi'
+
+
+def test_partial_columns_and_blank_cells_keep_existing_values():
+    farm = make_farm()
+    importer = BulkImporter(farm)
+    clean, errors = importer.validate(read_import_file(csv_file('day,house,weight,deaths\n1,Kümes 1,60,\n'), 'a.csv'))
+    assert errors == []
+    importer.apply(clean)
+    assert farm['daily_data']['day_1']['Kümes 1'] == {'deaths': 3, 'weight': 60.0, 'note': 'elle girildi'}
+
+
+def test_any_invalid_row_rejects_the_whole_file():
+    farm = make_farm()
+    text = '\n'.join([
+        'day,house,deaths,weight',
+        '2,Kümes 1,1,70',
+        '0,Kümes 1,1,70',
+        '3,Kümes 9,1,70',
+        '4,Kümes 2,-1,70',
+        '5,Kümes 2,1.5,70',
+        '6,Kümes 2,1,abc',
+        '7,Kümes 2,1,70',
+        '7,2,1,70',
+    ])
+    clean, errors = BulkImporter(farm).validate(read_import_file(csv_file(text), 'b.csv'))
+    assert clean.empty
+    joined = '\n'.join(errors)
+    for row in (3, 4, 5, 6, 7, 8, 9):
+        assert f'Satır {row}:' in joined
+    assert 'Satır 2:' not in joined
+
+
+def test_cumulative_deaths_cannot_exceed_chick_count():
+    farm = make_farm()
+    text = 'day,house,deaths\n2,Kümes 1,500\n3,Kümes 1,498\n'
+    clean, errors = BulkImporter(farm).validate(read_import_file(csv_file(text), 'c.csv'))
+    assert clean.empty and errors == ['Kümes 1: toplam ölüm başlangıç hayvan sayısını aşıyor']
+
+
+def test_missing_columns_are_reported():
+    clean, errors = BulkImporter(make_farm()).validate(read_import_file(csv_file('day,deaths\n1,2\n'), 'd.csv'))
+    assert clean.empty and 'house' in errors[0]
@@ -0,0 +1,72 @@
+import gc
+import json
+
+from change_feed import BUS, ChangeBus, change_event
+from chart_data import farm_cache_key, section_cache_key
+from dashboard_analytics import DASHBOARD_SECTIONS
+from farm_store import FarmSession, FarmStore
+
+
+def test_bus_delivers_to_live_subscribers_only():
+    bus = ChangeBus()
+    first, second = bus.subscribe('farm_data.json'), bus.subscribe('farm_data.json')
+    other_farm = bus.subscribe('other.json')
+    bus.publish('farm_data.json', [{'seq': 1, 'key': '/daily_data/day_5/Kümes 1'}], 120)
+
+    batches, overflowed = first.drain()
+    assert batches == [([{'seq': 1, 'key': '/daily_data/day_5/Kümes 1'}], 120)] and not overflowed
+    assert second.pending() and not other_farm.pending() and not first.pending()
+
+    del second
+    gc.collect()
+    assert bus.subscriber_count('farm_data.json') == 1
+
+    for seq in range(300):
+        bus.publish('other.json', [{'seq': seq, 'key': '/chat_history'}], seq)
+    batches, overflowed = other_farm.drain()
+    assert overflowed and len(batches) < 300
+
+    event = change_event('farm_data.json', {'seq': 4, 'key': '/daily_data/day_5/Kümes 1'})
+    assert (event.section, event.house, event.day, event.label()) == ('daily_data', 'Kümes 1', 5, 'Kümes 1 5. gün')
+    assert change_event('farm_data.json', {'key': '/feed_invoices/2'}).label() == 'yem faturaları'
+
+
+def test_sessions_in_one_process_refresh_only_affected_sections(tmp_path, monkeypatch):
+    data = {
+        'settings': {'houses': {'Kümes 1': {'chick_count': 10000}}},
+        'daily_data': {'day_1': {'Kümes 1': {'deaths': 10}}},
+        'feed_invoices': [],
+    }
+    (tmp_path / 'farm_data.json').write_text(json.dumps(data), encoding='utf-8')
+    store = FarmStore(str(tmp_path / 'farm_data.json'))
+    a, b = FarmSession(store), FarmSession(store)
+    assert BUS.subscriber_count(store.topic) == 2
+
+    # Same-process commits reach b through the bus, without reading the feed file
+    monkeypatch.setattr(store, 'read_feed', lambda offset: (_ for _ in ()).throw(AssertionError('file read')))
+    dashboard_key, farm_key = section_cache_key(b.farm_data, DASHBOARD_SECTIONS), farm_cache_key(b.farm_data)
+    a.farm_data['feed_invoices'].append({'amount_kg': 8000})
+    a.save(a.farm_data)
+    assert b.has_pending() and b.refresh(b.farm_data) == 1
+    assert [event.label() for event in b.changes] == ['yem faturaları']
+    assert section_cache_key(b.farm_data, DASHBOARD_SECTIONS) == dashboard_key
+    assert farm_cache_key(b.farm_data) != farm_key
+
+    a.farm_data['daily_data']['day_1']['Kümes 1']['deaths'] = 12
+    a.save(a.farm_data)
+    assert b.refresh(b.farm_data) == 1 and not b.has_pending()
+    assert b.changes[0].house == 'Kümes 1' and b.changes[0].day == 1
+    assert b.farm_data['daily_data']['day_1']['Kümes 1']['deaths'] == 12
+    assert section_cache_key(b.farm_data, DASHBOARD_SECTIONS) != dashboard_key
+
+
+def test_cache_keys_are_not_inherited_by_a_new_farm():
+    farm = {'settings': {'farm_name': 'Çiftlik', 'start_date': '2026-03-01'}}
+    seen = {farm_cache_key(farm)}
+    assert farm_cache_key(farm) in seen
+    for _ in range(50):
+        other = {'settings': {'farm_name': 'Çiftlik', 'start_date': '2026-03-01'}}
+        key = farm_cache_key(other)
+        assert key not in seen
+        seen.add(key)
+        del other
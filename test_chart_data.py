@@ -0,0 +1,55 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from chart_data import FigureCache, WEBGL_THRESHOLD, lttb, make_bar_trace, make_line_trace
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(10000)
+    y = np.sin(x / 300.0)
+    y[5000] = 10
+    dx, dy = lttb(x, y, 200)
+    assert len(dx) == 200
+    assert dx[0] == 0 and dx[-1] == 9999
+    assert np.all(np.diff(dx) > 0)
+    assert dy.max() == 10
+
+
+def test_lttb_passthrough_for_short_series():
+    dx, dy = lttb([1, 2, 3], [4, 5, float('nan')], 10)
+    assert list(dx) == [1, 2] and list(dy) == [4, 5]
+
+
+def test_line_trace_budget_and_webgl_switch():
+    small = make_line_trace(list(range(42)), list(range(42)), budget=600, name='a')
+    assert isinstance(small, go.Scatter) and len(small.x) == 42
+
+    n = WEBGL_THRESHOLD * 5
+    large = make_line_trace(np.arange(n), np.random.default_rng(1).random(n), budget=600, fill='tonexty')
+    assert isinstance(large, go.Scattergl)
+    assert len(large.x) == 600
+
+
+def test_bar_trace_resamples_colour_array():
+    y = np.linspace(0, 1, 5000)
+    bar = make_bar_trace(np.arange(5000), y, budget=100, marker=dict(color=y, colorscale='RdYlGn_r'))
+    assert len(bar.x) == 100 and len(bar.marker.color) == 100
+
+
+def test_figure_cache_builds_once_per_key():
+    cache = FigureCache(max_entries=2)
+    calls = []
+
+    def builder():
+        calls.append(1)
+        return go.Figure(go.Scatter(x=[1, 2], y=[3, 4]))
+
+    first = cache.get_or_build(('weight', 1), builder)
+    second = cache.get_or_build(('weight', 1), builder)
+    assert len(calls) == 1 and cache.hits == 1
+    assert first.to_json() == second.to_json()
+
+    cache.get_or_build(('weight', 2), builder)
+    cache.get_or_build(('fcr', 2), builder)
+    cache.get_or_build(('weight', 1), builder)  # evicted by the LRU bound
+    assert len(calls) == 4
@@ -0,0 +1,61 @@
+import json
+
+from dashboard_analytics import DashboardAnalytics, build_house_frame, get_house_frame
+
+
+def load_banvit():
+    with open('banvit_data.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def make_farm():
+    return {
+        'metadata': {'data_version': 1},
+        'settings': {'farm_name': 'Test', 'houses': {
+            'Kümes 1': {'chick_count': 10000, 'silo_capacity': 20.0},
+            'Kümes 2': {'chick_count': 1000, 'silo_capacity': 20.0},
+        }},
+        'daily_data': {
+            'day_1': {'Kümes 1': {'deaths': 10}, 'Kümes 2': {'deaths': 5}},
+            'day_2': {'Kümes 1': {'deaths': 5, 'weight': 500}, 'Kümes 2': {'deaths': 3, 'avg_weight': 300}},
+        }
+    }
+
+
+def test_house_frame_live_birds_and_mortality():
+    frame = build_house_frame(make_farm(), load_banvit(), 2).set_index(['day', 'house'])
+    assert frame.loc[(2, 'Kümes 1'), 'live_birds'] == 9985
+    assert frame.loc[(2, 'Kümes 2'), 'live_birds'] == 992
+    assert frame.loc[(2, 'Kümes 2'), 'cum_death_rate'] == 0.8
+    # Legacy avg_weight records are read as weight
+    assert frame.loc[(2, 'Kümes 2'), 'avg_weight'] == 300
+
+
+def test_farm_history_uses_bird_weighted_mean():
+    analytics = DashboardAnalytics(make_farm(), load_banvit(), 2, 0, 0, 0, 0)
+    latest = analytics.get_historical_data().iloc[-1]
+    expected = (500 * 9985 + 300 * 992) / (9985 + 992)
+    assert abs(latest['avg_weight'] - expected) < 1e-9
+    assert latest['live_birds'] == 9985 + 992
+    # Day 1 has no weights at all, so it must not read as a -100% deviation
+    assert analytics.get_historical_data().iloc[0]['weight_deviation'] == 0
+
+
+def test_house_frame_is_shared_until_data_version_changes():
+    farm, banvit = make_farm(), load_banvit()
+    first = get_house_frame(farm, banvit, 2)
+    assert DashboardAnalytics(farm, banvit, 2, 0, 0, 0, 0).get_house_data() is first
+
+    farm['daily_data']['day_2']['Kümes 1']['deaths'] = 50
+    farm['metadata']['data_version'] += 1
+    rebuilt = get_house_frame(farm, banvit, 2)
+    assert rebuilt is not first
+    assert rebuilt.set_index(['day', 'house']).loc[(2, 'Kümes 1'), 'live_birds'] == 9940
+
+
+def test_house_summary_and_small_multiples():
+    analytics = DashboardAnalytics(make_farm(), load_banvit(), 2, 0, 0, 0, 0)
+    summary = analytics.get_house_summary()
+    assert list(summary.index) == ['Kümes 1', 'Kümes 2']
+    fig = analytics.create_house_small_multiples()
+    assert len(fig.data) == 4
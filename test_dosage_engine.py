@@ -0,0 +1,59 @@
+import numpy as np
+
+from drug_parser import compile_program
+from dosage_engine import build_dosage_plan, project_live_birds
+
+HOUSES = ['Kümes 1', 'Kümes 2']
+INVENTORY = {
+    'Neomisin Sülfat': {'dose': 100, 'unit': 'g/1000L', 'withdrawal': 5, 'stock': 50},
+    'Hepato': {'dose': 1000, 'unit': 'ml/1000L', 'withdrawal': 0, 'stock': 0},
+}
+
+
+def make_farm():
+    return {
+        'settings': {'houses': {'Kümes 1': {'chick_count': 10000}, 'Kümes 2': {'chick_count': 5000}}},
+        'daily_data': {'day_1': {'Kümes 1': {'deaths': 100}}, 'day_2': {'Kümes 2': {'deaths': 50}}},
+        'drug_inventory': INVENTORY,
+    }
+
+
+def make_plan():
+    program = {
+        '1': {'morning': 'Neomisin Sülfat', 'evening': 'Hepato + Bilinmeyen Katkı'},
+        '2': {'morning': {'drug': 'Neomisin Sülfat', 'dosage': '50 mg/L su'}, 'evening': ''},
+    }
+    banvit = {str(day): {'su_tüketimi': 100.0 * day} for day in range(1, 43)}
+    farm = make_farm()
+    return build_dosage_plan(compile_program(program, {}, INVENTORY), HOUSES, farm, banvit), farm
+
+
+def test_live_birds_carry_forward():
+    live = project_live_birds(make_farm(), HOUSES, max_day=4)
+    assert live.tolist() == [[9900, 5000], [9900, 4950], [9900, 4950], [9900, 4950]]
+
+
+def test_amounts_match_single_dose_formula():
+    plan, _ = make_plan()
+    neo, hepato = plan.drugs.index('Neomisin Sülfat'), plan.drugs.index('Hepato')
+    # Day 2, Kümes 2: 200 L/1000 birds x 4950 birds = 990 L; morning gets 60 %
+    assert np.isclose(plan.water[1, 1, 0], 990 * 0.6)
+    # Prescribed 50 mg/L overrides the inventory's 100 g/1000L
+    assert np.isclose(plan.amounts[1, 1, 0, neo], 50 * 990 * 0.6 / 1000)
+    assert np.isclose(plan.amounts[0, 0, 0, neo], 100 * 990 * 0.6 / 1000)
+    assert np.isclose(plan.amounts[0, 0, 1, hepato], 1000 * 990 * 0.4 / 1000)
+    assert plan.amounts[1, :, 1].sum() == 0
+    assert plan.unknown_drugs == ['Bilinmeyen Katkı']
+    assert plan.units[hepato] == 'ml'
+
+
+def test_session_table_and_purchase_totals():
+    plan, farm = make_plan()
+    table = plan.session_table(1)
+    assert len(table) == 4 and set(table['Seans']) == {'Sabah', 'Akşam'}
+
+    totals = plan.purchase_totals(farm['drug_inventory']).set_index('İlaç')
+    expected_neo = plan.amounts[..., plan.drugs.index('Neomisin Sülfat')].sum()
+    assert np.isclose(totals.loc['Neomisin Sülfat', 'Gerekli'], round(expected_neo, 1))
+    assert np.isclose(totals.loc['Neomisin Sülfat', 'Alınacak'], round(expected_neo - 50, 1))
+    assert plan.purchase_totals(farm['drug_inventory'], first_day=3).empty
@@ -0,0 +1,51 @@
+import numpy as np
+
+from drug_parser import compile_entry, compile_program, DrugNameMatcher
+from drug_compatibility import CompatibilityMatrix, ProgramCompatibilityValidator
+
+INVENTORY = {'Neomisin Sülfat': {}, 'Hepato': {}, 'Vitamin C': {}, 'Tilosin Tartrat': {}, 'Doksisiklin': {}}
+COMPATIBLE = {'Neomisin': ['Hepato', 'Vitamin C'], 'Hepato': ['Vitamin C']}
+INCOMPATIBLE = {'Tilosin': ['Doksisiklin']}
+HOUSES = ['Kümes 1', 'Kümes 2']
+
+
+def make_matrix():
+    return CompatibilityMatrix(INVENTORY, COMPATIBLE, INCOMPATIBLE)
+
+
+def test_matrix_is_symmetric_and_maps_short_names():
+    matrix = make_matrix()
+    assert (matrix.compatible == matrix.compatible.T).all()
+    assert np.diag(matrix.compatible).all()
+    assert matrix.status('Vitamin C', 'Neomisin Sülfat') == 'compatible'
+    assert matrix.status('Doksisiklin', 'Tilosin Tartrat') == 'incompatible'
+    assert matrix.status('Hepato', 'Tilosin Tartrat') == 'unknown'
+    assert matrix.conflicts(['Neomisin Sülfat', 'Hepato', 'Vitamin C', 'Elektrolit']) == []
+
+
+def test_program_validation_and_single_day_revalidation():
+    program = compile_program({
+        '3': {'sabah': 'Neomisin Sülfat + Hepato + Vitamin C', 'aksam': 'Tilosin Tartrat + Doksisiklin'},
+        '4': {'sabah': 'Hepato', 'aksam': '', 'houses': {'Kümes 2': {'sabah': 'Hepato + Tilosin Tartrat'}}},
+    }, {}, INVENTORY)
+    validator = ProgramCompatibilityValidator(make_matrix(), program, HOUSES)
+
+    critical = validator.issues(severity='critical')
+    assert [(i['day'], i['session'], i['drugs'], i['houses']) for i in critical] == [
+        (3, 'evening', ('Doksisiklin', 'Tilosin Tartrat'), HOUSES)
+    ]
+    warning = validator.issues(day=4)
+    assert [(i['drugs'], i['houses'], i['severity']) for i in warning] == [
+        (('Hepato', 'Tilosin Tartrat'), ['Kümes 2'], 'warning')
+    ]
+
+    matcher = DrugNameMatcher(INVENTORY)
+    validator.update_day(3, compile_entry({'sabah': 'Neomisin Sülfat', 'aksam': 'Tilosin Tartrat'}, matcher))
+    assert validator.issues(severity='critical') == []
+    assert len(validator.issues()) == 1
+
+    # House overrides of the edited day are validated the same way as at construction
+    edited = compile_program({'3': {'sabah': 'Neomisin Sülfat', 'aksam': 'Tilosin Tartrat',
+                                    'houses': {'Kümes 1': {'aksam': 'Tilosin Tartrat + Doksisiklin'}}}}, {}, INVENTORY, [3])
+    validator.update_day(3, edited[3])
+    assert [(i['day'], i['houses']) for i in validator.issues(severity='critical')] == [(3, ['Kümes 1'])]
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from drug_parser import compile_program
+from dosage_engine import build_dosage_plan
+from drug_inventory import DrugLedger
+
+HOUSES = ['Kümes 1']
+
+
+def make_farm():
+    return {
+        'settings': {'houses': {'Kümes 1': {'chick_count': 10000}}},
+        'daily_data': {},
+        'drug_inventory': {
+            'Vitamin C': {'dose': 100, 'unit': 'g/1000L', 'stock': 250},
+            'Hepato': {'dose': 1000, 'unit': 'ml/1000L', 'stock': 100000},
+        },
+    }
+
+
+def make_plan(farm):
+    # 1000 L/day -> 100 g Vitamin C per day on days 1-10, Hepato on day 3 only
+    program = {str(day): {'morning': 'Vitamin C', 'evening': 'Hepato' if day == 3 else ''} for day in range(1, 11)}
+    banvit = {str(day): {'su_tüketimi': 100.0} for day in range(1, 43)}
+    return build_dosage_plan(compile_program(program, {}, farm['drug_inventory']), HOUSES, farm, banvit)
+
+
+def test_confirm_day_deducts_once_and_indexes_history():
+    farm = make_farm()
+    plan = make_plan(farm)
+    ledger = DrugLedger(farm)
+    assert ledger.confirm_day(1, plan) == {'Vitamin C': 60.0}
+    ledger.record('Vitamin C', 500, 'purchase', day=2, note='fatura')
+    with pytest.raises(ValueError):
+        ledger.confirm_day(1, plan)
+
+    assert farm['drug_inventory']['Vitamin C']['stock'] == 690
+    # A new ledger over the same farm_data rebuilds the indexes from the stored movements
+    reloaded = DrugLedger(farm)
+    assert [m['type'] for m in reloaded.history(drug='Vitamin C')] == ['consumption', 'purchase']
+    assert [m['drug'] for m in reloaded.history(day=2)] == ['Vitamin C']
+    assert reloaded.history(drug='Hepato') == []
+
+
+def test_projection_finds_stock_out_and_reorder_point():
+    farm = make_farm()
+    plan = make_plan(farm)
+    ledger = DrugLedger(farm)
+    projection = ledger.project(plan, from_day=1, lead_days=2, safety_days=1).set_index('İlaç')
+
+    # Morning session gets 60 % of 1000 L -> 60 g/day; 250 g lasts days 1-4, runs out on day 5
+    vitamin = projection.loc['Vitamin C']
+    assert vitamin['Kalan İhtiyaç'] == 600
+    assert vitamin['Tükenme Günü'] == 5
+    assert vitamin['Son Sipariş Günü'] == 3
+    assert vitamin['Sipariş Noktası'] == 180
+    assert not vitamin['Sipariş Gerekli']
+    assert pd.isna(projection.loc['Hepato', 'Tükenme Günü'])
+
+
+def test_confirmed_days_are_not_projected_twice():
+    farm = make_farm()
+    plan = make_plan(farm)
+    ledger = DrugLedger(farm)
+    ledger.confirm_day(2, plan)
+    projection = ledger.project(plan, from_day=2).set_index('İlaç')
+    assert projection.loc['Vitamin C', 'Stok'] == 190
+    assert projection.loc['Vitamin C', 'Kalan İhtiyaç'] == 480
+
+
+def test_zero_lead_and_safety_days_need_no_reorder():
+    farm = make_farm()
+    projection = DrugLedger(farm).project(make_plan(farm), from_day=1, lead_days=0, safety_days=0).set_index('İlaç')
+    assert projection['Sipariş Noktası'].tolist() == [0, 0]
+    assert not projection['Sipariş Gerekli'].any()
+    assert projection.loc['Vitamin C', 'Tükenme Günü'] == 5
@@ -0,0 +1,70 @@
+import json
+
+from drug_parser import DrugNameMatcher, compile_program, load_compiled_program, parse_dose, parse_session
+
+INVENTORY = {'Neomisin Sülfat': {}, 'Hepato': {}, 'Vitamin C': {}, 'Sodyum Bütirat': {}, 'Probiyotik': {}}
+
+
+def test_parse_dose_units_and_ranges():
+    assert parse_dose('100 mg/L su (10g/100L)') == (100.0, 'g')
+    assert parse_dose('10g/100L') == (100.0, 'g')
+    assert parse_dose('0.5-1 g/L su') == (750.0, 'g')
+    assert parse_dose('0,5-1 mL/L') == (750.0, 'ml')
+    assert parse_dose('75-100 mg/kg CA/gün (yaklaşık 500 mg/L su)') == (500.0, 'g')
+    assert parse_dose('Üretici dozajı') is None
+
+
+def test_fuzzy_name_matching():
+    matcher = DrugNameMatcher(INVENTORY)
+    assert matcher.match('NEOMİSİN SÜLFAT') == 'Neomisin Sülfat'
+    assert matcher.match('Sodyum Butirat') == 'Sodyum Bütirat'
+    assert matcher.match('Butirat') == 'Sodyum Bütirat'
+    assert matcher.match('Vit C') == 'Vitamin C'
+    assert matcher.match('Neomisn Sulfat') == 'Neomisin Sülfat'
+    assert matcher.match('Multivitamin') is None
+    assert matcher.match('Elektrolit') is None
+
+    # A partial or fuzzy name must not borrow a different drug's dose and withdrawal
+    for other in ('Vitamin E', 'Vitamin AD3E', 'Vit K', 'Neomisin Sülfat Forte'):
+        assert matcher.match(other) is None
+    matcher = DrugNameMatcher([*INVENTORY, 'Doksisiklin', 'Kolistin Sülfat'])
+    assert matcher.match('Amoksisilin') is None and matcher.match('Doksisilin') == 'Doksisiklin'
+    assert matcher.match('Sülfat') is None and matcher.match('Kolistin') == 'Kolistin Sülfat'
+
+
+def test_parse_session_assigns_doses_per_drug():
+    matcher = DrugNameMatcher(INVENTORY)
+    records = parse_session('Karaciğer Koruyucu (Hepato) + Vitamin C', 'Hepato: üretici dozajı. Vit C: 500 mg/L su', matcher)
+    assert [(r['drug'], r['dose'], r['matched']) for r in records] == [('Hepato', None, True), ('Vitamin C', 500.0, True)]
+
+    records = parse_session('NEOMİSİN SÜLFAT (100 mg/L su)', '', matcher)
+    assert (records[0]['drug'], records[0]['dose'], records[0]['unit']) == ('Neomisin Sülfat', 100.0, 'g')
+    assert parse_session('Temiz Su', 'Sadece temiz su', matcher) == []
+
+
+def test_farm_edits_override_sessions_and_keep_base_doses():
+    base = {'drug_program_complete': {
+        '6': {'strategic_focus': 'Tedavi', 'morning': {'drug': 'Neomisin Sülfat', 'dosage': '100 mg/L su'},
+              'evening': {'drug': 'Hepato', 'dosage': 'Üretici dozajı'}, 'clinical_note': 'not'},
+    }}
+    overrides = {'6': {'sabah': 'Neomisin Sülfat', 'aksam': 'Probiyotik', 'not': ''}}
+    day = compile_program(base, overrides, INVENTORY)[6]
+    assert day['morning'][0]['dose'] == 100.0
+    assert [r['drug'] for r in day['evening']] == ['Probiyotik']
+    assert day['strategic_focus'] == 'Tedavi' and day['note'] == 'not'
+
+
+def test_disk_cache_is_keyed_by_source_hash(tmp_path):
+    cache = tmp_path / 'compiled.json'
+    base = {'1': {'sabah': 'Vitamin C', 'aksam': ''}}
+    first = load_compiled_program(base, {}, INVENTORY, str(cache))
+    assert first[1]['morning'][0]['drug'] == 'Vitamin C'
+
+    # A matching hash is served from disk without parsing
+    stored = json.loads(cache.read_text(encoding='utf-8'))
+    stored['days']['1']['morning'][0]['drug'] = 'from-cache'
+    cache.write_text(json.dumps(stored), encoding='utf-8')
+    assert load_compiled_program(base, {}, INVENTORY, str(cache))[1]['morning'][0]['drug'] == 'from-cache'
+
+    changed = {'1': {'sabah': 'Probiyotik', 'aksam': ''}}
+    assert load_compiled_program(changed, {}, INVENTORY, str(cache))[1]['morning'][0]['drug'] == 'Probiyotik'
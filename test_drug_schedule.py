@@ -0,0 +1,108 @@
+import json
+import time
+
+from drug_parser import compile_program
+from drug_schedule import DrugInterval, DrugScheduleIndex, _HouseIntervals, get_slaughter_day
+
+HOUSES = ['Kümes 1', 'Kümes 2']
+INVENTORY = {
+    'Neomisin Sülfat': {'withdrawal': 5},
+    'Tilosin Tartrat': {'withdrawal': 7},
+    'Vitamin C': {'withdrawal': 0},
+}
+
+
+def make_program():
+    program = {str(day): {'morning': '', 'evening': ''} for day in range(1, 43)}
+    for day in range(6, 10):
+        program[str(day)] = {'morning': 'Neomisin Sülfat', 'evening': 'Vitamin C'}
+    for day in range(18, 21):
+        program[str(day)] = {'morning': 'Tilosin (Tilosin Tartrat)', 'evening': ''}
+    return program
+
+
+def make_index(program=None):
+    return DrugScheduleIndex(compile_program(program or make_program(), {}, INVENTORY), HOUSES, INVENTORY)
+
+
+def test_intervals_and_administered_on():
+    index = make_index()
+    assert [(i.drug, i.start, i.end, i.withdrawal_end) for i in index.intervals('Kümes 1')] == [
+        ('Neomisin Sülfat', 6, 9, 14), ('Vitamin C', 6, 9, 9), ('Tilosin Tartrat', 18, 20, 27),
+    ]
+    assert {i.drug for i in index.administered_on(7, 'Kümes 2')['Kümes 2']} == {'Neomisin Sülfat', 'Vitamin C'}
+    assert index.administered_on(10, 'Kümes 1') == {'Kümes 1': []}
+    assert {i.drug for i in index.overlapping(9, 18)['Kümes 1']} == {'Neomisin Sülfat', 'Vitamin C', 'Tilosin Tartrat'}
+
+
+def test_withdrawal_clearance():
+    index = make_index()
+    conflicts = index.withdrawal_conflicts(12)
+    assert set(conflicts) == set(HOUSES)
+    assert [i.drug for i in conflicts['Kümes 1']] == ['Neomisin Sülfat']
+    assert index.is_clear_for_slaughter(15)
+    assert not index.is_clear_for_slaughter(27)
+    assert index.earliest_clear_day() == 28
+
+
+def test_incremental_update_matches_full_rebuild():
+    program = make_program()
+    index = make_index(program)
+    edits = {
+        10: {'morning': 'Neomisin Sülfat', 'evening': ''},   # extends a run
+        7: {'morning': '', 'evening': 'Vitamin C'},            # splits a run
+        19: {'morning': 'Temiz Su', 'evening': ''},
+        30: {'morning': 'Tilosin Tartrat', 'evening': 'Vitamin C'},
+        21: {'morning': '', 'evening': '', 'houses': {'Kümes 2': {'morning': 'Tilosin Tartrat'}}},
+    }
+    for day, entry in edits.items():
+        program[str(day)] = entry
+        index.update_day(day, compile_program(program, {}, INVENTORY, [day])[day])
+        rebuilt = make_index(program)
+        for house in HOUSES:
+            assert index.intervals(house) == rebuilt.intervals(house)
+
+
+def test_house_override_and_merge_with_farm_program():
+    base = {'drug_program_complete': {'5': {'morning': {'drug': 'Vitamin C'}, 'evening': {'drug': ''}}}}
+    farm_program = {'6': {'sabah': '', 'aksam': '', 'houses': {'Kümes 2': {'sabah': 'Neomisin Sülfat'}}}}
+    index = DrugScheduleIndex(compile_program(base, farm_program, INVENTORY), HOUSES, INVENTORY)
+    assert [i.drug for i in index.administered_on(5, 'Kümes 1')['Kümes 1']] == ['Vitamin C']
+    assert index.withdrawal_conflicts(8) == {'Kümes 2': index.intervals('Kümes 2')[1:]}
+
+
+def test_real_program_clearance():
+    with open('farm_data.json', 'r', encoding='utf-8') as f:
+        farm = json.load(f)
+    with open('complete_drug_program.json', 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    program = compile_program(base, farm['drug_program'], farm['drug_inventory'])
+    index = DrugScheduleIndex.from_farm(farm, program)
+    slaughter_day = get_slaughter_day(farm['settings'])
+    assert index.is_clear_for_slaughter(slaughter_day) == (index.earliest_clear_day() <= slaughter_day)
+
+
+def test_drugs_without_withdrawal_do_not_block_slaughter():
+    program = make_program()
+    program['42'] = {'morning': 'Vitamin C', 'evening': ''}
+    index = make_index(program)
+    assert index.is_clear_for_slaughter(42)
+    assert index.earliest_clear_day() == 28
+
+
+def test_early_long_interval_does_not_make_queries_linear():
+    # One run covering the whole horizon ahead of 20000 one-day runs: every prefix maximum reaches every day
+    short = [DrugInterval('Kümes 1', f'İlaç {day}', day, day, day + day % 3) for day in range(2, 20002)]
+    index = _HouseIntervals([DrugInterval('Kümes 1', 'Uzun', 1, 20001, 20006)] + short)
+    everything = index.intervals
+
+    for day in (1, 2, 777, 20001, 20004):
+        assert index.at(day) == [i for i in reversed(everything) if i.contains(day)]
+        assert index.withdrawal_blocking(day) == [
+            i for i in reversed(everything) if i.has_withdrawal and i.withdrawal_end >= day and i.start <= day]
+    assert index.overlapping(10, 12) == [i for i in reversed(everything) if i.start <= 12 and i.end >= 10]
+
+    start = time.perf_counter()
+    for day in range(2, 20002, 5):
+        assert len(index.at(day)) == 2
+    assert time.perf_counter() - start < 1.0
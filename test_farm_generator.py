@@ -0,0 +1,78 @@
+import io
+import json
+import sqlite3
+
+from farm_generator import FarmGenerator, GeneratorConfig, write_json_dir, write_jsonl, write_sqlite
+from feed_logistics import FeedLogistics
+from kpi_engine import FlockKPIs
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def make_generator(**config):
+    return FarmGenerator(load_json('banvit_data.json'), load_json('farm_data.json'), GeneratorConfig(**config))
+
+
+def test_flocks_are_deterministic_and_independent():
+    generator = make_generator(farms=2, flocks=3, seed=5)
+    flocks = list(generator.iter_flocks())
+    assert len(flocks) == 6
+    assert flocks[4] == make_generator(farms=2, flocks=3, seed=5).generate_flock(1, 1)
+    assert flocks[0] != make_generator(seed=6).generate_flock(0, 0)
+
+    # Same farm keeps its houses across flocks, start dates move one cycle on
+    assert flocks[0]['settings']['houses'] == flocks[2]['settings']['houses']
+    assert flocks[0]['settings']['start_date'] < flocks[1]['settings']['start_date']
+
+
+def test_flock_shape_follows_ross_targets():
+    farm = make_generator(min_houses=3, max_houses=3, disease_rate=0).generate_flock(0, 0)
+    houses = list(farm['settings']['houses'])
+    assert len(houses) == 3 and len(farm['daily_data']) == 42
+    assert set(farm['daily_data']['day_42']) == set(houses)
+    assert farm['feed_invoices'] and farm['chat_history']
+    assert farm['metadata']['data_version'] == len(farm['metadata']['transaction_log'])
+
+    kpis = FlockKPIs.from_farm(farm, load_json('banvit_data.json'), 42)
+    final = kpis.farm(42)
+    assert 2500 < final['avg_weight'] < 3300
+    assert 1.4 < final['fcr'] < 2.0
+    assert 93 < final['livability'] < 99.5
+
+    recommendation = FeedLogistics(farm, load_json('banvit_data.json')).generate_order_recommendation(20, farm)
+    assert isinstance(recommendation, dict)
+
+
+def test_disease_events_raise_mortality():
+    healthy = make_generator(disease_rate=0, seed=3).generate_flock(0, 0)
+    sick = make_generator(disease_rate=1, seed=3).generate_flock(0, 0)
+    event = sick['metadata']['generator']['disease_events'][0]
+    house = list(sick['settings']['houses'])[event['houses'][0]]
+    days = range(event['start_day'], event['end_day'] + 1)
+
+    def deaths(farm):
+        return sum(farm['daily_data'][f'day_{d}'][house]['deaths'] for d in days)
+    assert healthy['metadata']['generator']['disease_events'] == []
+    assert deaths(sick) > deaths(healthy)
+
+
+def test_backends_round_trip(tmp_path):
+    generator = make_generator(farms=2, flocks=2, days=7)
+    expected = list(generator.iter_flocks())
+
+    stream = io.StringIO()
+    assert write_jsonl(generator.iter_flocks(), stream) == 4
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == expected
+
+    assert write_json_dir(generator.iter_flocks(), str(tmp_path / 'farms')) == 4
+    assert load_json(str(tmp_path / 'farms' / 'farm0002_flock002.json')) == expected[3]
+
+    db = str(tmp_path / 'farms.db')
+    assert write_sqlite(generator.iter_flocks(), db, batch_size=3) == 4
+    write_sqlite(generator.iter_flocks(), db)
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute("SELECT data FROM farms ORDER BY flock_key").fetchall()
+    assert [json.loads(row[0]) for row in rows] == expected
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from farm_generator import FarmGenerator, GeneratorConfig
+from farm_records import DayRecord, FarmRecords, get_farm_records
+
+
+def make_farm():
+    return {
+        'settings': {'houses': {'Kümes 1': {'chick_count': 100, 'silo_capacity': 20},
+                                'Kümes 2': {'chick_count': 50}}},
+        'daily_data': {
+            'day_1': {'Kümes 1': {'deaths': 2, 'avg_weight': 45}, 'Kümes 2': {'deaths': '3', 'weight': 44.5}},
+            'day_3': {'Kümes 1': {'deaths': 1, 'silo_remaining': -5}, 'Kümes 9': {'deaths': 1}},
+            'gün_4': {},
+        },
+        'feed_invoices': [{'date': '2026-03-01', 'feed_type': 'Civciv', 'quantity': 9000}, 'bozuk'],
+        'drug_inventory': {'Hepato': {'dose': 1000, 'unit': 'ml/1000L', 'withdrawal': 0, 'stock': 'çok'}},
+    }
+
+
+def test_fields_are_normalized_and_problems_reported_once():
+    records = FarmRecords.from_farm(make_farm())
+
+    assert records.record(1, 'Kümes 1') == DayRecord(1, 'Kümes 1', deaths=2, weight=45.0, recorded=True)
+    assert records.record(1, 'Kümes 2').deaths == 3
+    assert records.record(3, 'Kümes 1').silo_remaining == 0
+    assert not records.record(2, 'Kümes 1').recorded and not records.record(40, 'Kümes 1').recorded
+    assert [r.house for r in records.day(3)] == ['Kümes 1', 'Kümes 2']
+
+    assert records.live_birds('Kümes 1', 3) == 97 and records.live_birds('Kümes 1', 40) == 97
+    assert records.total_live_birds(1) == 98 + 47 and records.cumulative_deaths('Kümes 3', 1) == 0
+    assert records.house('Kümes 1').silo_capacity == 20.0 and records.feed_received_kg == 9000
+    assert records.drugs['Hepato'].stock == 0
+
+    issues = '\n'.join(records.issues)
+    for fragment in ("'silo_remaining' negatif", "bilinmeyen kümes 'Kümes 9'", "geçersiz gün anahtarı 'gün_4'",
+                     "2. yem faturası okunamadı", "'stock' sayı değil"):
+        assert fragment in issues
+    assert len(records.issues) == 5
+
+    with pytest.raises(AttributeError):
+        records.record(1, 'Kümes 1').live = 5
+
+
+def test_records_are_cached_per_data_version():
+    farm = make_farm()
+    records = get_farm_records(farm)
+    assert get_farm_records(farm) is records
+
+    farm['daily_data']['day_2'] = {'Kümes 1': {'deaths': 10}}
+    farm['metadata'] = {'data_version': 1}
+    rebuilt = get_farm_records(farm)
+    assert rebuilt is not records and rebuilt.live_birds('Kümes 1', 3) == 87
+
+    # A new farm allocated where a collected one lived must not get its records
+    for deaths in range(50):
+        other = make_farm()
+        other['daily_data']['day_1']['Kümes 1']['deaths'] = deaths
+        assert get_farm_records(other).live_birds('Kümes 1', 1) == 100 - deaths
+        del other
+
+
+def test_accessors_match_the_raw_data():
+    banvit = json.load(open('banvit_data.json', encoding='utf-8'))
+    farm = FarmGenerator(banvit, {}, GeneratorConfig(farms=1, flocks=1, days=42)).generate_flock(0, 0)
+    records = FarmRecords.from_farm(farm)
+    assert not records.issues
+
+    for house, info in farm['settings']['houses'].items():
+        for day in (1, 20, 42):
+            deaths = sum(farm['daily_data'][f'day_{d}'][house]['deaths'] for d in range(1, day + 1))
+            assert records.live_birds(house, day) == info['chick_count'] - deaths
+            assert records.record(day, house).weight == farm['daily_data'][f'day_{day}'][house]['weight']
@@ -0,0 +1,111 @@
+import json
+
+from change_feed import section_version
+from farm_store import FarmSession, FarmStore, describe_key
+
+
+def make_store(tmp_path):
+    data = {
+        'metadata': {'transaction_log': [], 'data_version': 3},
+        'settings': {'houses': {'Kümes 1': {'capacity': 10000}, 'Kümes 2': {'capacity': 12000}}},
+        'daily_data': {'day_5': {'Kümes 1': {'dead': 10, 'feed_kg': 500}, 'Kümes 2': {'dead': 4}}},
+        'feed_invoices': [{'amount_kg': 8000, 'paid': False}],
+    }
+    (tmp_path / 'farm_data.json').write_text(json.dumps(data), encoding='utf-8')
+    return FarmStore(str(tmp_path / 'farm_data.json'))
+
+
+def test_concurrent_edits_to_different_records_and_fields_merge(tmp_path):
+    store = make_store(tmp_path)
+    a, b = FarmSession(store), FarmSession(store)
+
+    a.farm_data['daily_data']['day_5']['Kümes 1']['dead'] = 12
+    b.farm_data['daily_data']['day_5']['Kümes 2']['dead'] = 6
+    b.farm_data['daily_data']['day_5']['Kümes 1']['feed_kg'] = 520
+    assert not a.save(a.farm_data).conflicts
+
+    result = b.save(b.farm_data)
+    assert not result.conflicts and result.merged == ['/daily_data/day_5/Kümes 1']
+    assert b.farm_data['daily_data']['day_5']['Kümes 1'] == {'dead': 12, 'feed_kg': 520}
+
+    saved = json.loads((tmp_path / 'farm_data.json').read_text(encoding='utf-8'))
+    assert saved['daily_data']['day_5'] == b.farm_data['daily_data']['day_5']
+    assert saved['metadata']['record_versions']['/daily_data/day_5/Kümes 1'] == 2
+
+
+def test_conflicting_write_rejects_the_whole_save_and_session_gets_current_value(tmp_path):
+    store = make_store(tmp_path)
+    a, b = FarmSession(store), FarmSession(store)
+
+    a.farm_data['feed_invoices'][0]['paid'] = True
+    b.farm_data['feed_invoices'][0]['paid'] = 'kısmi'
+    b.farm_data['settings']['houses']['Kümes 2']['capacity'] = 11000
+    a.save(a.farm_data)
+
+    result = b.save(b.farm_data)
+    assert [c['key'] for c in result.conflicts] == ['/feed_invoices/0']
+    assert b.farm_data['feed_invoices'][0]['paid'] is True
+    assert b.farm_data['settings']['houses']['Kümes 2']['capacity'] == 12000
+    assert describe_key('/feed_invoices/0') == '1. yem faturası'
+    assert describe_key('/daily_data/day_5/Kümes 1') == 'Kümes 1 5. gün kaydı'
+
+
+def test_conflicting_stock_update_drops_its_ledger_append(tmp_path):
+    store = make_store(tmp_path)
+    store.update(lambda data: data.update(drug_inventory={'Enroflox': {'stock': 10}},
+                                               drug_ledger=[{'drug': 'Enroflox', 'qty': 10}]))
+    a, b = FarmSession(store), FarmSession(store)
+
+    a.farm_data['drug_inventory']['Enroflox']['stock'] = 8
+    a.farm_data['drug_ledger'].append({'drug': 'Enroflox', 'qty': -2})
+    b.farm_data['drug_inventory']['Enroflox']['stock'] = 7
+    b.farm_data['drug_ledger'].append({'drug': 'Enroflox', 'qty': -3})
+    b.farm_data['metadata']['transaction_log'].append({'action': 'Drug Stock Movement'})
+    a.save(a.farm_data)
+
+    result = b.save(b.farm_data)
+    assert [c['key'] for c in result.conflicts] == ['/drug_inventory/Enroflox'] and not result.applied
+    saved = json.loads((tmp_path / 'farm_data.json').read_text(encoding='utf-8'))
+    assert saved['drug_inventory']['Enroflox']['stock'] == 8
+    assert saved['drug_ledger'] == [{'drug': 'Enroflox', 'qty': 10}, {'drug': 'Enroflox', 'qty': -2}]
+    assert saved['metadata']['transaction_log'] == []
+    assert b.farm_data['drug_ledger'] == saved['drug_ledger']
+
+
+def test_concurrent_appends_both_survive(tmp_path):
+    store = make_store(tmp_path)
+    a, b = FarmSession(store), FarmSession(store)
+
+    a.farm_data['feed_invoices'].append({'amount_kg': 5000})
+    a.farm_data['metadata']['transaction_log'].append({'action': 'A'})
+    b.farm_data['feed_invoices'].append({'amount_kg': 6000})
+    b.farm_data['metadata']['transaction_log'].append({'action': 'B'})
+    a.save(a.farm_data)
+    assert not b.save(b.farm_data).conflicts
+
+    assert [i['amount_kg'] for i in b.farm_data['feed_invoices']] == [8000, 5000, 6000]
+    assert [t['action'] for t in b.farm_data['metadata']['transaction_log']] == ['A', 'B']
+
+
+def test_refresh_applies_other_sessions_changes_from_the_feed(tmp_path):
+    store = make_store(tmp_path)
+    a, b = FarmSession(store), FarmSession(store)
+    version = section_version(b.farm_data)
+    day_5 = b.farm_data['daily_data']['day_5']
+
+    a.farm_data['daily_data']['day_5']['Kümes 2']['dead'] = 7
+    a.farm_data['daily_data']['day_6'] = {'Kümes 1': {'dead': 3}}
+    a.farm_data['feed_invoices'].append({'amount_kg': 5000})
+    a.save(a.farm_data)
+
+    assert b.refresh(b.farm_data) == 3
+    assert b.reloads == 1
+    assert b.farm_data['daily_data'] == a.farm_data['daily_data']
+    assert b.farm_data['feed_invoices'] == a.farm_data['feed_invoices']
+    assert b.farm_data['daily_data']['day_5'] is day_5
+    assert section_version(b.farm_data) > version
+    assert b.refresh(b.farm_data) == 0
+
+    # A later edit from b bases on the refreshed versions, so it does not conflict
+    b.farm_data['daily_data']['day_6']['Kümes 1']['dead'] = 4
+    assert not b.save(b.farm_data).conflicts
@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+
+from drug_parser import compile_program
+from dosage_engine import build_dosage_plan
+from financial_analysis import FinancialEngine, feed_type_index, get_financial_engine
+from kpi_engine import FlockKPIs
+
+HOUSES = ['Kümes 1', 'Kümes 2']
+INVENTORY = {'Neomisin Sülfat': {'dose': 100, 'unit': 'g/1000L', 'cost': 200, 'stock': 50}}
+BANVIT = {str(day): {'su_tüketimi': 100.0, 'yem_tüketimi': 100.0, 'canlı_ağırlık': 50.0 * day} for day in range(1, 43)}
+
+
+def make_farm(**settings):
+    return {
+        'settings': {
+            'houses': {'Kümes 1': {'chick_count': 1000}, 'Kümes 2': {'chick_count': 1000}},
+            'feed_costs': {'Civciv': 3.0, 'Büyütme': 2.0, 'Bitirme': 1.0},
+            'feed_transition': {'chick_to_grower': 2, 'grower_to_finisher': 3},
+            'labor_cost_per_day': 100,
+            **settings,
+        },
+        'daily_data': {'day_2': {'Kümes 1': {'feed_consumed': 50, 'weight': 120}}},
+        'drug_inventory': INVENTORY,
+    }
+
+
+def make_engine(farm, current_day=4):
+    program = {'1': {'morning': 'Neomisin Sülfat', 'evening': ''}}
+    plan = build_dosage_plan(compile_program(program, {}, INVENTORY), HOUSES, farm, BANVIT)
+    return FinancialEngine(farm, BANVIT, current_day, plan), plan
+
+
+def test_feed_type_follows_transition_days():
+    assert feed_type_index({'feed_transition': {'chick_to_grower': 14, 'grower_to_finisher': 28}},
+                           np.array([1, 14, 15, 28, 29])).tolist() == [0, 0, 1, 1, 2]
+
+
+def test_costs_per_house_and_day():
+    engine, plan = make_engine(make_farm())
+    costs = engine.costs()
+    # 1000 birds x 100 g = 100 kg/day; day 2 Kümes 1 uses the recorded 50 kg
+    assert costs['feed'][:, 1].tolist() == [300.0, 300.0, 200.0, 100.0]
+    assert costs['feed'][1, 0] == 150.0
+    assert np.allclose(costs['labor'].sum(axis=1), 100)
+    expected_drug = plan.amounts[0, 0].sum() / 1000 * 200
+    assert np.isclose(costs['drug'][0, 0], expected_drug) and costs['drug'][1:].sum() == 0
+    summary = engine.house_summary().set_index('Kümes')
+    # Day 4 target weight 200 g x 1000 birds = 200 kg
+    assert summary.loc['Kümes 2', 'TL / kg'] == round(costs['total'][:, 1].sum() / 200, 2)
+
+
+def test_what_if_feed_price_and_margin():
+    engine, _ = make_engine(make_farm(live_weight_price=10))
+    result = engine.what_if(feed_prices={'Bitirme': 2.0})
+    # Only day 4 is Bitirme: 2 houses x 100 kg x +1 TL
+    assert np.isclose(result['delta_cost'], 200)
+    # Kümes 1 weighed 120 g on day 2 (target 100): 240 g on day 4 along the curve, as on the dashboard
+    assert np.isclose(result['revenue'], (240 + 200) * 10)
+    assert np.isclose(result['margin'], result['revenue'] - result['total_cost'])
+    assert engine.financial_data()['total_expenses'] == round(result['baseline']['total_cost'], 2)
+
+
+def test_invoice_reconciliation_and_cache():
+    farm = make_farm()
+    engine, plan = make_engine(farm)
+    estimated = engine.feed_kg_by_type.sum()
+    farm['feed_invoices'] = [{'feed_type': 'Civciv', 'quantity': estimated * 1.1 + 30}]
+    farm['daily_data']['day_4'] = {'Kümes 1': {'silo_remaining': 30}}
+    reconciled, _ = make_engine(farm)
+    assert np.isclose(reconciled.reconcile_factor, 1.1)
+    assert np.isclose(reconciled.feed_kg_by_type.sum(), estimated * 1.1)
+    kpis = FlockKPIs.from_farm(farm, BANVIT, 4)
+    assert np.allclose(reconciled.feed_kg_by_type.sum(axis=0), kpis.feed)
+    assert np.allclose(reconciled.biomass_kg, kpis.biomass)
+
+    farm['metadata'] = {'data_version': 1}
+    cached = get_financial_engine(farm, BANVIT, 4, plan)
+    assert get_financial_engine(farm, BANVIT, 4, plan) is cached
+    start = time.perf_counter()
+    for price in range(100):
+        cached.what_if(feed_prices={'Büyütme': price / 10})
+    assert time.perf_counter() - start < 1.0
+    farm['metadata']['data_version'] = 2
+    assert get_financial_engine(farm, BANVIT, 4, plan) is not cached
@@ -0,0 +1,68 @@
+import json
+import time
+
+import instrumentation
+from instrumentation import begin_run, end_run, export_runs, flame_data, instrument_methods, span, summarize, timed
+
+
+@timed
+def leaf(n):
+    time.sleep(0.001)
+    return n
+
+
+@timed(name='outer')
+def outer(n):
+    return sum(leaf(i) for i in range(n))
+
+
+@instrument_methods
+class Service:
+    def work(self):
+        return outer(2)
+
+    def _helper(self):
+        return leaf(0)
+
+
+def test_spans_nest_and_summarize():
+    instrumentation.clear_runs()
+    begin_run()
+    with span('page'):
+        assert Service().work() == 1
+        Service()._helper()
+    run = end_run('Dashboard')
+
+    assert run['label'] == 'Dashboard' and instrumentation.recent_runs()[0] is run
+    names = [s['name'] for s in run['spans']]
+    assert names == ['page', 'Service.work', 'outer', 'leaf', 'leaf', 'leaf']
+    assert run['spans'][2]['parent'] == 1 and run['spans'][5]['parent'] == 0
+
+    summary = summarize(run).set_index('name')
+    assert summary.loc['leaf', 'calls'] == 3
+    assert summary.loc['outer', 'total_ms'] >= summary.loc['outer', 'self_ms']
+    assert summary.index[0] == 'page'
+
+    flame = flame_data(run)
+    assert flame['parents'][:3] == ['', 'root', '0'] and len(flame['ids']) == 7
+    assert all(v >= 0 for v in flame['values'])
+
+
+def test_no_recording_outside_a_run_and_ring_buffer(tmp_path):
+    instrumentation.clear_runs()
+    assert outer(3) == 3
+    assert instrumentation.recent_runs() == []
+
+    for i in range(instrumentation.RUN_BUFFER_SIZE + 5):
+        begin_run(str(i))
+        leaf(i)
+    end_run()
+    runs = instrumentation.recent_runs()
+    assert len(runs) == instrumentation.RUN_BUFFER_SIZE
+    assert runs[0]['label'] == str(instrumentation.RUN_BUFFER_SIZE + 4) and runs[1]['interrupted']
+
+    path = tmp_path / 'perf.jsonl'
+    assert export_runs(runs[:3], str(path)) == 3
+    export_runs(runs[:1], str(path))
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert len(lines) == 4 and lines[0]['spans'][0]['name'] == 'leaf'
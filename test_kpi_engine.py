@@ -0,0 +1,94 @@
+import numpy as np
+
+from kpi_engine import FlockKPIs, epef, epef_grade, get_flock_kpis, update_flock_kpis
+
+BANVIT = {str(day): {'canlı_ağırlık': 50.0 * day, 'yem_tüketimi': 100.0} for day in range(1, 43)}
+
+
+def make_farm():
+    return {
+        'metadata': {'data_version': 1},
+        'settings': {'farm_name': 'KPI', 'houses': {'Kümes 1': {'chick_count': 1000}, 'Kümes 2': {'chick_count': 2000}}},
+        'daily_data': {
+            'day_1': {'Kümes 1': {'deaths': 10, 'feed_consumed': 20}},
+            'day_3': {'Kümes 1': {'deaths': 5, 'weight': 180}, 'Kümes 2': {'deaths': 20}},
+        },
+    }
+
+
+def test_epef_matches_textbook_example():
+    # 96 % livability, 2.5 kg at 42 days, FCR 1.6 -> 357
+    assert round(float(epef(96, 2500, 42, 1.6))) == 357
+    assert epef_grade(357) == "⭐ Çok İyi" and epef_grade(100) == "🔴 Kritik"
+    assert float(epef(96, 2500, 42, 0)) == 0
+
+
+def test_house_kpis():
+    kpis = FlockKPIs.from_farm(make_farm(), BANVIT, 3)
+    assert kpis.live[:, 0].tolist() == [990, 990, 985]
+    assert np.isclose(kpis.livability[2, 0], 98.5)
+    # Day 1 recorded 20 kg, days 2-3 use 100 g x live birds
+    assert np.isclose(kpis.cum_feed[2, 0], 20 + 99 + 98.5)
+    assert np.isclose(kpis.fcr[2, 0], kpis.cum_feed[2, 0] / (985 * 0.18))
+    assert np.isclose(kpis.daily_gain[2, 0], 60)
+    assert np.isclose(kpis.cfcr[2, 0], kpis.fcr[2, 0] + (2500 - 180) / 4500)
+    # Kümes 2 was not weighed on day 3: Ross target 150 g
+    assert kpis.weight[2, 1] == 150
+
+    farm = kpis.farm(3)
+    assert farm['live_birds'] == 985 + 1980
+    assert np.isclose(farm['avg_weight'], (985 * 180 + 1980 * 150) / (985 + 1980))
+    assert list(kpis.house_table(3)['Kümes']) == ['Kümes 1', 'Kümes 2']
+
+
+def test_incremental_update_matches_rebuild():
+    farm = make_farm()
+    kpis = get_flock_kpis(farm, BANVIT, 3)
+    farm['daily_data']['day_2'] = {'Kümes 2': {'deaths': 40, 'weight': 90, 'feed_consumed': 150}}
+    farm['metadata']['data_version'] += 1
+    assert update_flock_kpis(farm, 3, 2, 'Kümes 2') is kpis
+    assert get_flock_kpis(farm, BANVIT, 3) is kpis
+    rebuilt = FlockKPIs.from_farm(farm, BANVIT, 3)
+    for name in ('live', 'cum_feed', 'fcr', 'cfcr', 'epef'):
+        assert np.allclose(getattr(kpis, name), getattr(rebuilt, name))
+
+    # A version jump that was not an incremental save forces a rebuild
+    farm['metadata']['data_version'] += 2
+    assert update_flock_kpis(farm, 3, 2, 'Kümes 2') is None
+    assert get_flock_kpis(farm, BANVIT, 3) is not kpis
+
+
+def test_legacy_app_lists():
+    daily = {1: {'olum': [10, 0], 'agirlik': [0, 0]}, 2: {'olum': [0, 4], 'agirlik': [100, 0]}}
+    kpis = FlockKPIs.from_daily_lists(daily, [1000, 1000], BANVIT, 2)
+    assert kpis.live[1].tolist() == [990, 996]
+    assert kpis.weight[1].tolist() == [100, 100]
+
+
+def test_feed_reconciled_to_deliveries_and_weight_carried_forward():
+    farm = make_farm()
+    assert FlockKPIs.from_farm(farm, BANVIT, 3).farm(3)['feed_estimated']
+
+    # 1000 kg delivered, 100 kg still in the silo: the flock ate 900 kg, whatever the standards say
+    farm['feed_invoices'] = [{'date': '2026-02-14', 'feed_type': 'Civciv', 'quantity': 1000}]
+    farm['daily_data']['day_3']['Kümes 1']['silo_remaining'] = 100
+    kpis = get_flock_kpis(farm, BANVIT, 3)
+    assert np.isclose(kpis.cum_feed[2].sum(), 900) and not kpis.farm(3)['feed_estimated']
+    assert np.isclose(kpis.farm(3)['fcr'], kpis.farm_fcr()[2])
+
+    farm['daily_data']['day_3']['Kümes 2']['silo_remaining'] = 50
+    farm['metadata']['data_version'] += 1
+    assert update_flock_kpis(farm, 3, 3, 'Kümes 2') is kpis
+    assert np.isclose(kpis.cum_feed[2].sum(), 850)
+    assert np.allclose(kpis.fcr, FlockKPIs.from_farm(farm, BANVIT, 3).fcr)
+
+    # Kümes 1 weighed 180 g on day 3 (Ross 150): day 4 follows the curve from there
+    assert FlockKPIs.from_farm(make_farm(), BANVIT, 4).weight[3].tolist() == [240, 200]
+
+
+def test_legacy_app_lists_reconcile_to_delivered_feed():
+    # 2 x 1000 birds x 100 g for two days is the estimate; 500 kg came, 150 kg is left in the silos
+    daily = {1: {'olum': [0, 0], 'agirlik': [0, 0]}, 2: {'olum': [0, 0], 'agirlik': [100, 100], 'silo': [100, 50]}}
+    kpis = FlockKPIs.from_daily_lists(daily, [1000, 1000], BANVIT, 2, delivered_kg=500)
+    assert np.isclose(kpis.cum_feed[1].sum(), 350) and not kpis.farm(2)['feed_estimated']
+    assert np.isclose(kpis.farm(2)['fcr'], 350 / 200)
@@ -0,0 +1,114 @@
+import itertools
+import json
+
+from farm_store import FarmSession, FarmStore
+import mobile_ingest
+from mobile_ingest import IngestServer, MobileIngest, MobileQueueClient, stamp_fields
+
+
+def make_ingest(tmp_path):
+    data = {
+        'settings': {'houses': {'Kümes 1': {'chick_count': 10000}, 'Kümes 2': {'chick_count': 10000}}},
+        'daily_data': {},
+        'metadata': {'transaction_log': []},
+    }
+    (tmp_path / 'farm_data.json').write_text(json.dumps(data), encoding='utf-8')
+    return MobileIngest(FarmStore(str(tmp_path / 'farm_data.json')), banvit_file=str(tmp_path / 'none.json'))
+
+
+def read_daily(tmp_path):
+    return json.loads((tmp_path / 'farm_data.json').read_text(encoding='utf-8'))['daily_data']
+
+
+def test_duplicates_resolve_the_same_whatever_the_arrival_order(tmp_path):
+    batches = [
+        {'device_id': 'tel-1', 'entries': [
+            {'key': 'a', 'client_ts': '2026-03-01T06:00:00', 'day': 3, 'house': 'Kümes 1', 'deaths': 4, 'weight': 80.0}]},
+        {'device_id': 'tel-2', 'entries': [
+            {'key': 'b', 'client_ts': '2026-03-01T09:00:00+03:00', 'day': 3, 'house': 'Kümes 1', 'deaths': 5},
+            {'key': 'c', 'client_ts': '2026-03-01T07:00:00', 'day': 3, 'house': 'Kümes 2', 'water': 300}]},
+        {'device_id': 'tel-1', 'entries': [
+            {'key': 'd', 'client_ts': '2026-03-01T06:30:00Z', 'day': 3, 'house': 'Kümes 1', 'deaths': 6}]},
+    ]
+    outcomes = []
+    for order in itertools.permutations(batches):
+        run_path = tmp_path / str(len(outcomes))
+        run_path.mkdir()
+        ingest = make_ingest(run_path)
+        for batch in order + order[:1]:
+            ingest.ingest(batch)
+        outcomes.append(read_daily(run_path))
+
+    assert all(outcome == outcomes[0] for outcome in outcomes)
+    # 09:00+03:00 is 06:00 UTC, earlier than 06:30Z; ties on the time fall back to the device id
+    assert outcomes[0]['day_3'] == {'Kümes 1': {'deaths': 6, 'weight': 80.0}, 'Kümes 2': {'water_consumption': 300.0}}
+
+
+def test_batch_is_one_transaction_with_per_entry_results(tmp_path):
+    ingest = make_ingest(tmp_path)
+    session = FarmSession(ingest.store)
+    entry = {'key': 'k1', 'client_ts': '2026-03-01T06:00:00', 'day': 2, 'house': 'Kümes 1', 'deaths': 3}
+    response = ingest.ingest({'device_id': 'tel-1', 'entries': [
+        entry,
+        {'key': 'k2', 'client_ts': '2026-03-01T06:00:00', 'day': 2, 'house': 'Kümes 9', 'deaths': 1},
+        {'key': 'k3', 'client_ts': 'dün', 'day': 2, 'house': 'Kümes 2', 'deaths': 1},
+        {'key': 'k4', 'client_ts': '2026-03-01T06:00:00', 'day': 2, 'house': 'Kümes 2', 'deaths': 1.5},
+    ]})
+    assert [r['status'] for r in response['results']] == ['applied', 'rejected', 'rejected', 'rejected']
+    assert "bilinmeyen kümes" in response['results'][1]['error']
+
+    again = ingest.ingest({'device_id': 'tel-1', 'entries': [entry, {**entry, 'deaths': 9}]})
+    assert [r['status'] for r in again['results']] == ['duplicate', 'rejected']
+    assert again['seq'] == response['seq']
+
+    # Open sessions pick the batch up from the change feed
+    assert session.refresh(session.farm_data) > 0
+    assert session.farm_data['daily_data']['day_2']['Kümes 1'] == {'deaths': 3}
+    assert session.farm_data['metadata']['transaction_log'][-1]['action'] == 'Mobile Sync'
+
+
+def test_stub_client_queues_offline_and_syncs_over_http(tmp_path):
+    ingest = make_ingest(tmp_path)
+    server = IngestServer(ingest, host='127.0.0.1', port=0, token='gizli').start()
+    queue_file = str(tmp_path / 'queue.json')
+    try:
+        offline = MobileQueueClient('tel-1', lambda batch: (_ for _ in ()).throw(OSError('no signal')), queue_file)
+        offline.record(5, 'Kümes 1', client_ts='2026-03-03T06:00:00', deaths=2, weight=150.5)
+        offline.record(5, 'Kümes 2', client_ts='2026-03-03T06:05:00', water=410)
+        assert offline.flush() == [] and len(offline.queue) == 2
+
+        # Back in range: a new client on the same queue file sends what was left
+        client = MobileQueueClient.over_http('tel-1', f'http://127.0.0.1:{server.port}/ingest', token='gizli',
+                                             queue_file=queue_file)
+        results = client.flush(batch_size=1)
+        assert [r['status'] for r in results] == ['applied', 'applied'] and client.queue == []
+        assert read_daily(tmp_path)['day_5']['Kümes 1'] == {'deaths': 2, 'weight': 150.5}
+
+        unauthorized = MobileQueueClient.over_http('tel-2', f'http://127.0.0.1:{server.port}/ingest')
+        unauthorized.record(6, 'Kümes 1', deaths=1)
+        assert unauthorized.flush() == [] and len(unauthorized.queue) == 1
+    finally:
+        server.stop()
+
+
+def test_web_saves_win_over_older_phone_readings(tmp_path, monkeypatch):
+    ingest = make_ingest(tmp_path)
+
+    def save_form(data):
+        data['daily_data'].setdefault('day_4', {})['Kümes 1'] = {'deaths': 7}
+        stamp_fields(data, 4, 'Kümes 1', ['deaths'])
+    ingest.store.update(save_form)
+
+    # Taken on the phone before the form save, synced after it
+    early = {'key': 'e', 'client_ts': '2000-01-01T06:00:00', 'day': 4, 'house': 'Kümes 1', 'deaths': 2, 'weight': 99.0}
+    late = {'key': 'l', 'client_ts': '2999-01-01T06:00:00', 'day': 4, 'house': 'Kümes 1', 'deaths': 3}
+    assert ingest.ingest({'device_id': 'tel-1', 'entries': [early]})['results'][0]['fields'] == ['weight']
+    assert read_daily(tmp_path)['day_4']['Kümes 1'] == {'deaths': 7, 'weight': 99.0}
+    ingest.ingest({'device_id': 'tel-1', 'entries': [late]})
+    assert read_daily(tmp_path)['day_4']['Kümes 1']['deaths'] == 3
+
+    # The endpoint writes farm data: no token, no server
+    monkeypatch.setenv('KUMES_INGEST_PORT', '0')
+    monkeypatch.delenv('KUMES_INGEST_TOKEN', raising=False)
+    monkeypatch.setattr(mobile_ingest, '_server', None)
+    assert mobile_ingest.start_ingest_server(str(tmp_path / 'farm_data.json')) is None
@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+
+from mock_streamlit import MockSessionState, MockStreamlit
+from page_benchmark import DEFERRED_MODULES, compare, format_import_report, import_time_report
+
+RESULT = {'cold_ms': 100.0, 'warm_ms': 10.0, 'calls': 40, 'peak_kb': 1000.0}
+
+
+def test_mock_widgets_return_defaults_and_count_calls():
+    st = MockStreamlit()
+    st.session_state = MockSessionState(farm_data={})
+    st.session_state.cache = 1
+    assert st.session_state['cache'] == 1 and st.session_state.get('missing') is None
+    assert st.number_input("x", min_value=1, value=5) == 5 and st.selectbox("y", ['a', 'b'], index=1) == 'b'
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        col1.metric("m", 1)
+    st.plotly_chart(None)
+    assert not st.button("b") and st.calls['metric'] == 1 and st.calls['columns'] == 1
+    assert sum(st.calls.values()) == 6
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {'small': {'Dashboard': RESULT}}
+    noisy = {'small': {'Dashboard': {**RESULT, 'warm_ms': 30.0, 'calls': 45}, 'New page': RESULT}}
+    assert compare(noisy, baseline) == []
+
+    slow = {'small': {'Dashboard': {**RESULT, 'cold_ms': 200.0, 'calls': 60, 'peak_kb': 3000.0}}}
+    regressions = compare(slow, baseline)
+    assert len(regressions) == 3
+    assert regressions[0].startswith('small / Dashboard: cold_ms')
+
+
+def test_every_page_renders_headless(tmp_path):
+    output = tmp_path / 'results.json'
+    proc = subprocess.run(
+        [sys.executable, 'page_benchmark.py', '--sizes', 'small', '--repeat', '1',
+         '--baseline', str(tmp_path / 'none.json'), '--output', str(output)],
+        capture_output=True, text=True, timeout=300,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    results = json.loads(output.read_text(encoding='utf-8'))['small']
+    assert len(results) == 11
+    assert all(r['calls'] > 0 and r['peak_kb'] > 0 for r in results.values())
+
+
+def test_cold_start_defers_heavy_imports():
+    rows = import_time_report()
+    print(format_import_report(rows))
+    modules = {r['module'] for r in rows}
+    assert 'streamlit_app' in modules and 'anomaly_detection' in modules
+    assert not modules & set(DEFERRED_MODULES)
+    assert not modules & {'dashboard_analytics', 'feed_logistics', 'enhanced_chat', 'financial_analysis'}
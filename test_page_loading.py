@@ -5,45 +5,7 @@ from datetime import datetime, timedelta
 import google.generativeai as genai
 
 # Mock Streamlit functions and session_state for testing
-class MockSessionState:
-    def __init__(self):
-        self.farm_data = {}
-        self.banvit_data = {}
-        self.drug_program = {}
-        self.chat_history = []
-
-class MockStreamlit:
-    def __init__(self):
-        self.session_state = MockSessionState()
-        self.secrets = {"GEMINI_API_KEY": "mock_api_key"}
-
-    def set_page_config(self, **kwargs): pass
-    def markdown(self, *args, **kwargs): pass
-    def title(self, *args, **kwargs): pass
-    def subheader(self, *args, **kwargs): pass
-    def write(self, *args, **kwargs): pass
-    def info(self, *args, **kwargs): pass
-    def warning(self, *args, **kwargs): pass
-    def error(self, *args, **kwargs): pass
-    def success(self, *args, **kwargs): pass
-    def text_input(self, *args, **kwargs): return ""
-    def date_input(self, *args, **kwargs): return datetime.now().date()
-    def number_input(self, *args, **kwargs): return 0
-    def form(self, *args, **kwargs): return self
-    def form_submit_button(self, *args, **kwargs): return False
-    def expander(self, *args, **kwargs): return self
-    def radio(self, *args, **kwargs): return ""
-    def columns(self, *args, **kwargs): return [self, self, self]
-    def button(self, *args, **kwargs): return False
-    def text_area(self, *args, **kwargs): return ""
-    def spinner(self, *args, **kwargs): return self
-    def rerun(self): pass
-    def stop(self): pass
-    def dataframe(self, *args, **kwargs): pass
-    def sidebar(self): return self
-
-    def __enter__(self): return self
-    def __exit__(self, exc_type, exc_val, exc_tb): pass
+from mock_streamlit import MockSessionState, MockStreamlit
 
 st = MockStreamlit()
 genai.configure(api_key="mock_api_key") # Configure genai with a mock key
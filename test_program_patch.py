@@ -0,0 +1,118 @@
+import copy
+import json
+
+import pytest
+
+from farm_store import FarmSession, FarmStore
+from program_patch import ProgramVersionStore, PatchConflict, make_patch, validate_patch
+
+
+def make_program():
+    days = {
+        str(day): {'day': day, 'morning': {'drug': '', 'dosage': ''}, 'evening': {'drug': '', 'dosage': ''}}
+        for day in range(1, 43)
+    }
+    days['6']['morning'] = {'drug': 'Neomisin Sülfat', 'dosage': '100 mg/L su', 'time': '08:00-14:00'}
+    return {'drug_program_complete': days}
+
+
+def make_farm():
+    return {
+        'settings': {
+            'houses': {'Kümes 1': {'chick_count': 1000}},
+            'start_date': '2026-02-14',
+            'target_slaughter_date': '2026-03-27',  # day 42
+            'withdrawal_periods': {'Tilosin': 7},
+        },
+        'drug_inventory': {
+            'Neomisin Sülfat': {'withdrawal': 5, 'stock': 100},
+            'Tilosin Tartrat': {'withdrawal': 7, 'stock': 100},
+            'Doksisiklin': {'withdrawal': 5, 'stock': 0},
+            'Hepato': {'withdrawal': 0, 'stock': 100},
+        },
+        'drug_compatibility_matrix': {},
+        'drug_incompatibility_matrix': {'Tilosin': ['Doksisiklin']},
+    }
+
+
+def test_make_patch_skips_unchanged_sessions_and_keeps_other_fields():
+    program = make_program()
+    patch = make_patch(program, {
+        6: {'morning': {'drug': 'Neomisin Sülfat', 'dosage': '100 mg/L su'}},
+        7: {'evening': {'drug': 'Hepato', 'dosage': 'Üretici dozajı'}},
+    }, 'test')
+    assert [(c.day, c.session) for c in patch.changes] == [(7, 'evening')]
+
+    patch = make_patch(program, {6: {'morning': {'dosage': '50 mg/L su'}}}, 'doz')
+    assert patch.changes[0].new == {'drug': 'Neomisin Sülfat', 'dosage': '50 mg/L su', 'time': '08:00-14:00'}
+
+
+def test_validation_flags_withdrawal_mixes_and_stock():
+    program, farm = make_program(), make_farm()
+    late = make_patch(program, {40: {'morning': {'drug': 'Tilosin Tartrat', 'dosage': '500 mg/L su'}}}, 'geç')
+    errors, _ = validate_patch(late, program, farm)
+    assert errors == ['Kümes 1: Tilosin Tartrat arınma süresi 47. güne kadar, kesim 42. gün']
+
+    mix = make_patch(program, {20: {'evening': {'drug': 'Tilosin Tartrat + Doksisiklin', 'dosage': ''}}}, 'karışım')
+    errors, warnings = validate_patch(mix, program, farm)
+    assert errors == ['20. gün Akşam: Doksisiklin + Tilosin Tartrat uyumsuz']
+    assert '20. gün: Doksisiklin stokta yok' in warnings
+
+    ok = make_patch(program, {7: {'evening': {'drug': 'Hepato + Elektrolit', 'dosage': ''}}}, 'ok')
+    assert validate_patch(ok, program, farm) == ([], ["7. gün: 'Elektrolit' envanterde yok"])
+
+
+def test_apply_and_rollback_touch_only_the_diff():
+    program = make_program()
+    original = copy.deepcopy(program)
+    patches = {}
+    store = ProgramVersionStore(program, patches)
+    first = make_patch(store.program, {day: {'evening': {'drug': 'Hepato', 'dosage': ''}} for day in (7, 8)}, 'hepato')
+    assert store.apply(first) == 1
+    second = make_patch(store.program, {8: {'evening': {'drug': 'Hepato + Vitamin C', 'dosage': ''}}}, 'vitamin')
+    assert store.apply(second) == 2
+    assert store.program['8']['evening']['drug'] == 'Hepato + Vitamin C'
+    assert sorted(patches['days']) == ['7', '8'] and program == original
+
+    # The stored history survives a JSON round trip and rolls back newest first
+    patches = json.loads(json.dumps(patches))
+    store = ProgramVersionStore(program, patches)
+    assert store.rollback()['description'] == 'vitamin'
+    assert store.program['8']['evening']['drug'] == 'Hepato'
+    assert store.rollback()['description'] == 'hepato'
+    assert store.rollback() is None
+    assert store.version == 4 and patches['days'] == {}
+    assert store.program == original['drug_program_complete']
+
+
+def test_stale_patch_is_rejected_atomically():
+    program = make_program()
+    patches = {'days': {'9': {'morning': {'drug': 'Vitamin C', 'dosage': ''}}}}
+    patch = make_patch(program, {
+        7: {'morning': {'drug': 'Hepato', 'dosage': ''}},
+        9: {'morning': {'drug': 'Hepato', 'dosage': ''}},
+    }, 'eski')
+    with pytest.raises(PatchConflict):
+        ProgramVersionStore(program, patches).apply(patch)
+    assert '7' not in patches['days'] and 'version' not in patches
+
+
+def test_sessions_apply_patches_against_the_saved_farm(tmp_path):
+    program = make_program()
+    (tmp_path / 'farm_data.json').write_text(json.dumps(make_farm()), encoding='utf-8')
+    first, second = (FarmSession(FarmStore(str(tmp_path / 'farm_data.json'))) for _ in range(2))
+
+    def apply(session, patch):
+        return session.update(session.farm_data, lambda data: ProgramVersionStore(
+            program, data.setdefault('program_patches', {})).apply(patch))[1]
+
+    # Both sessions prepare a patch for day 7 from the same view; only the first one lands
+    view = ProgramVersionStore(program, second.farm_data.get('program_patches', {})).program
+    late = make_patch(view, {7: {'evening': {'drug': 'Vitamin C', 'dosage': ''}}}, 'vitamin')
+    assert apply(first, make_patch(view, {7: {'evening': {'drug': 'Hepato', 'dosage': ''}}}, 'hepato')) == 1
+    with pytest.raises(PatchConflict):
+        apply(second, late)
+
+    second.refresh(second.farm_data)
+    assert ProgramVersionStore(program, second.farm_data['program_patches']).program['7']['evening']['drug'] == 'Hepato'
+    assert program == make_program()
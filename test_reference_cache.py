@@ -0,0 +1,41 @@
+import json
+import os
+
+import reference_cache
+from reference_cache import day_table, load_reference, warm_up
+
+
+def test_reference_is_parsed_once_and_reloaded_on_change(tmp_path):
+    reference_cache.clear()
+    path = tmp_path / 'banvit.json'
+    path.write_text(json.dumps({'1': {'canlı_ağırlık': 60}}), encoding='utf-8')
+
+    first = load_reference(str(path))
+    assert load_reference(str(path)) is first
+
+    path.write_text(json.dumps({'1': {'canlı_ağırlık': 61}}), encoding='utf-8')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_reference(str(path))['1']['canlı_ağırlık'] == 61
+
+
+def test_warm_up_skips_missing_and_broken_files(tmp_path):
+    reference_cache.clear()
+    broken = tmp_path / 'broken.json'
+    broken.write_text('{', encoding='utf-8')
+    timings = warm_up(['banvit_data.json', str(tmp_path / 'missing.json'), str(broken)])
+    assert list(timings) == ['banvit_data.json']
+    assert load_reference('banvit_data.json')['1']['canlı_ağırlık'] > 0
+
+
+def test_day_tables_index_rows_by_day():
+    banvit = {'1': {'yem_tüketimi': 12, 'fcr': 0.9}, '3': {'yem_tüketimi': 20}, 'not': {'fcr': 1}}
+    table = day_table(banvit)
+    assert day_table(banvit) is table and day_table(dict(banvit)) is not table
+
+    assert table.max_day == 3 and table.row(3) is banvit['3'] and table.row(2) is None and table.row(0) is None
+    assert table.column('fcr') == [None, 0.9, None, 0]
+    assert table.series('yem_tüketimi', 5, default=-1) == [12, -1, 20, -1, -1]
+
+    compiled = {2: {'morning': ['Hepato']}}
+    assert day_table(compiled).row(2) == {'morning': ['Hepato']} and day_table(compiled).row(42) is None
@@ -0,0 +1,55 @@
+import copy
+
+from drug_parser import compile_program
+from scenario_engine import CowDict, Scenario, compare_scenarios
+
+BANVIT = {str(day): {'su_tüketimi': 100.0, 'yem_tüketimi': 100.0, 'canlı_ağırlık': 50.0 * day} for day in range(1, 43)}
+
+
+def make_farm():
+    return {
+        'settings': {
+            'houses': {'Kümes 1': {'chick_count': 1000, 'silo_capacity': 20.0},
+                       'Kümes 2': {'chick_count': 1000, 'silo_capacity': 20.0}},
+            'feed_costs': {'Civciv': 3.0, 'Büyütme': 2.0, 'Bitirme': 1.0},
+            'feed_transition': {'chick_to_grower': 14, 'grower_to_finisher': 28},
+        },
+        'daily_data': {f'day_{day}': {'Kümes 1': {'deaths': 10}, 'Kümes 2': {'deaths': 5}} for day in range(1, 31)},
+        'drug_inventory': {},
+        'feed_invoices': [],
+    }
+
+
+def test_cow_dict_only_copies_changed_path():
+    base = make_farm()
+    snapshot = copy.deepcopy(base)
+    fork = CowDict(base)
+    fork['settings']['feed_transition']['grower_to_finisher'] = 25
+    fork['settings']['feed_costs']['Bitirme'] = 1.5
+    del fork['feed_invoices']
+    fork['note'] = 'test'
+
+    assert base == snapshot
+    assert fork['settings']['feed_transition'] == {'chick_to_grower': 14, 'grower_to_finisher': 25}
+    assert 'feed_invoices' not in fork and fork['note'] == 'test'
+    # settings, feed_transition + 1 leaf, feed_costs + 1 leaf, deleted key, new key
+    assert fork.footprint == 7
+    plain = fork.materialize()
+    assert plain['daily_data'] is base['daily_data']
+    assert plain['settings']['houses'] is base['settings']['houses']
+    assert CowDict(base).footprint == 0
+
+
+def test_scenarios_compare_side_by_side():
+    farm = make_farm()
+    early = Scenario('Erken Bitirme', farm).switch_feed('grower_to_finisher', 25)
+    deaths = Scenario('Ölüm x2', farm).scale_mortality(24, 30, 2)
+    # daily_data + 7 days x (day + 2 houses x (house + deaths))
+    assert deaths.footprint == 1 + 7 * (1 + 2 * 2)
+
+    df = compare_scenarios(farm, [early, deaths], BANVIT, 30, compile_program({}, {}, {}))
+    assert list(df.columns) == ['Mevcut', 'Erken Bitirme', 'Ölüm x2']
+    assert df.loc['Bitirme Yemi (kg)', 'Erken Bitirme'] > df.loc['Bitirme Yemi (kg)', 'Mevcut']
+    assert df.loc['Toplam Maliyet (TL)', 'Erken Bitirme'] < df.loc['Toplam Maliyet (TL)', 'Mevcut']
+    assert df.loc['Canlı Hayvan', 'Ölüm x2'] == df.loc['Canlı Hayvan', 'Mevcut'] - 7 * 15
+    assert farm['daily_data']['day_24']['Kümes 1']['deaths'] == 10
@@ -0,0 +1,106 @@
+import io
+import json
+import socket
+import time
+from datetime import date
+
+from sensor_ingestion import (SensorStore, SensorIngestor, SensorSocketServer, iter_csv_readings, iter_jsonl_readings,
+                              start_sensor_server)
+from sensor_replay import generate_sample_readings, write_csv, write_jsonl, replay_to_socket
+
+HOUSES = {'Kümes 1': 10000, 'Kümes 2': 8000}
+START = '2026-02-14'
+
+
+def load_banvit():
+    with open('banvit_data.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def sample(days=3):
+    return list(generate_sample_readings(load_banvit(), HOUSES, START, days=days, seed=7))
+
+
+def make_ingestor(tmp_path, batch_size=100):
+    store = SensorStore(str(tmp_path / 'sensors.db'))
+    return store, SensorIngestor(store, date(2026, 2, 14), batch_size=batch_size)
+
+
+def test_replay_is_deterministic():
+    assert sample() == sample()
+    assert len(sample()) == 3 * 24 * len(HOUSES) * 2
+
+
+def test_jsonl_ingest_rolls_hourly_into_daily(tmp_path):
+    readings = sample()
+    buffer = io.StringIO()
+    write_jsonl(readings, buffer)
+    buffer.seek(0)
+
+    store, ingestor = make_ingestor(tmp_path)
+    assert ingestor.ingest(iter_jsonl_readings(buffer)) == {'accepted': len(readings), 'rejected': 0}
+
+    for day in (1, 2, 3):
+        expected_water = sum(
+            r['value'] for r in readings
+            if r['metric'] == 'water' and r['house'] == 'Kümes 1' and r['timestamp'].startswith(f'2026-02-{13 + day}')
+        )
+        assert abs(store.get_daily_water(day)['Kümes 1'] - expected_water) < 1e-6
+    last_silo = [r['value'] for r in readings if r['metric'] == 'silo' and r['house'] == 'Kümes 2'][-1]
+    assert store.get_silo_levels(3)['Kümes 2'] == last_silo
+    assert len(store.get_hourly('Kümes 1', 'water', day=2)) == 24
+
+
+def test_csv_ingest_is_idempotent_and_rejects_bad_rows(tmp_path):
+    buffer = io.StringIO()
+    write_csv(sample(days=1), buffer)
+    buffer.write('not-a-date,Kümes 1,water,5\n2026-02-14T03:00:00,Kümes 1,humidity,5\n')
+
+    store, ingestor = make_ingestor(tmp_path)
+    buffer.seek(0)
+    first = ingestor.ingest(iter_csv_readings(buffer))
+    total = store.get_daily_water(1)
+    buffer.seek(0)
+    second = ingestor.ingest(iter_csv_readings(buffer))
+
+    assert first == second == {'accepted': 24 * len(HOUSES) * 2, 'rejected': 2}
+    assert store.get_daily_water(1) == total
+    assert store.get_daily_water(1, min_hours=25) == {}
+
+
+def test_socket_ingest(tmp_path):
+    store, ingestor = make_ingestor(tmp_path)
+    server = SensorSocketServer(ingestor)
+    server.start_background()
+    try:
+        host, port = server.server_address
+        result = replay_to_socket(sample(days=2), host, port)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result == {'accepted': 2 * 24 * len(HOUSES) * 2, 'rejected': 0}
+    assert set(store.get_daily_water(2)) == set(HOUSES)
+
+
+def test_open_connection_commits_as_readings_arrive(tmp_path, monkeypatch):
+    monkeypatch.delenv('KUMES_SENSOR_PORT', raising=False)
+    assert start_sensor_server(str(tmp_path / 'farm_data.json')) is None
+
+    store, ingestor = make_ingestor(tmp_path)
+    server = SensorSocketServer(ingestor, flush_seconds=0.05)
+    server.start_background()
+    try:
+        with socket.create_connection(server.server_address) as conn:
+            for reading in sample(days=1)[:4]:
+                conn.sendall((json.dumps(reading, ensure_ascii=False) + '\n').encode('utf-8'))
+            deadline = time.monotonic() + 5
+            while not store.get_silo_levels(1) and time.monotonic() < deadline:
+                time.sleep(0.02)
+            # Stored (and the lock free for other gateways) while the gateway is still connected
+            assert set(store.get_silo_levels(1)) == set(HOUSES)
+            assert not server.ingest_lock.locked()
+            conn.shutdown(socket.SHUT_WR)
+            assert json.loads(conn.makefile('r').readline()) == {'accepted': 4, 'rejected': 0}
+    finally:
+        server.shutdown()
+        server.server_close()